@@ -0,0 +1,45 @@
+"""
+Dimension Insights Explorer breakdown: pandas groupby on the in-memory dataset
+vs the same query pushed down to the user's SQLite analytics table.
+  pandas - df.groupby(col).agg(...) (needs the whole dataset in RAM)
+  sql    - first run per column and later runs (column indexes are built by the save)
+Sales is made non-integer so "same" checks that the SQL sums and means match
+pandas exactly, not just to the last few digits; --float32 stores it as float32.
+
+Usage: python benchmarks/bench_analytics.py [--rows 1000000] [--columns STATUS RESPONSIBLE_PERSON] [--float32]
+"""
+import argparse
+import os
+import tempfile
+
+os.environ.setdefault('LOGITRACK_DB_PATH', os.path.join(tempfile.mkdtemp(), 'users.db'))
+
+from common import make_delivery_frame, timed
+import aggregates
+import analytics
+import auth
+import compaction
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--columns", nargs="+", default=["STATUS", "RESPONSIBLE_PERSON", "Delivery Status"])
+    parser.add_argument("--float32", action="store_true")
+    args = parser.parse_args()
+
+    df = compaction.compact_frame(make_delivery_frame(args.rows))
+    df["Sales"] = (df["TOT. AMT"] / 7).astype("float32" if args.float32 else "float64")
+    auth.create_usertable()
+    token, save_time = timed(auth.save_user_data, "bench", df, "bench.csv")
+    print(f"{args.rows:,} rows, save incl. analytics table: {save_time:.2f}s, "
+          f"dataset in memory: {df.memory_usage(deep=True).sum() / 1e6:.1f} MB")
+
+    print(f"{'column':<22}{'pandas (ms)':>13}{'sql 1st (ms)':>14}{'sql (ms)':>10}  same")
+    for col in args.columns:
+        aggregates.clear()
+        expected, pandas_time = timed(aggregates.breakdown, df, "pandas", col)
+        _, first_time = timed(analytics.breakdown_stats, "bench", col, token)
+        aggregates.clear()
+        result, sql_time = timed(aggregates.breakdown, df, "sql", col, "bench", token)
+        same = expected.astype({col: object}).equals(result.astype({col: object}))
+        print(f"{col:<22}{pandas_time * 1000:>13.1f}{first_time * 1000:>14.1f}{sql_time * 1000:>10.1f}  {same}")
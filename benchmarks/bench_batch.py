@@ -0,0 +1,49 @@
+"""
+Directory mode of the backend (--merge): per-file partial aggregates on a process
+pool, merged into global rollups. Writes --files delivery CSVs of --rows rows
+each to a temporary folder and times the whole run for each worker count.
+
+Speed-up is bounded by the number of CPU cores on the machine (printed first).
+
+Usage: python benchmarks/bench_batch.py [--files 16] [--rows 100000] [--workers 1 2 4 8]
+"""
+import argparse
+import os
+import sys
+import tempfile
+
+from common import make_delivery_frame, timed
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import work_load_tracker_backend as backend
+
+
+def write_files(folder, files, rows):
+    """Daily depot exports: raw columns with day-first text dates, as the depots send them."""
+    for i in range(files):
+        df = make_delivery_frame(rows, seed=i).drop(columns=["Duration", "Days Late", "Delivery Status"])
+        for col in ["EXPECTED DELIVERY DATE", "ACTUAL DELIVERY DATE"]:
+            df[col] = df[col].dt.strftime("%d-%m-%Y")
+        df.to_csv(os.path.join(folder, f"depot_{i:02d}.csv"), index=False)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--files", type=int, default=16)
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    args = parser.parse_args()
+
+    print(f"CPU cores: {os.cpu_count()}, {args.files} files x {args.rows:,} rows")
+    with tempfile.TemporaryDirectory() as folder:
+        write_files(folder, args.files, args.rows)
+        paths = backend.expand_inputs([folder])
+
+        print(f"{'workers':>8}{'seconds':>10}{'rows/s':>14}{'speed-up':>10}")
+        baseline = None
+        for workers in args.workers:
+            tables, seconds = timed(lambda: backend.merge_partials(backend.aggregate_files(paths, workers)))
+            baseline = baseline or seconds
+            rate = args.files * args.rows / seconds
+            print(f"{workers:>8}{seconds:>10.2f}{rate:>14,.0f}{baseline / seconds:>9.2f}x")
+        print(tables["late"].to_string(index=False))
@@ -0,0 +1,86 @@
+"""
+pd.to_datetime(dayfirst=True, errors='coerce') without a format (the old date
+handling) vs dates.parse_dates (per-column format inference + fallbacks).
+
+Three inputs are timed, each --rows values long:
+  clean: train.csv 'Order Date' tiled (one format, dd/mm/yyyy)
+  mixed: Professional_data.csv's delivery dates tiled (two- and four-digit
+         years, month-first rows and broken values such as 03-12-205)
+  wide:  train.csv-style dd/mm/yyyy dates spread over two centuries, with 10%
+         ISO dates and 1% garbage mixed in (many distinct values, which
+         defeats pandas' own per-value cache)
+
+The old path is slow on the wide input, so it is measured on --legacy-rows
+there and scaled linearly to --rows. It also infers a single format from the
+first value, so rows in any other format (the ISO dates in "wide") silently
+become NaT (reported as "recovered"), and an ISO first value makes it read
+YYYY-MM-DD dates day-first (reported as "parsed differently"). Both read
+ambiguous values day-first, so the "mixed" dates should not differ.
+
+Usage: python benchmarks/bench_dates.py [--rows 2000000] [--legacy-rows 200000]
+"""
+import argparse
+import os
+import warnings
+import numpy as np
+import pandas as pd
+
+from common import timed
+import dates
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def tile(values, rows):
+    values = np.asarray(values, dtype=object)
+    return pd.Series(np.resize(values, rows))
+
+
+def make_wide(rows, seed=42):
+    rng = np.random.default_rng(seed)
+    stamps = pd.Timestamp("1900-01-01") + pd.to_timedelta(rng.integers(0, 73_000, rows), unit="D")
+    values = pd.Series(stamps.strftime("%d/%m/%Y"), dtype=object)
+    iso = rng.random(rows) < 0.10
+    values[iso] = stamps[iso].strftime("%Y-%m-%d")
+    values[rng.random(rows) < 0.01] = "not a date"
+    return values
+
+
+def legacy_parse(series):
+    with warnings.catch_warnings():
+        # pandas warns that it could not infer a format and parses element by element
+        warnings.simplefilter("ignore")
+        return pd.to_datetime(series, dayfirst=True, errors='coerce')
+
+
+def run(label, series, legacy_rows):
+    sample = series.iloc[:min(len(series), legacy_rows)]
+    old, old_sample_time = timed(legacy_parse, sample)
+    old_time = old_sample_time * len(series) / len(sample)
+    (new, report), new_time = timed(dates.parse_dates, series)
+
+    new_sample = new.iloc[:len(sample)]
+    recovered = int((old.isna() & new_sample.notna()).sum())
+    differing = int((old.notna() & (old != new_sample)).sum())
+    print(f"{label}: {len(series):,} values, formats {report['formats']}")
+    print(f"  to_datetime (no format): {old_time:8.3f} s  (measured {old_sample_time:.3f} s on {len(sample):,})")
+    print(f"  dates.parse_dates      : {new_time:8.3f} s  ({old_time / new_time:.1f}x faster)")
+    print(f"  on the measured rows: {recovered:,} values recovered, {differing:,} parsed differently")
+    print(f"  parsed {report['parsed']:,} on the fast path, {report['fallback']:,} by fallbacks, "
+          f"{report['coerced']:,} coerced to NaT")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=2_000_000)
+    parser.add_argument("--legacy-rows", type=int, default=200_000)
+    args = parser.parse_args()
+
+    train = pd.read_csv(os.path.join(ROOT, "train.csv"), usecols=["Order Date"])
+    run("clean", tile(train["Order Date"], args.rows), args.rows)
+
+    professional = pd.read_csv(os.path.join(ROOT, "Professional_data.csv"))
+    mixed = pd.concat([professional["EXPECTED DELIVERY DATE"], professional["ACTUAL DELIVERY DATE"]])
+    run("mixed", tile(mixed, args.rows), args.rows)
+
+    run("wide", make_wide(args.rows), args.legacy_rows)
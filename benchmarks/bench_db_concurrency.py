@@ -0,0 +1,75 @@
+"""
+Concurrency test for the auth.py database layer: many threads log in and save at once.
+
+Runs the same workload twice:
+  before - a new connection per call, rollback journal (the original access pattern)
+  after  - pooled connections, WAL journal and tuned pragmas (db.py defaults)
+and reports throughput, p50/p99 latency and failed operations for each.
+
+Usage: python benchmarks/bench_db_concurrency.py [--threads 32] [--ops 40] [--rows 5000]
+"""
+import argparse
+import os
+import tempfile
+import threading
+import time
+import numpy as np
+
+from common import make_delivery_frame
+import auth
+import db
+import row_store
+
+
+def worker(user, df, ops, latencies, errors, barrier):
+    barrier.wait()
+    for i in range(ops):
+        start = time.perf_counter()
+        try:
+            if i % 4 == 3:
+                # Every fourth op is an editor save of a handful of rows
+                rows = df.iloc[i % len(df):i % len(df) + 5]
+                auth.save_user_changes(user, rows, [row_store.OP_UPDATE] * len(rows), [])
+            elif i % 4 == 2:
+                auth.get_user_data(user)
+            else:
+                auth.login_user(user, "secret")
+        except Exception:
+            errors.append(1)
+            continue
+        latencies.append(time.perf_counter() - start)
+
+
+def run(label, threads, ops, df, pool_size, wal):
+    db.configure(path=os.path.join(tempfile.mkdtemp(), 'users.db'), pool_size=pool_size, wal=wal)
+    auth.create_usertable()
+    users = [f"user{i}" for i in range(threads)]
+    for user in users:
+        auth.add_userdata(user, "secret")
+        auth.save_user_data(user, df, "bench.csv")
+
+    latencies, errors = [], []
+    barrier = threading.Barrier(threads)
+    pool = [threading.Thread(target=worker, args=(u, df, ops, latencies, errors, barrier)) for u in users]
+    start = time.perf_counter()
+    for t in pool:
+        t.start()
+    for t in pool:
+        t.join()
+    elapsed = time.perf_counter() - start
+
+    lat = np.array(latencies) * 1000
+    print(f"{label:<8}{len(lat) / elapsed:>12.1f}{np.percentile(lat, 50):>12.1f}{np.percentile(lat, 99):>12.1f}{len(errors):>10}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--threads", type=int, default=32)
+    parser.add_argument("--ops", type=int, default=40, help="operations per thread")
+    parser.add_argument("--rows", type=int, default=5000, help="rows in each user's dataset")
+    args = parser.parse_args()
+
+    df = make_delivery_frame(args.rows)
+    print(f"{'mode':<8}{'ops/s':>12}{'p50 (ms)':>12}{'p99 (ms)':>12}{'errors':>10}")
+    run("before", args.threads, args.ops, df, pool_size=0, wal=False)
+    run("after", args.threads, args.ops, df, pool_size=8, wal=True)
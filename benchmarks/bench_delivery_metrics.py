@@ -0,0 +1,61 @@
+"""
+Row-wise .apply (the old per-page copies) vs the vectorized delivery_metrics engine.
+
+The row-wise path is measured on --legacy-rows (it holds one Python object per
+cell and is very slow at 10M rows) and scaled linearly to --rows.
+
+Usage: python benchmarks/bench_delivery_metrics.py [--rows 10000000] [--legacy-rows 1000000]
+"""
+import argparse
+from datetime import timedelta
+import numpy as np
+import pandas as pd
+
+from common import timed
+import delivery_metrics
+
+
+def make_dates(rows, seed=42):
+    """Only the two date columns, so 10M rows fit comfortably in memory."""
+    rng = np.random.default_rng(seed)
+    expected = pd.Timestamp("2025-01-01") + pd.to_timedelta(rng.integers(0, 365, rows), unit="D")
+    actual = (expected + pd.to_timedelta(rng.integers(-2, 10, rows), unit="D")).to_numpy()
+    actual[rng.random(rows) < 0.15] = np.datetime64("NaT")
+    return pd.DataFrame({"EXPECTED DELIVERY DATE": expected, "ACTUAL DELIVERY DATE": actual})
+
+
+def legacy_metrics(df):
+    """The Home page logic as it was before delivery_metrics existed."""
+    df["Duration"] = df["ACTUAL DELIVERY DATE"] - df["EXPECTED DELIVERY DATE"]
+    df["Days Late"] = (df["Duration"].dt.total_seconds() / (60 * 60 * 24)).fillna(0)
+
+    def calculate_priority(days):
+        if days > 5: return "High"
+        if days > 0: return "Medium"
+        return "Low"
+
+    df["PRIORITY"] = df["Days Late"].apply(calculate_priority)
+    df["Delivery Status"] = df["Duration"].apply(lambda x: "Late" if x > timedelta(days=0) else "On Time")
+    mask_not_delivered = df["ACTUAL DELIVERY DATE"].isna()
+    df.loc[mask_not_delivered, "Delivery Status"] = "Pending"
+    df.loc[mask_not_delivered, "PRIORITY"] = "Medium"
+    return df
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=10_000_000)
+    parser.add_argument("--legacy-rows", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    base = make_dates(args.rows)
+    new, new_time = timed(delivery_metrics.add_delivery_metrics, base.copy())
+
+    sample = base.iloc[:min(args.rows, args.legacy_rows)].copy()
+    old, old_sample_time = timed(legacy_metrics, sample)
+    old_time = old_sample_time * args.rows / len(sample)
+
+    same = all(old[c].equals(new[c].iloc[:len(sample)].astype(old[c].dtype)) for c in ["PRIORITY", "Delivery Status", "Days Late"])
+    print(f"rows: {args.rows:,}")
+    print(f"row-wise apply : {old_time:8.3f} s  (measured {old_sample_time:.3f} s on {len(sample):,} rows)")
+    print(f"vectorized     : {new_time:8.3f} s  ({old_time / new_time:.0f}x faster, identical output: {same})")
@@ -0,0 +1,41 @@
+"""
+Excel ingest and output, against the openpyxl paths:
+  write openpyxl / xlsxwriter - generate_csv's xlsx writer for a generated delivery file
+  read openpyxl / calamine    - pd.read_excel of the whole first sheet
+  cached                      - ingest.read_excel once the workbook's Arrow conversion is cached
+
+Usage: python benchmarks/bench_excel.py [--sizes 10000 50000 200000]
+"""
+import argparse
+import io
+import os
+import tempfile
+
+os.environ.setdefault('LOGITRACK_CACHE_DIR', tempfile.mkdtemp())
+
+import pandas as pd
+
+from common import timed
+import generate_csv
+import ingest
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 50_000, 200_000])
+    args = parser.parse_args()
+
+    print(f"{'rows':>10}{'write openpyxl (s)':>20}{'write xlsxwriter (s)':>22}"
+          f"{'read openpyxl (s)':>19}{'read calamine (s)':>19}{'cached (s)':>12}")
+    with tempfile.TemporaryDirectory() as folder:
+        for rows in args.sizes:
+            path = os.path.join(folder, f'deliveries_{rows}.xlsx')
+            _, write_openpyxl = timed(generate_csv._write_xlsx_openpyxl, generate_csv.generate(rows), path)
+            _, write_xlsxwriter = timed(generate_csv._write_xlsx_xlsxwriter, generate_csv.generate(rows), path)
+            _, read_openpyxl = timed(pd.read_excel, path, engine='openpyxl')
+            _, read_calamine = timed(pd.read_excel, path, engine='calamine')
+            with open(path, 'rb') as f:
+                file = io.BytesIO(f.read())
+            ingest.read_excel(file)   # converts and caches
+            _, cached = timed(ingest.read_excel, file)
+            print(f"{rows:>10,}{write_openpyxl:>20.2f}{write_xlsxwriter:>22.2f}"
+                  f"{read_openpyxl:>19.2f}{read_calamine:>19.2f}{cached:>12.3f}")
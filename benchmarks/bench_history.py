@@ -0,0 +1,63 @@
+"""
+Dataset version history: storage and time for a series of small edits, each
+kept as a version (history.py).
+  record  - time to add a version after editing --edit-rows random rows
+  new     - bytes stored for that version (only its changed chunks)
+  logical - every version's size as if stored whole, against the physical
+            size of the deduplicated chunks actually stored
+  diff    - rows changed between the first and last version
+  restore - time to load the first version back
+
+Usage: python benchmarks/bench_history.py [--rows 1000000] [--versions 20] [--edit-rows 100]
+"""
+import argparse
+import os
+import tempfile
+
+os.environ.setdefault('LOGITRACK_DB_PATH', os.path.join(tempfile.mkdtemp(), 'users.db'))
+
+import numpy as np
+
+from common import make_delivery_frame, timed
+import auth
+import compaction
+import db
+import history
+
+USERNAME = 'bench'
+
+
+def record(df):
+    versioned = history.prepare([df])
+    with db.transaction() as c:
+        return history.record(c, USERNAME, versioned, 'bench.csv', 'edit')
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--versions", type=int, default=20)
+    parser.add_argument("--edit-rows", type=int, default=100)
+    args = parser.parse_args()
+
+    auth.create_usertable()
+    df = compaction.compact_frame(make_delivery_frame(args.rows))
+    rng = np.random.default_rng(0)
+    amount = df.columns.get_loc("TOT. AMT")
+
+    print(f"{'version':>8}{'record (ms)':>13}{'new (MB)':>10}")
+    for i in range(args.versions):
+        if i:
+            df = df.copy()
+            df.iloc[rng.choice(args.rows, args.edit_rows, replace=False), amount] = rng.integers(500, 25000, args.edit_rows)
+        version, seconds = timed(record, df)
+        new_bytes = history.list_versions(USERNAME)['new bytes'].iloc[0]
+        print(f"{version:>8}{seconds * 1000:>13.1f}{new_bytes / 1e6:>10.2f}")
+
+    report = history.storage_report(USERNAME)
+    print(f"\n{report['versions']} versions: {report['logical_bytes'] / 1e6:,.1f} MB logical, "
+          f"{report['physical_bytes'] / 1e6:,.1f} MB stored ({report['dedup_ratio']:.1f}x)")
+    changes, diff_time = timed(history.diff, USERNAME, 1, args.versions)
+    print(f"diff v1..v{args.versions}: {len(changes['changed']):,} rows changed in {diff_time * 1000:,.1f} ms")
+    _, restore_time = timed(history.load_version, USERNAME, 1)
+    print(f"restore v1: {restore_time * 1000:,.1f} ms")
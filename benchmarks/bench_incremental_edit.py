@@ -0,0 +1,80 @@
+"""
+Cost of handling one editor change on the Display Data page as the dataset grows:
+  full        - edited_df.equals(df) + re-deriving the metrics for every row (old path)
+  incremental - change-set check + re-deriving only the touched rows
+Then checks that a saved row delta reloads with the re-derived metrics of the
+edited row (Days Late, Delivery Status, PRIORITY), not the editor's stale ones.
+
+Usage: python benchmarks/bench_incremental_edit.py [--sizes 10000 100000 1000000]
+"""
+import argparse
+import os
+import tempfile
+
+os.environ.setdefault('LOGITRACK_DB_PATH', os.path.join(tempfile.mkdtemp(), 'users.db'))
+
+import pandas as pd
+
+from common import make_delivery_frame, timed
+import auth
+import compaction
+import delivery_metrics
+import paging
+import row_store
+
+USERNAME = 'bench'
+
+
+def full_path(df, edited_df):
+    if not edited_df.equals(df):
+        delivery_metrics.add_delivery_metrics(edited_df)
+
+
+def reload_check(rows):
+    """Edits one row's delivery date on a page, saves the row delta and reloads the dataset."""
+    auth.create_usertable()
+    df = compaction.compact_frame(make_delivery_frame(rows))
+    auth.save_user_data(USERNAME, df, "bench.csv")
+
+    positions = paging.page_positions(pd.RangeIndex(len(df)).to_numpy(), 1, paging.DEFAULT_PAGE_SIZE)
+    page = paging.get_page(df, positions)
+    pos = int(page["EXPECTED DELIVERY DATE"].notna().to_numpy().argmax())
+    late = page["EXPECTED DELIVERY DATE"].iloc[pos] + pd.Timedelta(days=9)
+    edited = page.copy()
+    edited.iloc[pos, edited.columns.get_loc("ACTUAL DELIVERY DATE")] = late
+    changes = {"edited_rows": {pos: {"ACTUAL DELIVERY DATE": late.isoformat()}}}
+
+    new_df = paging.apply_page_edits(df, positions, edited, changes)
+    delta = row_store.editor_delta(page, edited, changes)
+    delta = (paging.saved_rows(new_df, positions, edited, changes),) + delta[1:]
+    auth.save_user_changes(USERNAME, *delta, row_count=len(new_df))
+
+    loaded, _ = auth.get_user_data(USERNAME)
+    cols = ["Days Late", "Delivery Status", "PRIORITY"]
+    return loaded[cols].iloc[positions[pos]].tolist(), new_df[cols].iloc[positions[pos]].tolist()
+
+
+def incremental_path(edited_df, changes):
+    if row_store.has_changes(changes):
+        touched = edited_df.index[row_store.touched_positions(changes, len(edited_df))]
+        delivery_metrics.update_delivery_metrics(edited_df, touched)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    args = parser.parse_args()
+
+    print(f"{'rows':>10}{'full (ms)':>14}{'incremental (ms)':>18}")
+    for rows in args.sizes:
+        df = make_delivery_frame(rows)
+        edited_df = df.copy()
+        edited_df.loc[rows // 2, "ACTUAL DELIVERY DATE"] = pd.Timestamp("2026-01-01")
+        changes = {"edited_rows": {rows // 2: {"ACTUAL DELIVERY DATE": "2026-01-01"}}}
+
+        _, full_time = timed(full_path, df, edited_df.copy())
+        _, inc_time = timed(incremental_path, edited_df.copy(), changes)
+        print(f"{rows:>10,}{full_time * 1000:>14.1f}{inc_time * 1000:>18.1f}")
+
+    reloaded, expected = reload_check(args.sizes[0])
+    print(f"\nreload after a row delta: {reloaded} (expected {expected}) -> {'ok' if reloaded == expected else 'STALE'}")
@@ -0,0 +1,88 @@
+"""
+Peak memory and time of ingesting one large CSV upload:
+  full   - pd.read_csv of the whole file + normalize + save (the non-streaming path)
+  stream - ingest.stream_to_store with the given chunk sizes
+
+Each run happens in a fresh subprocess so its peak RSS can be measured.
+
+Usage: python benchmarks/bench_ingest.py [--rows 1000000] [--chunks 50000 200000]
+"""
+import argparse
+import io
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+from common import make_delivery_frame
+
+MAPPING = {'ID NO.': 'ID NO.', 'NAME': 'NAME', 'EXPECTED DELIVERY DATE': 'EXPECTED DELIVERY DATE',
+           'ACTUAL DELIVERY DATE': 'ACTUAL DELIVERY DATE', 'RESPONSIBLE_PERSON': 'RESPONSIBLE_PERSON',
+           'PRIORITY': 'PRIORITY', 'STATUS': 'STATUS', 'NOTES': 'NOTES'}
+
+
+class Upload(io.FileIO):
+    """Stands in for Streamlit's UploadedFile (a file object with .size)."""
+    @property
+    def size(self):
+        return os.path.getsize(self.name)
+
+
+def peak_rss_mb():
+    """Peak resident memory of this process (VmHWM resets on exec, unlike ru_maxrss)."""
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def child(mode, path, chunk_rows):
+    import auth
+    import db
+    import ingest
+    db.configure(path=os.path.join(tempfile.mkdtemp(), 'users.db'))
+    auth.create_usertable()
+
+    start = time.perf_counter()
+    with Upload(path) as f:
+        if mode == 'full':
+            df = ingest.normalize_frame(ingest.read_file(f, path), MAPPING)
+            auth.save_user_data('bench', df, path)
+        else:
+            ingest.stream_to_store(f, path, MAPPING, 'bench', chunk_rows)
+    elapsed = time.perf_counter() - start
+    peak_mb = peak_rss_mb()
+    print(f"{elapsed:.2f} {peak_mb:.0f}")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == '--child':
+        child(sys.argv[2], sys.argv[3], int(sys.argv[4]))
+        sys.exit()
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--chunks", type=int, nargs="+", default=[50_000, 200_000])
+    args = parser.parse_args()
+
+    path = os.path.join(tempfile.mkdtemp(), 'upload.csv')
+    raw = make_delivery_frame(args.rows).drop(columns=["Duration", "Days Late", "Delivery Status"])
+    for col in ["EXPECTED DELIVERY DATE", "ACTUAL DELIVERY DATE"]:
+        raw[col] = raw[col].dt.strftime("%d-%m-%Y")
+    raw.to_csv(path, index=False)
+    del raw
+    print(f"file: {os.path.getsize(path) / 1e6:.0f} MB, {args.rows:,} rows")
+
+    print(f"{'mode':<16}{'time (s)':>10}{'peak RSS (MB)':>16}")
+    runs = [('full', 0)] + [('stream', c) for c in args.chunks]
+    for mode, chunk_rows in runs:
+        out = subprocess.run([sys.executable, __file__, '--child', mode, path, str(chunk_rows)],
+                             capture_output=True, text=True, check=True).stdout.split()
+        label = mode if mode == 'full' else f"stream {chunk_rows:,}"
+        print(f"{label:<16}{float(out[0]):>10.2f}{float(out[1]):>16.0f}")
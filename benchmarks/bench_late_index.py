@@ -0,0 +1,57 @@
+"""
+Late Deliveries page (page 4) data work per rerun:
+  rescan - re-derive the metrics, filter the late rows and sort all of them (before late_index.py)
+  build  - late_index.LateIndex over the dataset (once per upload or load)
+  update - carry the index over an edit of 50 rows
+  top 50 - the 50 worst delays plus the KPI strip, read off the index
+
+Usage: python benchmarks/bench_late_index.py [--sizes 100000 1000000 5000000]
+"""
+import argparse
+
+import numpy as np
+import pandas as pd
+
+from common import make_delivery_frame, timed
+import delivery_metrics
+import late_index
+
+EDITED_ROWS = 50
+
+
+def rescan(df):
+    delivery_metrics.add_delivery_metrics(df, priority=False)
+    delivered = df[df["Delivery Status"] != "Pending"]
+    delayed = df[df["Delivery Status"] == "Late"]
+    kpis = (len(df), len(delivered), len(delayed), delayed["Days Late"].mean(), delayed["Days Late"].max())
+    return kpis, delayed.sort_values(by="Days Late", ascending=False)
+
+
+def edit(df, rows):
+    """The dataset after an edit of `rows`, with their metrics re-derived as the editor does."""
+    df = df.copy()
+    df.loc[rows, "ACTUAL DELIVERY DATE"] = df.loc[rows, "EXPECTED DELIVERY DATE"] + pd.Timedelta(days=3)
+    return delivery_metrics.update_delivery_metrics(df, df.index[rows], priority=False)
+
+
+def top(index):
+    return index.top(50), index.kpis()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100_000, 1_000_000, 5_000_000])
+    args = parser.parse_args()
+
+    print(f"{'rows':>10}{'rescan (ms)':>13}{'build (ms)':>12}{'update (ms)':>13}{'top 50 (ms)':>13}")
+    rng = np.random.default_rng(0)
+    for rows in args.sizes:
+        df = make_delivery_frame(rows)
+        _, rescan_time = timed(rescan, df)
+        index, build_time = timed(late_index.LateIndex, df)
+        changed = rng.choice(rows, EDITED_ROWS, replace=False)
+        edited = edit(df, changed)
+        index, update_time = timed(index.updated, edited, changed)
+        _, top_time = timed(top, index)
+        print(f"{rows:>10,}{rescan_time * 1000:>13.1f}{build_time * 1000:>12.1f}{update_time * 1000:>13.1f}"
+              f"{top_time * 1000:>13.3f}")
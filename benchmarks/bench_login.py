@@ -0,0 +1,33 @@
+"""
+Time from pressing Login to the first page, for saved datasets of several sizes:
+  eager  - auth.get_user_data: the whole dataset loaded and decoded at login
+  handle - auth.get_user_data_info: file name, row count and columns only
+  page 3 - auth.get_user_columns for the three columns the Graph Plotting page charts
+
+Usage: python benchmarks/bench_login.py [--sizes 10000 100000 1000000]
+"""
+import argparse
+import os
+import tempfile
+
+os.environ.setdefault('LOGITRACK_DB_PATH', os.path.join(tempfile.mkdtemp(), 'users.db'))
+
+from common import make_delivery_frame, timed
+import auth
+
+PAGE_COLUMNS = ['STATUS', 'PRIORITY', 'RESPONSIBLE_PERSON']
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    args = parser.parse_args()
+
+    auth.create_usertable()
+    print(f"{'rows':>10}{'eager (ms)':>12}{'handle (ms)':>13}{'page 3 (ms)':>13}")
+    for rows in args.sizes:
+        user = f"bench_{rows}"
+        auth.save_user_data(user, make_delivery_frame(rows), "bench.csv")
+        _, eager_time = timed(auth.get_user_data, user)
+        _, handle_time = timed(auth.get_user_data_info, user)
+        _, page_time = timed(auth.get_user_columns, user, PAGE_COLUMNS)
+        print(f"{rows:>10,}{eager_time * 1000:>12.1f}{handle_time * 1000:>13.2f}{page_time * 1000:>13.1f}")
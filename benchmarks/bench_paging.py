@@ -0,0 +1,40 @@
+"""
+What the Display Data page serializes for the browser on each rerun:
+  full  - the whole DataFrame converted to Arrow bytes (old st.dataframe(df))
+  page  - the cached view positions + one page of rows converted to Arrow bytes
+  view  - building the view once per dataset version (sort + filter + search)
+
+Usage: python benchmarks/bench_paging.py [--sizes 10000 100000 1000000] [--page-size 500]
+"""
+import argparse
+from streamlit import dataframe_util
+
+from common import make_delivery_frame, timed
+import compaction
+import paging
+
+
+def page_path(df, token, page, page_size):
+    positions = paging.view_positions(df, token, sort_col="TOT. AMT", ascending=False,
+                                      filter_col="STATUS", filter_values=["Pending"], search="sarah")
+    page_df = paging.get_page(df, paging.page_positions(positions, page, page_size))
+    return dataframe_util.convert_pandas_df_to_arrow_bytes(page_df)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--page-size", type=int, default=paging.DEFAULT_PAGE_SIZE)
+    args = parser.parse_args()
+
+    print(f"{'rows':>10}{'full (ms)':>12}{'full (MB)':>12}{'view (ms)':>12}{'page (ms)':>12}{'page (KB)':>12}")
+    for rows in args.sizes:
+        df = compaction.compact_frame(make_delivery_frame(rows))
+        token = f"bench-{rows}:0"
+
+        full, full_time = timed(dataframe_util.convert_pandas_df_to_arrow_bytes, df)
+        _, view_time = timed(page_path, df, token, 1, args.page_size)
+        # Later page switches reuse the cached view
+        page, page_time = timed(page_path, df, token, 2, args.page_size)
+        print(f"{rows:>10,}{full_time * 1000:>12.1f}{len(full) / 1e6:>12.1f}"
+              f"{view_time * 1000:>12.1f}{page_time * 1000:>12.1f}{len(page) / 1e3:>12.1f}")
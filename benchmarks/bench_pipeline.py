@@ -0,0 +1,220 @@
+"""
+Reproducible benchmark of the app's data pipeline, stage by stage, each stage
+working on the previous stage's output:
+  ingest     pd.read_csv of a generated delivery export (generate_csv, fixed seed)
+  normalize  column mapping + delivery metrics, as Home_Page.process_and_normalize_data
+  compact    the dtype compaction applied before the frame goes into the session
+  save       auth.save_user_data
+  load       auth.get_user_data
+  late       the Late Deliveries page computation (page 4)
+  aggregate  the rollups of the Data Analysis and Graph Plotting pages (2 and 3), uncached
+
+Each size runs in its own process. Time is the best of --repeat runs. Memory is
+the peak resident size reached during the stage minus the resident size before
+it. `compare` flags stages that got slower or bigger than a saved baseline by
+more than the thresholds, and exits with status 1 if any did.
+
+Usage:
+  python benchmarks/bench_pipeline.py run [--sizes 10000 100000 1000000 10000000] [--repeat 3] [--output results.json]
+  python benchmarks/bench_pipeline.py compare baseline.json results.json [--time-threshold 0.15] [--memory-threshold 0.15]
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+import common   # noqa: F401  (puts the app modules on the path)
+import generate_csv
+
+SEED = 42
+MAPPING = {'ID NO.': 'ID NO.', 'NAME': 'NAME', 'EXPECTED DELIVERY DATE': 'EXPECTED DELIVERY DATE',
+           'ACTUAL DELIVERY DATE': 'ACTUAL DELIVERY DATE', 'RESPONSIBLE_PERSON': 'DELIVERY AGENT',
+           'PRIORITY': 'PRIORITY', 'STATUS': 'STATUS', 'NOTES': 'NOTES'}
+STAGES = ['ingest', 'normalize', 'compact', 'save', 'load', 'late', 'aggregate']
+# Differences below these are noise, whatever the ratio
+MIN_SECONDS = 0.005
+MIN_MB = 5.0
+
+
+# --- MEMORY ---
+def _status_mb(field):
+    with open('/proc/self/status') as f:
+        for line in f:
+            if line.startswith(field + ':'):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+
+def reset_peak():
+    """Resets the process's peak resident size (Linux: VmHWM), so the next stage is measured on its own."""
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+    except OSError:
+        pass
+
+
+def measure(func, *args):
+    """Runs func once: (result, seconds, MB of resident memory added at the peak)."""
+    reset_peak()
+    before = _status_mb('VmRSS')
+    start = time.perf_counter()
+    result = func(*args)
+    seconds = time.perf_counter() - start
+    return result, seconds, max(_status_mb('VmHWM') - before, 0.0)
+
+
+# --- STAGES ---
+def late_deliveries(df):
+    """What the Late Deliveries page computes on every rerun."""
+    import delivery_metrics
+    delivery_metrics.add_delivery_metrics(df, priority=False, report={})
+    delivered = df[df["Delivery Status"] != "Pending"]
+    delayed = df[df["Delivery Status"] == "Late"]
+    summary = (len(df), len(delivered), len(delayed), delayed['Days Late'].mean(), delayed['Days Late'].max())
+    columns = [col for col in ["ID NO.", "NAME", "EXPECTED DELIVERY DATE", "ACTUAL DELIVERY DATE", "Days Late",
+                               "RESPONSIBLE_PERSON", "PRIORITY"] if col in delayed.columns]
+    return summary, delayed[columns].sort_values(by="Days Late", ascending=False)
+
+
+def page_aggregates(df):
+    """The rollups behind the Data Analysis and Graph Plotting pages, with an empty cache."""
+    import aggregates
+    aggregates.clear()
+    token = 'bench:0'
+    for col in ['STATUS', 'PRIORITY', 'RESPONSIBLE_PERSON', 'Delivery Status']:
+        aggregates.value_counts(df, token, col)
+    aggregates.column_mean(df, token, 'Days Late')
+    for col in ['RESPONSIBLE_PERSON', 'NAME', 'STATUS']:
+        aggregates.breakdown(df, token, col)
+
+
+def child(path, repeat):
+    import auth
+    import compaction
+    import db
+    import ingest
+    db.configure(path=os.path.join(tempfile.mkdtemp(), 'users.db'))
+    auth.create_usertable()
+
+    def save(df):
+        auth.save_user_data('bench', df, 'bench.csv')
+        return df
+
+    def late(df):
+        late_deliveries(df.copy())   # the page adds its columns in place
+        return df
+
+    def aggregate(df):
+        page_aggregates(df)
+        return df
+
+    steps = {
+        'ingest': lambda _: pd.read_csv(path),
+        'normalize': lambda raw: ingest.normalize_frame(raw, MAPPING, {}),
+        'compact': compaction.compact_frame,
+        'save': save,
+        'load': lambda _: auth.get_user_data('bench')[0],
+        'late': late,
+        'aggregate': aggregate,
+    }
+    results, value = {}, None
+    for stage in STAGES:
+        runs = []
+        for _ in range(repeat):
+            out, seconds, memory = measure(steps[stage], value)
+            runs.append((seconds, memory))
+        value = out
+        results[stage] = {'seconds': min(s for s, _ in runs), 'memory_mb': max(m for _, m in runs)}
+    json.dump(results, sys.stdout)
+
+
+# --- RUN / COMPARE ---
+def environment():
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except OSError:
+        commit = ''
+    return {'timestamp': datetime.now(timezone.utc).isoformat(timespec='seconds'), 'commit': commit,
+            'python': platform.python_version(), 'pandas': pd.__version__, 'numpy': np.__version__,
+            'pyarrow': pa.__version__, 'machine': platform.machine(), 'system': platform.system(),
+            'cpu_count': os.cpu_count(), 'seed': SEED}
+
+
+def run(args):
+    report = {'environment': environment(), 'repeat': args.repeat, 'results': {}}
+    print(f"{'rows':>10} " + ''.join(f"{stage:>18}" for stage in STAGES))
+    with tempfile.TemporaryDirectory() as folder:
+        for rows in args.sizes:
+            path = os.path.join(folder, f'deliveries_{rows}.csv')
+            generate_csv.write(generate_csv.generate(rows, seed=SEED), path, 'csv')
+            out = subprocess.run([sys.executable, __file__, '--child', path, str(args.repeat)],
+                                 capture_output=True, text=True, check=True).stdout
+            os.remove(path)
+            report['results'][str(rows)] = json.loads(out)
+            stages = report['results'][str(rows)]
+            print(f"{rows:>10,} " + ''.join(f"{stages[s]['seconds']:>9.3f}s{stages[s]['memory_mb']:>6.0f}MB"
+                                             for s in STAGES))
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {args.output}")
+
+
+def compare(args):
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.current) as f:
+        current = json.load(f)
+    for key in ('machine', 'cpu_count', 'python', 'pandas', 'pyarrow'):
+        if baseline['environment'].get(key) != current['environment'].get(key):
+            print(f"Note: {key} differs ({baseline['environment'].get(key)} -> {current['environment'].get(key)})")
+
+    regressions = 0
+    print(f"{'rows':>10} {'stage':<10}{'base (s)':>10}{'now (s)':>10}{'time':>9}{'base MB':>10}{'now MB':>9}{'memory':>9}")
+    for rows in sorted(set(baseline['results']) & set(current['results']), key=int):
+        for stage in STAGES:
+            base, now = baseline['results'][rows].get(stage), current['results'][rows].get(stage)
+            if base is None or now is None:
+                continue
+            slower = (now['seconds'] > base['seconds'] * (1 + args.time_threshold)
+                      and now['seconds'] - base['seconds'] > MIN_SECONDS)
+            bigger = (now['memory_mb'] > base['memory_mb'] * (1 + args.memory_threshold)
+                      and now['memory_mb'] - base['memory_mb'] > MIN_MB)
+            regressions += slower + bigger
+            time_change = now['seconds'] / base['seconds'] - 1 if base['seconds'] else 0.0
+            memory_change = now['memory_mb'] / base['memory_mb'] - 1 if base['memory_mb'] else 0.0
+            print(f"{int(rows):>10,} {stage:<10}{base['seconds']:>10.3f}{now['seconds']:>10.3f}{time_change:>+8.0%}"
+                  f"{'!' if slower else ' '}{base['memory_mb']:>10.0f}{now['memory_mb']:>9.0f}{memory_change:>+8.0%}"
+                  f"{'!' if bigger else ' '}")
+    print(f"{regressions} regression(s)" if regressions else "No regressions")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == '--child':
+        child(sys.argv[2], int(sys.argv[3]))
+        sys.exit()
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest='command', required=True)
+    run_parser = commands.add_parser('run', help='benchmark every stage at each size')
+    run_parser.add_argument('--sizes', type=int, nargs='+', default=[10_000, 100_000, 1_000_000, 10_000_000])
+    run_parser.add_argument('--repeat', type=int, default=3)
+    run_parser.add_argument('--output', default='pipeline_results.json')
+    compare_parser = commands.add_parser('compare', help='flag regressions against a baseline')
+    compare_parser.add_argument('baseline')
+    compare_parser.add_argument('current')
+    compare_parser.add_argument('--time-threshold', type=float, default=0.15)
+    compare_parser.add_argument('--memory-threshold', type=float, default=0.15)
+    args = parser.parse_args()
+    sys.exit(run(args) if args.command == 'run' else compare(args))
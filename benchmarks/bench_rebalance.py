@@ -0,0 +1,39 @@
+"""
+Proposed reassignment of open deliveries (rebalance.propose) for skewed
+workloads: agents drawn from a Zipf distribution, two thirds of the rows
+open (Pending or In Progress).
+
+Usage: python benchmarks/bench_rebalance.py [--open 10000 100000 1000000] [--agents 1000]
+"""
+import argparse
+
+import numpy as np
+import pandas as pd
+
+from common import timed
+import rebalance
+
+
+def make_workload(open_rows, agents, seed=42):
+    rng = np.random.default_rng(seed)
+    rows = open_rows * 3 // 2
+    names = np.array([f"Agent {i:04d}" for i in range(agents)], dtype=object)
+    return pd.DataFrame({
+        "RESPONSIBLE_PERSON": pd.Categorical(names[(rng.zipf(1.3, rows) - 1) % agents]),
+        "STATUS": pd.Categorical(rng.choice(["Delivered", "Pending", "In Progress"], rows)),
+        "PRIORITY": pd.Categorical(rng.choice(["High", "Medium", "Low"], rows)),
+    })
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--open", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--agents", type=int, default=1000)
+    args = parser.parse_args()
+
+    print(f"{'open rows':>10}{'agents':>8}{'propose (s)':>13}{'moved':>10}{'max load before':>17}{'max load after':>16}")
+    for open_rows in args.open:
+        df = make_workload(open_rows, args.agents)
+        (moves, loads), seconds = timed(rebalance.propose, df)
+        print(f"{int(rebalance.open_mask(df).sum()):>10,}{args.agents:>8,}{seconds:>13.3f}{len(moves):>10,}"
+              f"{loads['Weight before'].max():>17,}{loads['Weight after'].max():>16,}")
@@ -0,0 +1,57 @@
+"""
+Memory for N sessions holding the same dataset:
+  private - every session keeps its own copy (before shared_store.py)
+  shared  - every session holds a view of one memory-mapped copy
+  edit    - one session edits a column of its view (copy-on-write)
+Sizes are the frames' data (shared data counted once) and the process's
+resident memory after each step.
+
+Usage: python benchmarks/bench_shared_store.py [--rows 1000000] [--sessions 40]
+"""
+import argparse
+import gc
+import os
+import tempfile
+
+os.environ.setdefault('LOGITRACK_SHARED_DIR', tempfile.mkdtemp())
+
+from common import make_delivery_frame, timed
+import compaction
+import rebalance
+import shared_store
+
+
+def resident_mb():
+    return shared_store.memory_report()[1]['resident_mb'] or 0.0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--sessions", type=int, default=40)
+    args = parser.parse_args()
+
+    df = compaction.compact_frame(make_delivery_frame(args.rows))
+    frame_mb = df.memory_usage(deep=True).sum() / 1e6
+    base = resident_mb()
+    print(f"{'step':>10}{'data (MB)':>12}{'resident +MB':>14}{'time (ms)':>12}")
+
+    copies, seconds = timed(lambda: [df.copy() for _ in range(args.sessions)])
+    print(f"{'private':>10}{frame_mb * args.sessions:>12,.1f}{resident_mb() - base:>14,.1f}{seconds * 1000:>12,.1f}")
+    del copies
+    gc.collect()
+
+    base = resident_mb()
+    views, seconds = timed(lambda: [shared_store.share(df) for _ in range(args.sessions)])
+    for i, view in enumerate(views):
+        shared_store.track(f"session-{i}", "data", view)
+    _, totals = shared_store.memory_report()
+    print(f"{'shared':>10}{totals['store_mb'] + totals['private_mb']:>12,.1f}{resident_mb() - base:>14,.1f}"
+          f"{seconds * 1000:>12,.1f}")
+
+    moves, _ = rebalance.propose(views[0])
+    views[0], seconds = timed(rebalance.apply, views[0], moves)
+    shared_store.track("session-0", "data", views[0])
+    _, totals = shared_store.memory_report()
+    print(f"{'edit':>10}{totals['store_mb'] + totals['private_mb']:>12,.1f}{resident_mb() - base:>14,.1f}"
+          f"{seconds * 1000:>12,.1f}")
@@ -0,0 +1,44 @@
+"""
+Compares the legacy CSV TEXT storage of user datasets with the Arrow IPC BLOB format.
+
+Usage: python benchmarks/bench_storage.py [--rows 500000]
+"""
+import argparse
+import os
+import sqlite3
+import tempfile
+
+from common import make_delivery_frame, timed
+import auth
+import storage
+
+
+def run(rows):
+    df = make_delivery_frame(rows)
+    workdir = tempfile.mkdtemp()
+    os.chdir(workdir)
+    auth.create_usertable()
+
+    print(f"{'format':<8}{'save (s)':>12}{'load (s)':>12}{'size (MB)':>12}  dtypes kept")
+    for fmt in (storage.CSV_FORMAT, storage.ARROW_FORMAT):
+        user = f"bench_{fmt}"
+        _, save_time = timed(auth.save_user_data, user, df, "bench.csv", fmt)
+
+        conn = sqlite3.connect('users.db')
+        size = conn.execute('SELECT COALESCE(LENGTH(csv_content), 0) + COALESCE(LENGTH(data_blob), 0) '
+                            'FROM user_data_storage WHERE username = ?', (user,)).fetchone()[0]
+        conn.close()
+
+        # Load without the one-time CSV migration so both paths are measured as-is
+        storage.STORAGE_FORMAT, previous = fmt, storage.STORAGE_FORMAT
+        (loaded, _), load_time = timed(auth.get_user_data, user)
+        storage.STORAGE_FORMAT = previous
+
+        kept = (loaded.dtypes == df.dtypes).all()
+        print(f"{fmt:<8}{save_time:>12.3f}{load_time:>12.3f}{size / 1e6:>12.2f}  {kept}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=500_000)
+    run(parser.parse_args().rows)
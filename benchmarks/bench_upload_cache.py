@@ -0,0 +1,60 @@
+"""
+Upload processing with the normalized upload cache (upload_cache.py):
+  miss - hash the bytes + read + normalize + compact + write the cache entry
+  hit  - hash the bytes + read the cached (already compacted) Arrow file
+
+Saving to the user database is the same on both paths and not timed.
+
+Usage: python benchmarks/bench_upload_cache.py [--sizes 10000 100000 1000000]
+"""
+import argparse
+import io
+import os
+import tempfile
+
+os.environ.setdefault('LOGITRACK_CACHE_DIR', tempfile.mkdtemp())
+
+from common import make_delivery_frame, timed
+import compaction
+import ingest
+import storage
+import upload_cache
+
+MAPPING = {'ID NO.': 'ID NO.', 'NAME': 'NAME', 'EXPECTED DELIVERY DATE': 'EXPECTED DELIVERY DATE',
+           'ACTUAL DELIVERY DATE': 'ACTUAL DELIVERY DATE', 'RESPONSIBLE_PERSON': 'RESPONSIBLE_PERSON',
+           'PRIORITY': 'PRIORITY', 'STATUS': 'STATUS', 'NOTES': 'NOTES'}
+
+
+def make_upload(rows):
+    """A raw export as uploaded: text dates, no derived columns."""
+    df = make_delivery_frame(rows).drop(columns=["Duration", "Days Late", "Delivery Status"])
+    for col in ["EXPECTED DELIVERY DATE", "ACTUAL DELIVERY DATE"]:
+        df[col] = df[col].dt.strftime("%d-%m-%Y")
+    return io.BytesIO(df.to_csv(index=False).encode("utf-8"))
+
+
+def miss(file):
+    key = upload_cache.cache_key(file, MAPPING, variant='compacted')
+    report = {}
+    df = compaction.compact_frame(ingest.normalize_frame(ingest.read_file(file, "upload.csv"), MAPPING, report))
+    upload_cache.put_frame(key, df, report)
+    return df
+
+
+def hit(file):
+    path, _ = upload_cache.get(upload_cache.cache_key(file, MAPPING, variant='compacted'))
+    return storage.read_file_frame(path)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    args = parser.parse_args()
+
+    print(f"{'rows':>10}{'file (MB)':>11}{'miss (s)':>10}{'hit (s)':>10}{'speed-up':>10}")
+    for rows in args.sizes:
+        file = make_upload(rows)
+        _, miss_time = timed(miss, file)
+        _, hit_time = timed(hit, file)
+        print(f"{rows:>10,}{len(file.getvalue()) / 1e6:>11.1f}{miss_time:>10.2f}{hit_time:>10.2f}"
+              f"{miss_time / hit_time:>9.1f}x")
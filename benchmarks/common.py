@@ -0,0 +1,46 @@
+"""Shared helpers for the benchmark scripts."""
+import os
+import sys
+import time
+import numpy as np
+import pandas as pd
+
+# Make the app modules (auth, storage, ...) importable from the benchmarks folder
+FRONTEND_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'streamlit_frontend')
+if FRONTEND_DIR not in sys.path:
+    sys.path.insert(0, FRONTEND_DIR)
+
+import delivery_metrics
+
+AGENTS = ["James Wilson", "Sarah Davis", "Michael Brown", "Emily White", "David Miller",
+          "Jennifer Garcia", "Robert Martinez", "Linda Rodriguez", "Daniel King", "Nancy Scott"]
+STATUSES = ["Delivered", "Pending", "In Progress"]
+
+
+def make_delivery_frame(rows, seed=42):
+    """Builds a normalized delivery dataset of the given size, shaped like the app's saved data."""
+    rng = np.random.default_rng(seed)
+    expected = pd.Timestamp("2025-01-01") + pd.to_timedelta(rng.integers(0, 365, rows), unit="D")
+    delay = pd.to_timedelta(rng.integers(-2, 10, rows), unit="D")
+    actual = pd.Series(expected + delay)
+    actual[rng.random(rows) < 0.15] = pd.NaT
+
+    df = pd.DataFrame({
+        "ID NO.": np.arange(1001, 1001 + rows),
+        "NAME": rng.choice(["Office Chair - SKU 8821", "Monitor Stand - SKU 1102", "Wireless Keyboard"], rows),
+        "QUANTITY": rng.integers(1, 50, rows),
+        "STATUS": rng.choice(STATUSES, rows),
+        "TOT. AMT": rng.integers(500, 25000, rows).astype(float),
+        "EXPECTED DELIVERY DATE": expected,
+        "ACTUAL DELIVERY DATE": actual.values,
+        "RESPONSIBLE_PERSON": rng.choice(AGENTS, rows),
+        "NOTES": rng.choice(["Delivered to reception", "Delayed due to traffic", "", "Left at front desk"], rows),
+    })
+    return delivery_metrics.add_delivery_metrics(df)
+
+
+def timed(func, *args, **kwargs):
+    """Runs func once and returns (result, seconds)."""
+    start = time.perf_counter()
+    result = func(*args, **kwargs)
+    return result, time.perf_counter() - start
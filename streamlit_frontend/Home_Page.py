@@ -2,8 +2,16 @@ import streamlit as st
 import pandas as pd
 import io
 import json
-from datetime import timedelta
 import auth as auth_db 
+import delivery_metrics
+import dataset_state
+import ingest
+import compaction
+import storage
+import upload_cache
+import profiling
+import shared_store
+import write_behind
 import base64
 
 # --- PAGE SETUP ---
@@ -13,6 +21,7 @@ st.set_page_config(
     layout="wide",
     initial_sidebar_state="expanded"
 )
+profiling.start_run("Home")
 
 # --- CUSTOM CSS FOR PROFESSIONAL LOOK ---
 def local_css():
@@ -85,7 +94,7 @@ def display_logo():
 # --- AUTHENTICATION & INITIALIZATION ---
 local_css()
 auth_db.create_usertable()
-DATA_KEY = 'main_data_df'
+DATA_KEY = dataset_state.DATA_KEY
 
 if 'logged_in' not in st.session_state:
     st.session_state['logged_in'] = False
@@ -93,46 +102,26 @@ if 'username' not in st.session_state:
     st.session_state['username'] = ''
 
 auth_db.create_usertable()
-DATA_KEY = 'main_data_df'
+DATA_KEY = dataset_state.DATA_KEY
+DATE_REPORT_KEY = 'date_report'
+MEMORY_REPORT_KEY = 'memory_report'
 
 # --- DATA PROCESSING FUNCTION ---
-@st.cache_data
 def process_and_normalize_data(df_raw, mapping):
     """
     Renames columns and calculates Status, Days Late, and Priority based on dates.
+    Returns the frame and the date parse report (values that became NaT per column).
     """
-    rename_dict = {v: k for k, v in mapping.items() if v != "N/A"}
-    df = df_raw.rename(columns=rename_dict).copy()
+    df = ingest.rename_columns(df_raw, mapping)
+    report = {}
     
     try:
-        if "EXPECTED DELIVERY DATE" in df.columns:
-            df["EXPECTED DELIVERY DATE"] = pd.to_datetime(df["EXPECTED DELIVERY DATE"], dayfirst=True, errors='coerce')
-        if "ACTUAL DELIVERY DATE" in df.columns:
-            df["ACTUAL DELIVERY DATE"] = pd.to_datetime(df["ACTUAL DELIVERY DATE"], dayfirst=True, errors='coerce')
-        
-        if "EXPECTED DELIVERY DATE" in df.columns and "ACTUAL DELIVERY DATE" in df.columns:
-            # Calculate duration and status
-            df["Duration"] = df["ACTUAL DELIVERY DATE"] - df["EXPECTED DELIVERY DATE"]
-            df["Days Late"] = (df["Duration"].dt.total_seconds() / (60 * 60 * 24)).fillna(0)
-            
-            # Logic: Priority based on Days Late
-            def calculate_priority(days):
-                if days > 5: return "High"
-                if days > 0: return "Medium"
-                return "Low"
-            
-            # Update Priority and Status
-            df["PRIORITY"] = df["Days Late"].apply(calculate_priority)
-            df["Delivery Status"] = df["Duration"].apply(lambda x: "Late" if x > timedelta(days=0) else "On Time")
-            
-            # Handle Pending
-            mask_not_delivered = df["ACTUAL DELIVERY DATE"].isna()
-            df.loc[mask_not_delivered, "Delivery Status"] = "Pending"
-            df.loc[mask_not_delivered, "PRIORITY"] = "Medium" # Default for pending
+        # Duration, Days Late, PRIORITY and Delivery Status (pending rows -> "Pending" / Medium)
+        delivery_metrics.add_delivery_metrics(df, report=report)
             
     except Exception as e:
         st.error(f"Error processing dates: {e}")
-    return df
+    return df, report
 
 # ==========================================
 # AUTHENTICATION UI
@@ -155,11 +144,18 @@ if not st.session_state['logged_in']:
                 st.session_state['logged_in'] = True
                 st.session_state['username'] = username
                 
+                profiling.mark("login")
+                # Edits still queued from another session of this user are written first
+                write_behind.flush(username)
                 # --- LOAD SAVED DATA ON LOGIN ---
-                saved_data, saved_filename = auth_db.get_user_data(username)
-                if saved_data is not None:
-                    st.session_state[DATA_KEY] = saved_data
-                    st.session_state['current_file_name'] = saved_filename
+                # Only a handle (file name, row count, columns); pages load the columns they use
+                handle = auth_db.get_user_data_info(username)
+                if handle is not None:
+                    dataset_state.set_handle(handle)
+                else:
+                    saved_data, saved_filename = auth_db.get_user_data(username)
+                    if saved_data is not None:
+                        dataset_state.set_dataset(compaction.compact_frame(saved_data), saved_filename)
                 
                 st.success(f"Welcome back, {username}!")
                 st.rerun()
@@ -190,18 +186,38 @@ if not st.session_state['logged_in']:
 else:
     st.sidebar.title(f"👤 {st.session_state['username']}")
     if st.sidebar.button("Logout"):
+        write_behind.flush(st.session_state['username'])
         st.session_state['logged_in'] = False
         st.session_state['username'] = ''
         st.rerun()
+    write_behind.render_status(st.session_state['username'])
 
     st.markdown("<h1 style='color: #EE6C4D;'>📦 Delivery Progress Tracker</h1>", unsafe_allow_html=True)
     
-    has_data = DATA_KEY in st.session_state
+    has_data = dataset_state.has_dataset()
     
     if has_data:
         st.info(f"📁 **Currently Using:** `{st.session_state.get('current_file_name', 'Saved Progress')}`")
+        if st.session_state.get(DATA_KEY) is not None:
+            shared, private = shared_store.frame_memory(st.session_state[DATA_KEY])
+            st.caption(f"🧠 Dataset memory: {private / 1e6:,.1f} MB held by this session, "
+                       f"{shared / 1e6:,.1f} MB shared with other sessions")
+        # Dates that could not be read in the last upload (they were left blank)
+        date_report = st.session_state.get(DATE_REPORT_KEY)
+        if delivery_metrics.coerced_count(date_report):
+            details = ", ".join(f"{col}: {r['coerced']}" for col, r in date_report.items() if r['coerced'])
+            st.warning(f"⚠️ Some dates could not be read and were left blank ({details}).")
+        # Per-column memory before/after dtype compaction of the last upload
+        memory_report = st.session_state.get(MEMORY_REPORT_KEY)
+        if memory_report is not None:
+            with st.expander("🧮 Memory Usage by Column"):
+                before, after = memory_report['Before (KB)'].sum(), memory_report['After (KB)'].sum()
+                st.caption(f"{before / 1024:,.1f} MB as loaded → {after / 1024:,.1f} MB in this session")
+                st.dataframe(memory_report, use_container_width=True)
         if st.button("🔄 Upload a Different File"):
-            del st.session_state[DATA_KEY]
+            dataset_state.clear_dataset()
+            st.session_state.pop(DATE_REPORT_KEY, None)
+            st.session_state.pop(MEMORY_REPORT_KEY, None)
             st.rerun()
     else:
         st.markdown("Upload a dataset to begin or resume your work.")
@@ -209,18 +225,16 @@ else:
 
         if uploaded_file is not None:
             try:
-                if uploaded_file.name.endswith('.csv'):
-                    df_raw = pd.read_csv(uploaded_file)
-                else:
-                    df_raw = pd.read_excel(uploaded_file)
+                # Only the first rows are parsed until the mapping is confirmed
+                df_preview = ingest.read_preview(uploaded_file, uploaded_file.name)
                 
                 # --- DATA PREVIEW (FIRST 5 ENTRIES) ---
                 st.write("### 📄 Raw Data Preview (First 5 Rows)")
-                st.dataframe(df_raw.head(5), use_container_width=True)
+                st.dataframe(df_preview, use_container_width=True)
                 
                 with st.expander("🛠️ Column Mapping Configuration", expanded=True):
                     with st.form("mapping_form"):
-                        all_cols = ["N/A"] + df_raw.columns.tolist()
+                        all_cols = ["N/A"] + df_preview.columns.tolist()
                         col1, col2 = st.columns(2)
                         
                         def get_index(options, search_terms):
@@ -239,6 +253,13 @@ else:
                             map_status = st.selectbox("Order Status", all_cols, index=get_index(all_cols, ["STATUS"]))
                             map_notes = st.selectbox("Notes", all_cols, index=get_index(all_cols, ["NOTE", "REMARK"]))
 
+                        # Large files are processed chunk by chunk so memory stays bounded
+                        col_stream, col_chunk = st.columns(2)
+                        stream = col_stream.checkbox("⚡ Stream in chunks (large files)",
+                                                     value=uploaded_file.size > ingest.STREAM_THRESHOLD_BYTES)
+                        chunk_rows = col_chunk.number_input("Chunk size (rows)", min_value=1_000,
+                                                            value=ingest.CHUNK_ROWS, step=10_000)
+
                         if st.form_submit_button("✅ Confirm & Save"):
                             mapping = {
                                 'ID NO.': map_id, 'NAME': map_name,
@@ -246,11 +267,51 @@ else:
                                 'RESPONSIBLE_PERSON': map_agent, 'PRIORITY': map_priority,
                                 'STATUS': map_status, 'NOTES': map_notes
                             }
-                            df_processed = process_and_normalize_data(df_raw, mapping)
-                            
-                            st.session_state[DATA_KEY] = df_processed
-                            st.session_state['current_file_name'] = uploaded_file.name
-                            auth_db.save_user_data(st.session_state['username'], df_processed, uploaded_file.name)
+                            profiling.mark("process upload")
+                            # Queued edits of the previous dataset must not land on top of the new one
+                            write_behind.flush(st.session_state['username'])
+                            date_report, token = {}, None
+                            # Same file bytes, mapping and mode as an earlier upload: reuse its normalized
+                            # result. Kept compacted, or as the streamed file for streaming, so a hit
+                            # saves exactly what processing the upload again would save
+                            key = upload_cache.cache_key(uploaded_file, mapping, variant='streamed' if stream else 'compacted')
+                            cached = upload_cache.get(key)
+                            df_processed = df_compact = None
+                            if cached is not None:
+                                cache_path, date_report = cached
+                                try:
+                                    if not stream:
+                                        df_compact = storage.read_file_frame(cache_path)
+                                    token = auth_db.save_user_data_file(st.session_state['username'], cache_path, uploaded_file.name)
+                                except FileNotFoundError:
+                                    # Evicted by another session since get() (the save is rolled back): a miss
+                                    cached, date_report, df_compact = None, {}, None
+                            if cached is not None:
+                                if stream:
+                                    dataset_state.set_handle(auth_db.get_user_data_info(st.session_state['username']))
+                            elif stream:
+                                progress = st.progress(0.0, text="Processing...")
+                                ingest.stream_to_store(
+                                    uploaded_file, uploaded_file.name, mapping, st.session_state['username'], int(chunk_rows),
+                                    on_progress=lambda frac, rows: progress.progress(frac or 0.0, text=f"{rows:,} rows processed"),
+                                    date_report=date_report, cache_key=key)
+                                # Only a handle, as at login: pages load the columns they use, so memory
+                                # stays bounded after the upload as well (and there is no memory report)
+                                dataset_state.set_handle(auth_db.get_user_data_info(st.session_state['username']))
+                            else:
+                                df_raw = ingest.read_file(uploaded_file, uploaded_file.name)
+                                df_processed, date_report = process_and_normalize_data(df_raw, mapping)
+                                df_compact = compaction.compact_frame(df_processed)
+                                upload_cache.put_frame(key, df_compact, date_report)
+                                token = auth_db.save_user_data(st.session_state['username'], df_compact, uploaded_file.name, note='upload')
+
+                            if df_compact is not None:
+                                dataset_state.set_dataset(df_compact, uploaded_file.name, saved_token=token)
+                            if df_processed is not None:
+                                st.session_state[MEMORY_REPORT_KEY] = compaction.memory_report(df_processed, df_compact)
+                            else:
+                                st.session_state.pop(MEMORY_REPORT_KEY, None)
+                            st.session_state[DATE_REPORT_KEY] = date_report
                             
                             st.success("Data Saved Successfully!")
                             st.rerun()
@@ -258,8 +319,10 @@ else:
                 st.error(f"Error: {e}")
 
     st.markdown("---")
-    if DATA_KEY in st.session_state:
+    if dataset_state.has_dataset():
         st.page_link("pages/1_📊_Display_Data.py", label="📊 Display Data & Edit", icon="👀")
         st.page_link("pages/2_🧪_Data_Analysis.py", label="🧪 Data Analysis", icon="🔬")
         st.page_link("pages/3_📈_Graph_Plotting.py", label="📈 Graph Plotting", icon="📈")
         st.page_link("pages/4_⚠️_Tracking_Late_Delivery.py", label="⚠️ Tracking Late Deliveries", icon="🚨")
+
+profiling.render_panel()
@@ -0,0 +1,114 @@
+import threading
+from collections import OrderedDict
+import pandas as pd
+
+import analytics
+import profiling
+
+# --- VERSIONED AGGREGATE CACHE ---
+# Rollups are keyed by the dataset version token (dataset_state.version_token),
+# so they are computed once per dataset state and shared by every page and
+# rerun. Whole versions are evicted least-recently-used first.
+MAX_VERSIONS = 32
+
+_cache = OrderedDict()   # version token -> {rollup name: value}
+_lock = threading.Lock()
+_stats = {'hits': 0, 'misses': 0, 'evictions': 0}
+
+
+def get_or_compute(token, name, compute):
+    """Returns the cached rollup `name` for this dataset version, computing it on a miss."""
+    with _lock:
+        entries = _cache.get(token)
+        if entries is not None:
+            _cache.move_to_end(token)
+            if name in entries:
+                _stats['hits'] += 1
+                profiling.count('aggregate hits')
+                return entries[name]
+        _stats['misses'] += 1
+    profiling.count('aggregate misses')
+
+    value = compute()
+
+    with _lock:
+        _cache.setdefault(token, {})[name] = value
+        _cache.move_to_end(token)
+        while len(_cache) > MAX_VERSIONS:
+            _cache.popitem(last=False)
+            _stats['evictions'] += 1
+    return value
+
+
+def peek(token, name):
+    """The cached rollup `name` for this dataset version, or None; never computes and isn't counted."""
+    with _lock:
+        return _cache.get(token, {}).get(name)
+
+
+def cache_stats():
+    """Hit/miss/eviction counters plus the number of dataset versions held."""
+    with _lock:
+        return dict(_stats, versions=len(_cache))
+
+
+def clear():
+    with _lock:
+        _cache.clear()
+
+
+# --- ROLLUPS USED BY THE PAGES ---
+# Callers must treat the returned objects as read-only.
+
+def value_counts(df, token, col):
+    def compute():
+        counts = df[col].value_counts()
+        # Category columns also list categories with no rows
+        return counts[counts > 0] if isinstance(df[col].dtype, pd.CategoricalDtype) else counts
+
+    return get_or_compute(token, ('value_counts', col), compute)
+
+
+def column_sum(df, token, col):
+    return get_or_compute(token, ('sum', col), lambda: df[col].sum())
+
+
+def column_mean(df, token, col):
+    return get_or_compute(token, ('mean', col), lambda: df[col].mean())
+
+
+def describe(df, token):
+    return get_or_compute(token, ('describe',), lambda: df.describe())
+
+
+def breakdown(df, token, target_col, username=None, saved_token=None, load=None):
+    """
+    Volume / average delay / total amount per value of target_col, largest volume first.
+    With a username the grouping runs in that user's SQL analytics table when it
+    holds the save tagged saved_token (dataset_state.saved_token), falling back
+    to pandas otherwise. df only needs target_col for that fallback: if it lacks
+    the column, load() is called to get a frame that has it.
+    """
+    def compute():
+        frame = df
+        stats = analytics.breakdown_stats(username, target_col, saved_token) if username else None
+        if stats is not None and target_col in frame.columns and isinstance(frame[target_col].dtype, pd.CategoricalDtype):
+            # pandas lists category groups in category order, not alphabetically
+            categories = frame[target_col].cat.categories
+            stats = stats.reindex(categories[categories.isin(stats.index)]).rename_axis(target_col)
+        if stats is None:
+            if target_col not in frame.columns and load is not None:
+                frame = load()
+            agg_dict = {target_col: 'count'}
+            if 'Days Late' in frame.columns: agg_dict['Days Late'] = 'mean'
+            if 'Sales' in frame.columns: agg_dict['Sales'] = 'sum'
+            stats = frame.groupby(target_col, observed=True).agg(agg_dict)
+
+        stats = stats.rename(columns={
+            target_col: 'Volume (Order Count)',
+            'Days Late': 'Avg Delay (Days)',
+            'Sales': 'Total Amount (₹)'
+        }).reset_index()
+        return stats.sort_values(by='Volume (Order Count)', ascending=False)
+
+    return get_or_compute(token, ('breakdown', target_col), compute)
@@ -0,0 +1,280 @@
+import hashlib
+import json
+import sqlite3
+import uuid
+import numpy as np
+import pandas as pd
+
+import db
+import row_store
+
+# --- SQL ANALYTICS TABLE ---
+# The normalized rows of each user's dataset are mirrored into a SQLite table
+# next to the snapshot (kept in sync by auth's save functions, in the same
+# transaction). The Dimension Insights Explorer runs its GROUP BY there, so a
+# breakdown doesn't need the dataset in memory. Every text column gets an index
+# when the table is built, so reading a breakdown never writes.
+#
+# Every write of a table stamps it with a token: the session's dataset version
+# token (dataset_state.version_token) when the caller passes the state it saved,
+# a fresh random one otherwise. A session only uses the table while the token
+# matches the state it holds, so a table that lags behind or is ahead of the
+# session (a queued save, another session's edit) is never read for it.
+META_TABLE = 'analytics_tables'
+KEY_FIELD = '_row_key'     # row_store key as text, unique when the dataset has usable keys
+INSERT_BATCH_ROWS = 50_000
+INDEXED_DTYPES = ('object', 'category')   # the columns the explorer groups by
+
+
+def _quote(name):
+    return '"' + str(name).replace('"', '""') + '"'
+
+
+def table_name(username):
+    return 'analytics_' + hashlib.sha1(username.encode('utf-8')).hexdigest()[:16]
+
+
+def index_name(username, column):
+    return f'{table_name(username)}_{hashlib.sha1(str(column).encode("utf-8")).hexdigest()[:8]}'
+
+
+def _sql_type(dtype):
+    if pd.api.types.is_bool_dtype(dtype) or pd.api.types.is_integer_dtype(dtype):
+        return 'INTEGER'
+    if pd.api.types.is_float_dtype(dtype) or pd.api.types.is_timedelta64_dtype(dtype):
+        return 'REAL'
+    return 'TEXT'
+
+
+def _column_values(series):
+    """A column as a list of SQLite-ready Python values (None for missing)."""
+    missing = series.isna().to_numpy()
+    if pd.api.types.is_datetime64_any_dtype(series.dtype):
+        values = series.astype(str).to_numpy(dtype=object)
+    elif pd.api.types.is_timedelta64_dtype(series.dtype):
+        values = series.dt.total_seconds().to_numpy(dtype=object)
+    elif pd.api.types.is_numeric_dtype(series.dtype) or pd.api.types.is_bool_dtype(series.dtype):
+        values = series.to_numpy(dtype=object)
+    else:
+        values = series.astype(object).to_numpy()
+        text = np.array([isinstance(v, str) for v in values])
+        if not text[~missing].all():
+            # Numbers or dates typed into a text column are stored as text
+            values = series.astype(str).to_numpy(dtype=object)
+    values[missing] = None
+    return values.tolist()
+
+
+def _rows(df, keys):
+    columns = [keys if keys is not None else [None] * len(df)]
+    columns += [_column_values(df[col]) for col in df.columns]
+    return list(zip(*columns))
+
+
+def _drop(c, username):
+    c.execute(f'DROP TABLE IF EXISTS {_quote(table_name(username))}')
+    c.execute(f'DELETE FROM {META_TABLE} WHERE username = ?', (username,))
+
+
+def create_tables(c):
+    c.execute(f'CREATE TABLE IF NOT EXISTS {META_TABLE}(username TEXT PRIMARY KEY, table_name TEXT, '
+              'columns TEXT, row_count INTEGER, keyed INTEGER, token TEXT)')
+    if 'token' not in {row[1] for row in c.execute(f'PRAGMA table_info({META_TABLE})')}:
+        # Tables built before tokens existed never match a session until rebuilt
+        c.execute(f'ALTER TABLE {META_TABLE} ADD COLUMN token TEXT')
+
+
+def _new_token(token):
+    return token if token is not None else uuid.uuid4().hex
+
+
+def rebuild(c, username, frames, token=None):
+    """
+    Replaces the user's analytics table with the rows of `frames` (an iterable
+    of DataFrame chunks with the same columns), stamped with `token` (see
+    above). `c` is an open write transaction. Returns the token.
+    """
+    _drop(c, username)
+    name, columns, rows, keyed = _quote(table_name(username)), None, 0, True
+    for df in frames:
+        if columns is None:
+            columns = [(str(col), str(df[col].dtype)) for col in df.columns]
+            fields = ', '.join(f'{_quote(col)} {_sql_type(df[col].dtype)}' for col in df.columns)
+            c.execute(f'CREATE TABLE {name}({KEY_FIELD} TEXT, {fields})')
+            insert = f'INSERT INTO {name} VALUES ({", ".join("?" * (len(df.columns) + 1))})'
+        keys = row_store.row_keys(df)
+        keyed = keyed and keys is not None
+        for start in range(0, len(df), INSERT_BATCH_ROWS):
+            part = df.iloc[start:start + INSERT_BATCH_ROWS]
+            c.executemany(insert, _rows(part, None if keys is None else list(keys[start:start + len(part)])))
+        rows += len(df)
+    if columns is None:
+        return None
+
+    # Text columns can be explored (breakdown_stats); indexing them now keeps page loads read-only
+    for col, dtype in columns:
+        if dtype in INDEXED_DTYPES:
+            c.execute(f'CREATE INDEX {_quote(index_name(username, col))} ON {name}({_quote(col)})')
+    if keyed:
+        try:
+            c.execute(f'CREATE UNIQUE INDEX {_quote(table_name(username) + "_key")} ON {name}({KEY_FIELD})')
+        except sqlite3.IntegrityError:
+            keyed = False   # ids repeat across chunks
+    token = _new_token(token)
+    c.execute(f'INSERT INTO {META_TABLE}(username, table_name, columns, row_count, keyed, token) VALUES (?,?,?,?,?,?)',
+              (username, table_name(username), json.dumps(columns), rows, int(keyed), token))
+    return token
+
+
+def apply_changes(c, username, rows, deleted_keys, token=None):
+    """
+    Mirrors a row-level edit (see auth.save_user_changes) into the analytics
+    table: rows are upserted by key in place, deleted keys removed, and the
+    table is stamped with `token`. If the edit
+    doesn't fit the table (new columns, no usable keys), the table is dropped
+    and the explorer falls back to pandas until the next full save.
+    """
+    meta = _meta(c, username)
+    if meta is None:
+        return
+    columns = [col for col, _ in meta['columns']]
+    keys = row_store.row_keys(rows)
+    if not meta['keyed'] or keys is None or not set(map(str, rows.columns)) <= set(columns):
+        _drop(c, username)
+        return
+
+    name = _quote(table_name(username))
+    if deleted_keys:
+        c.executemany(f'DELETE FROM {name} WHERE {KEY_FIELD} = ?', [(k,) for k in deleted_keys])
+    if len(rows):
+        rows = rows.set_axis([str(col) for col in rows.columns], axis=1).reindex(columns=columns)
+        fields = ', '.join(_quote(col) for col in columns)
+        updates = ', '.join(f'{_quote(col)} = excluded.{_quote(col)}' for col in columns)
+        c.executemany(f'INSERT INTO {name}({KEY_FIELD}, {fields}) VALUES ({", ".join("?" * (len(columns) + 1))}) '
+                      f'ON CONFLICT({KEY_FIELD}) DO UPDATE SET {updates}', _rows(rows, list(keys)))
+    count = c.execute(f'SELECT COUNT(*) FROM {name}').fetchone()[0]
+    c.execute(f'UPDATE {META_TABLE} SET row_count = ?, token = ? WHERE username = ?',
+              (count, _new_token(token), username))
+
+
+def _meta(c, username):
+    row = c.execute(f'SELECT columns, row_count, keyed, token FROM {META_TABLE} WHERE username = ?',
+                    (username,)).fetchone()
+    if row is None:
+        return None
+    return {'columns': json.loads(row[0]), 'row_count': row[1], 'keyed': bool(row[2]), 'token': row[3]}
+
+
+def has_table(username):
+    with db.connect() as c:
+        return _meta(c, username) is not None
+
+
+def table_token(username):
+    """The token the user's analytics table is stamped with, or None if there is no table."""
+    with db.connect() as c:
+        meta = _meta(c, username)
+    return None if meta is None else meta['token']
+
+
+# --- PUSHED-DOWN AGGREGATES ---
+# pandas sums floats with Kahan compensation in row order; these aggregates do
+# the same (in the column's own float width) so the results match bit for bit.
+# The rows of a group are visited in table (rowid) order through the
+# single-column index on the grouped column, which rebuild() creates for every
+# text column; an index with more columns would reorder them.
+
+class _KahanSum:
+    dtype = float
+
+    def __init__(self):
+        self.total, self.compensation, self.count = self.dtype(0), self.dtype(0), 0
+
+    def step(self, value):
+        if value is None:
+            return
+        value = self.dtype(value)
+        y = value - self.compensation
+        t = self.total + y
+        self.compensation = t - self.total - y
+        if self.compensation != self.compensation:
+            self.compensation = self.dtype(0)
+        self.total = t
+        self.count += 1
+
+    def finalize(self):
+        return float(self.total)
+
+
+class _KahanMean(_KahanSum):
+    def finalize(self):
+        return float(self.total / self.dtype(self.count)) if self.count else None
+
+
+class _KahanSum32(_KahanSum):
+    dtype = np.float32
+
+
+class _KahanMean32(_KahanMean):
+    dtype = np.float32
+
+
+def _register(c):
+    c.create_aggregate('kahan_sum', 1, _KahanSum)
+    c.create_aggregate('kahan_mean', 1, _KahanMean)
+    c.create_aggregate('kahan_sum32', 1, _KahanSum32)
+    c.create_aggregate('kahan_mean32', 1, _KahanMean32)
+
+
+def _numpy_dtype(name):
+    try:
+        return np.dtype(name)
+    except TypeError:
+        return np.dtype(object)   # e.g. 'category'
+
+
+def breakdown_stats(username, target_col, token):
+    """
+    The explorer's per-value count of target_col, mean Days Late and total Sales,
+    computed in SQL; same frame as df.groupby(target_col, observed=True).agg(...).
+    Returns None if there is no usable table or it isn't stamped with `token`
+    (the save holding the caller's dataset state), so the caller can fall back
+    to pandas.
+    """
+    try:
+        with db.connect() as c:
+            meta = _meta(c, username)
+    except sqlite3.OperationalError:
+        return None   # database predates the analytics tables
+    if meta is None or token is None or meta['token'] != token:
+        return None
+    dtypes = {col: _numpy_dtype(dtype) for col, dtype in meta['columns']}
+    if target_col not in dtypes:
+        return None
+
+    name, key = _quote(table_name(username)), _quote(target_col)
+    selects, result_dtypes = [f'COUNT({key})'], {target_col: 'int64'}
+    for col, kind in (('Days Late', 'mean'), ('Sales', 'sum')):
+        if col not in dtypes:
+            continue
+        dtype = dtypes[col]
+        if dtype.kind not in 'iubf':
+            return None
+        if kind == 'sum' and dtype.kind != 'f':
+            selects.append(f'SUM({_quote(col)})')
+            result_dtypes[col] = 'int64'
+        else:
+            width = '32' if dtype == np.float32 else ''
+            selects.append(f'kahan_{kind}{width}({_quote(col)})')
+            result_dtypes[col] = 'float32' if width else 'float64'
+
+    index = index_name(username, target_col)
+    with db.connect() as c:
+        if c.execute("SELECT 1 FROM sqlite_master WHERE type = 'index' AND name = ?", (index,)).fetchone() is None:
+            return None   # not a text column, or a table built before rebuild() indexed them
+        _register(c)
+        rows = c.execute(f'SELECT {key}, {", ".join(selects)} FROM {name} INDEXED BY {_quote(index)} '
+                         f'WHERE {key} IS NOT NULL GROUP BY {key} ORDER BY {key}').fetchall()
+
+    stats = pd.DataFrame(rows, columns=['_key'] + list(result_dtypes))
+    return stats.set_index('_key').rename_axis(target_col).astype(result_dtypes)
@@ -1,77 +1,260 @@
-import sqlite3
-import pandas as pd
-import io
+import os
+import json
+import db
+import storage
+import row_store
+import analytics
+import history
+
+# Fold row deltas into a new snapshot once they pass this many rows (or 10% of the dataset)
+ROW_DELTA_COMPACT_MIN = 1000
+# Piece size used when streaming a dataset file into its BLOB
+BLOB_WRITE_BYTES = 4 * 1024 * 1024
 
 def create_usertable():
-    conn = sqlite3.connect('users.db')
-    c = conn.cursor()
-    # Create user table
-    c.execute('CREATE TABLE IF NOT EXISTS userstable(username TEXT, password TEXT)')
-    # Create data storage table (Stores user data as CSV strings)
-    c.execute('CREATE TABLE IF NOT EXISTS user_data_storage(username TEXT, csv_content TEXT, filename TEXT)')
-    conn.commit()
-    conn.close()
+    with db.transaction() as c:
+        # Create user table
+        c.execute('CREATE TABLE IF NOT EXISTS userstable(username TEXT, password TEXT)')
+        c.execute('CREATE INDEX IF NOT EXISTS idx_userstable_username ON userstable(username)')
+        # Create data storage table (csv_content holds legacy CSV rows, data_blob the columnar format)
+        c.execute('CREATE TABLE IF NOT EXISTS user_data_storage(username TEXT, csv_content TEXT, filename TEXT)')
+        c.execute('CREATE INDEX IF NOT EXISTS idx_user_data_storage_username ON user_data_storage(username)')
+        # Upgrade older databases with the binary storage columns
+        existing = {row[1] for row in c.execute('PRAGMA table_info(user_data_storage)')}
+        if 'data_blob' not in existing:
+            c.execute('ALTER TABLE user_data_storage ADD COLUMN data_blob BLOB')
+        if 'data_format' not in existing:
+            c.execute('ALTER TABLE user_data_storage ADD COLUMN data_format TEXT')
+        # Row-level edits applied on top of the saved snapshot, keyed by user + row id
+        c.execute('CREATE TABLE IF NOT EXISTS user_data_rows(username TEXT, row_key TEXT, seq INTEGER, op TEXT, payload TEXT, '
+                  'PRIMARY KEY(username, row_key))')
+        # Row count and column dtypes of each saved Arrow dataset, read at login without touching the BLOB
+        c.execute('CREATE TABLE IF NOT EXISTS user_data_info(username TEXT PRIMARY KEY, row_count INTEGER, columns TEXT)')
+        # Queryable copy of each user's rows for the explorer (see analytics.py)
+        analytics.create_tables(c)
+        # Past versions of each user's dataset, stored as deduplicated chunks (see history.py)
+        history.create_tables(c)
 
 def add_userdata(username, password):
-    conn = sqlite3.connect('users.db')
-    c = conn.cursor()
-    c.execute('INSERT INTO userstable(username, password) VALUES (?,?)', (username, password))
-    conn.commit()
-    conn.close()
+    with db.transaction() as c:
+        c.execute('INSERT INTO userstable(username, password) VALUES (?,?)', (username, password))
     return True
 
 def login_user(username, password):
-    conn = sqlite3.connect('users.db')
-    c = conn.cursor()
-    c.execute('SELECT * FROM userstable WHERE username =? AND password =?', (username, password))
-    data = c.fetchall()
-    conn.close()
-    return data
+    with db.connect() as c:
+        return c.execute('SELECT * FROM userstable WHERE username =? AND password =?', (username, password)).fetchall()
 
 def check_user_exists(username):
-    conn = sqlite3.connect('users.db')
-    c = conn.cursor()
-    c.execute('SELECT * FROM userstable WHERE username =?', (username,))
-    data = c.fetchall()
-    conn.close()
-    return data
+    with db.connect() as c:
+        return c.execute('SELECT * FROM userstable WHERE username =?', (username,)).fetchall()
 
 # --- NEW FUNCTIONS FOR PERSISTENCE ---
 
-def save_user_data(username, df, filename):
-    """Saves the dataframe as a CSV string in the database."""
-    conn = sqlite3.connect('users.db')
-    c = conn.cursor()
-    
-    # Convert DataFrame to CSV string
-    csv_str = df.to_csv(index=False)
-    
-    # Delete old data for this user if it exists
-    c.execute('DELETE FROM user_data_storage WHERE username = ?', (username,))
-    
-    # Insert new data
-    c.execute('INSERT INTO user_data_storage(username, csv_content, filename) VALUES (?,?,?)', 
-              (username, csv_str, filename))
-    
-    conn.commit()
-    conn.close()
+def _save_info(c, username, rows, columns):
+    c.execute('INSERT OR REPLACE INTO user_data_info(username, row_count, columns) VALUES (?,?,?)',
+              (username, rows, json.dumps(columns)))
+
+def _frame_columns(df):
+    return [(str(col), str(df[col].dtype)) for col in df.columns]
+
+def save_user_data(username, df, filename, fmt=None, note='', token=None):
+    """
+    Saves the dataframe in the database, as a compressed Arrow BLOB by default,
+    and records it as the user's next version (note describes it in the history).
+    token tags the saved state for the analytics table (see analytics.py);
+    returns the token it was saved with.
+    """
+    fmt = fmt or storage.STORAGE_FORMAT
+    if fmt == storage.CSV_FORMAT:
+        csv_str, blob = storage.encode_csv(df), None
+    else:
+        csv_str, blob = None, storage.encode_frame(df)
+    versioned = history.prepare([df])
+
+    # Serialization and chunking happen above, outside the write lock
+    with db.transaction() as c:
+        # Delete old data (and any pending row edits) for this user if it exists
+        c.execute('DELETE FROM user_data_storage WHERE username = ?', (username,))
+        c.execute('DELETE FROM user_data_rows WHERE username = ?', (username,))
+
+        # Insert new data
+        c.execute('INSERT INTO user_data_storage(username, csv_content, filename, data_blob, data_format) VALUES (?,?,?,?,?)',
+                  (username, csv_str, filename, blob, fmt))
+        if fmt == storage.ARROW_FORMAT:
+            _save_info(c, username, len(df), _frame_columns(df))
+        else:
+            c.execute('DELETE FROM user_data_info WHERE username = ?', (username,))
+        token = analytics.rebuild(c, username, [df], token)
+        history.record(c, username, versioned, filename, note)
+    return token
+
+def save_user_data_file(username, path, filename, note='upload', token=None):
+    """
+    Saves a dataset that was already encoded to an Arrow IPC file on disk
+    (storage.write_frames), copying it into the BLOB in pieces instead of
+    loading it into memory. Returns the analytics token, as save_user_data.
+    """
+    size = os.path.getsize(path)
+    rows, columns = storage.file_info(path)
+    versioned = history.prepare(lambda: storage.iter_file_frames(path))
+    with db.transaction() as c:
+        c.execute('DELETE FROM user_data_storage WHERE username = ?', (username,))
+        c.execute('DELETE FROM user_data_rows WHERE username = ?', (username,))
+        cur = c.execute('INSERT INTO user_data_storage(username, csv_content, filename, data_blob, data_format) '
+                        'VALUES (?,NULL,?,zeroblob(?),?)', (username, filename, size, storage.ARROW_FORMAT))
+        with c.blobopen('user_data_storage', 'data_blob', cur.lastrowid) as blob, open(path, 'rb') as f:
+            for piece in iter(lambda: f.read(BLOB_WRITE_BYTES), b''):
+                blob.write(piece)
+        _save_info(c, username, rows, columns)
+        token = analytics.rebuild(c, username, storage.iter_file_frames(path), token)
+        history.record(c, username, versioned, filename, note)
+    return token
+
+def save_user_changes(username, rows, ops, deleted_keys, row_count=None, token=None):
+    """
+    Persists only the rows changed in the editor (see row_store.editor_delta)
+    on top of the saved snapshot, in a single transaction. row_count is the
+    number of rows after the edit (unknown if None, then the next login loads
+    the whole dataset); token tags the state after the edit, as in save_user_data.
+    """
+    keys = row_store.row_keys(rows)
+    payloads = row_store.encode_rows(rows)
+
+    with db.transaction() as c:
+        seq = c.execute('SELECT COALESCE(MAX(seq), 0) FROM user_data_rows WHERE username = ?', (username,)).fetchone()[0]
+
+        records = [(username, k, seq + i + 1, op, p) for i, (k, op, p) in enumerate(zip(keys, ops, payloads))]
+        records += [(username, k, seq + len(records) + i + 1, row_store.OP_DELETE, None) for i, k in enumerate(deleted_keys)]
+        # Re-editing a row added earlier keeps it an insert (and its place in the order)
+        c.executemany("""
+            INSERT INTO user_data_rows(username, row_key, seq, op, payload) VALUES (?,?,?,?,?)
+            ON CONFLICT(username, row_key) DO UPDATE SET
+                payload = excluded.payload,
+                op = CASE WHEN user_data_rows.op = 'insert' AND excluded.op = 'update' THEN 'insert' ELSE excluded.op END,
+                seq = CASE WHEN excluded.op = 'insert' THEN excluded.seq ELSE user_data_rows.seq END
+        """, records)
+        analytics.apply_changes(c, username, rows, deleted_keys, token)
+        if row_count is None:
+            c.execute('DELETE FROM user_data_info WHERE username = ?', (username,))
+        else:
+            c.execute('UPDATE user_data_info SET row_count = ? WHERE username = ?', (row_count, username))
+
+def save_version(username, df, filename, note='edit'):
+    """
+    Records df as the user's next version after an edit saved as row deltas
+    (save_user_changes); only the chunks the edit touched are stored anew.
+    """
+    versioned = history.prepare([df])
+    with db.transaction() as c:
+        return history.record(c, username, versioned, filename, note)
+
+def compact_deltas(username):
+    """
+    Folds the user's pending row edits into a fresh snapshot once they pass
+    ROW_DELTA_COMPACT_MIN rows (or 10% of the dataset), so loads stop replaying
+    them. The data itself doesn't change: no version is recorded and the
+    analytics table is kept. Returns True if it compacted.
+    """
+    with db.connect() as c:
+        pending = c.execute('SELECT COUNT(*) FROM user_data_rows WHERE username = ?', (username,)).fetchone()[0]
+    if pending <= ROW_DELTA_COMPACT_MIN:
+        return False
+
+    # Decoded and encoded outside the write lock; the deltas are checked again before swapping
+    with db.transaction(immediate=False) as c:
+        result = c.execute('SELECT rowid, data_blob, data_format FROM user_data_storage WHERE username = ?',
+                           (username,)).fetchone()
+        deltas = c.execute('SELECT row_key, op, payload FROM user_data_rows WHERE username = ? ORDER BY seq',
+                           (username,)).fetchall()
+    if result is None or result[2] != storage.ARROW_FORMAT:
+        return False
+    df = row_store.apply_deltas(storage.decode_frame(result[1]), deltas)
+    if len(deltas) <= max(ROW_DELTA_COMPACT_MIN, len(df) // 10):
+        return False
+    blob = storage.encode_frame(df)
+
+    with db.transaction() as c:
+        current = c.execute('SELECT row_key, op, payload FROM user_data_rows WHERE username = ? ORDER BY seq',
+                            (username,)).fetchall()
+        stored = c.execute('SELECT rowid FROM user_data_storage WHERE username = ?', (username,)).fetchone()
+        if current != deltas or stored is None or stored[0] != result[0]:
+            return False   # saved again meanwhile; the next write tries again
+        c.execute('UPDATE user_data_storage SET data_blob = ? WHERE rowid = ?', (blob, result[0]))
+        c.execute('DELETE FROM user_data_rows WHERE username = ?', (username,))
+        _save_info(c, username, len(df), _frame_columns(df))
+    return True
 
 def get_user_data(username):
-    """Retrieves the saved CSV string and converts it back to a DataFrame."""
-    conn = sqlite3.connect('users.db')
-    c = conn.cursor()
-    c.execute('SELECT csv_content, filename FROM user_data_storage WHERE username = ?', (username,))
-    result = c.fetchone()
-    conn.close()
-    
+    """Retrieves the saved dataset, applies pending row edits and converts it back to a DataFrame."""
+    # One read transaction so the snapshot and its deltas are consistent
+    with db.transaction(immediate=False) as c:
+        result = c.execute('SELECT csv_content, data_blob, data_format, filename FROM user_data_storage WHERE username = ?',
+                           (username,)).fetchone()
+        deltas = c.execute('SELECT row_key, op, payload FROM user_data_rows WHERE username = ? ORDER BY seq',
+                           (username,)).fetchall()
+
     if result:
-        csv_str, filename = result
-        # Convert CSV string back to DataFrame
-        df = pd.read_csv(io.StringIO(csv_str))
-        # Important: Restore date columns
-        for col in ["EXPECTED DELIVERY DATE", "ACTUAL DELIVERY DATE"]:
-            if col in df.columns:
-                df[col] = pd.to_datetime(df[col])
+        csv_str, blob, fmt, filename = result
+        if fmt == storage.ARROW_FORMAT:
+            df = row_store.apply_deltas(storage.decode_frame(blob), deltas)
+            if not analytics.has_table(username):
+                # Saved before the analytics table existed (or dropped by an edit it couldn't mirror)
+                with db.transaction() as c:
+                    analytics.rebuild(c, username, [df])
+            if get_user_data_info(username) is None:
+                # Saved before row counts were recorded, or after an edit of unknown size
+                with db.transaction() as c:
+                    _save_info(c, username, len(df), _frame_columns(df))
+            return df, filename
+
+        # Legacy CSV row: parse it, then migrate it to the binary format
+        df = row_store.apply_deltas(storage.decode_csv(csv_str), deltas)
+        if storage.STORAGE_FORMAT == storage.ARROW_FORMAT or deltas:
+            save_user_data(username, df, filename)
         return df, filename
-    
+
     return None, None
+
+def get_user_data_info(username):
+    """
+    The lightweight handle of a saved Arrow dataset: {'username', 'filename',
+    'rows', 'columns' ([name, dtype] pairs), 'token' (of the analytics table,
+    None without one)}, or None if there is none (no data, legacy CSV, or an
+    edit of unknown size since the last load).
+    """
+    with db.connect() as c:
+        row = c.execute('SELECT s.filename, i.row_count, i.columns, a.token FROM user_data_info i '
+                        'JOIN user_data_storage s ON s.username = i.username '
+                        f'LEFT JOIN {analytics.META_TABLE} a ON a.username = i.username WHERE i.username = ?',
+                        (username,)).fetchone()
+    if row is None or row[1] is None:
+        return None
+    return {'username': username, 'filename': row[0], 'rows': row[1], 'columns': json.loads(row[2]),
+            'token': row[3]}
+
+def get_user_columns(username, columns):
+    """
+    Loads only `columns` of the saved Arrow dataset, with pending row edits applied.
+    Only the BLOB pages holding those columns are read and decompressed. A legacy
+    CSV row is loaded whole (get_user_data); None if the user has no saved data.
+    """
+    with db.transaction(immediate=False) as c:
+        row = c.execute('SELECT rowid, data_format FROM user_data_storage WHERE username = ?', (username,)).fetchone()
+        if row is not None and row[1] == storage.ARROW_FORMAT:
+            deltas = c.execute('SELECT row_key, op, payload FROM user_data_rows WHERE username = ? ORDER BY seq',
+                               (username,)).fetchall()
+            # Deltas are matched to rows by key, so the key column comes along when there are any
+            load = list(columns)
+            if deltas and row_store.KEY_COLUMN not in load:
+                load.append(row_store.KEY_COLUMN)
+            with c.blobopen('user_data_storage', 'data_blob', row[0], readonly=True) as blob:
+                df = storage.decode_columns(storage.blob_source(blob), load)
+    if row is None:
+        return None
+    if row[1] == storage.ARROW_FORMAT:
+        df = row_store.apply_deltas(df, deltas)
+    else:
+        df, _ = get_user_data(username)
+        if df is None:
+            return None   # deleted meanwhile
+    return df[[col for col in columns if col in df.columns]]
@@ -0,0 +1,88 @@
+import numpy as np
+import pandas as pd
+
+import row_store
+
+# --- DTYPE COMPACTION ---
+# Text columns that repeat a handful of values (STATUS, RESPONSIBLE_PERSON,
+# Region, Ship Mode, ...) become `category` (one small integer code per row plus
+# the distinct values once), and numeric columns are downcast where every value
+# survives the cast. The Arrow storage keeps these dtypes, so a saved dataset
+# comes back compact.
+CATEGORY_MAX_RATIO = 0.5      # at most this many distinct values per row
+CATEGORY_MAX_UNIQUE = 10_000
+MIN_INT_DTYPE = np.int32      # smallest integer type used, leaves room for edits
+
+
+def _categorize(col):
+    """Returns col as a category if it is repetitive text, otherwise None."""
+    if col.dtype != object or len(col) == 0:
+        return None
+    n_unique = col.nunique(dropna=True)
+    if n_unique > CATEGORY_MAX_UNIQUE or n_unique > CATEGORY_MAX_RATIO * len(col):
+        return None
+    try:
+        return col.astype('category')
+    except TypeError:
+        # Mixed values that can't be ordered (e.g. numbers and text typed into the editor)
+        return None
+
+
+def _downcast(col):
+    """Returns col with a smaller numeric dtype if no value changes, otherwise None."""
+    if pd.api.types.is_bool_dtype(col.dtype):
+        return None
+    if pd.api.types.is_integer_dtype(col.dtype):
+        if col.dtype.itemsize <= np.dtype(MIN_INT_DTYPE).itemsize:
+            return None
+        info = np.iinfo(MIN_INT_DTYPE)
+        if len(col) and (col.min() < info.min or col.max() > info.max):
+            return None
+        return col.astype(MIN_INT_DTYPE)
+    if col.dtype == np.float64:
+        small = col.astype(np.float32)
+        # Only when it is exact: amounts like 261.96 keep float64 so sums don't drift
+        same = (small.astype(np.float64) == col) | col.isna()
+        return small if same.all() else None
+    return None
+
+
+def compact_frame(df, columns=None):
+    """
+    Returns df with repetitive text as categories and numbers downcast (df
+    itself is not changed). `columns` limits this to some columns (default all).
+    """
+    changed = {}
+    for name in (df.columns if columns is None else columns):
+        if name == row_store.KEY_COLUMN:
+            continue
+        col = df[name]
+        new = _categorize(col) if col.dtype == object else _downcast(col)
+        if new is not None:
+            changed[name] = new
+    if not changed:
+        return df
+    # Shallow copy: the columns that stay as they are are not copied
+    out = df.copy(deep=False)
+    for name, col in changed.items():
+        out[name] = col
+    return out
+
+
+def expand_categories(df):
+    """Returns df with category columns turned back into plain values (e.g. so the editor accepts new ones)."""
+    cats = [name for name in df.columns if isinstance(df[name].dtype, pd.CategoricalDtype)]
+    return df.astype({name: object for name in cats}) if cats else df
+
+
+def memory_report(before, after):
+    """Per-column memory use (bytes) and dtype before and after compaction, largest saving first."""
+    report = pd.DataFrame({
+        'Dtype Before': before.dtypes.astype(str),
+        'Dtype After': after.dtypes.reindex(before.columns).astype(str),
+        'Before (KB)': before.memory_usage(index=False, deep=True) / 1024,
+        'After (KB)': after.memory_usage(index=False, deep=True).reindex(before.columns) / 1024,
+    })
+    report['Saved (%)'] = (1 - report['After (KB)'] / report['Before (KB)']).fillna(0) * 100
+    report.index.name = 'Column'
+    return report.sort_values('Before (KB)', ascending=False).round(1)
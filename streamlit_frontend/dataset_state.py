@@ -0,0 +1,190 @@
+import uuid
+import pandas as pd
+import streamlit as st
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+import auth
+import compaction
+import shared_store
+
+# --- SESSION DATASET ---
+# The working DataFrame lives in st.session_state[DATA_KEY]. Every change goes
+# through set_dataset / update_dataset so the version counter always moves with
+# it; pages use the version instead of comparing whole frames.
+#
+# At login only a handle to the saved dataset is installed (HANDLE_KEY: file
+# name, row count, column dtypes, see auth.get_user_data_info). Read-only pages
+# ask for the columns they use and get a frame of just those, loaded from the
+# database the first time each is needed (PARTIAL_KEY). The whole dataset is
+# loaded once a page asks for all columns, e.g. to edit it.
+#
+# A loaded or uploaded dataset is put in the process-wide shared store
+# (shared_store.py): sessions with the same data hold views of one memory-mapped
+# copy, and an edit copies only the columns it changes.
+#
+# SAVED_KEY remembers which save holds exactly the current state (the token it
+# was tagged with, see analytics.py), so the explorer can query the SQL
+# analytics table instead of the frame once that save is written.
+DATA_KEY = 'main_data_df'
+FILE_KEY = 'current_file_name'
+DATASET_ID_KEY = 'dataset_id'
+VERSION_KEY = 'data_version'
+HANDLE_KEY = 'dataset_handle'
+PARTIAL_KEY = 'dataset_partial'
+CHANGED_ROWS_KEY = 'data_changed_rows'
+SAVED_KEY = 'dataset_saved_as'
+
+
+def _load_columns(handle, columns):
+    partial = st.session_state.get(PARTIAL_KEY)
+    missing = [col for col in columns if partial is None or col not in partial.columns]
+    if not missing:
+        return partial
+    loaded = auth.get_user_columns(handle['username'], missing)
+    if loaded is not None and partial is not None and len(loaded) != len(partial):
+        # The saved rows changed in another session since the first columns were loaded
+        partial, loaded = None, auth.get_user_columns(handle['username'], list(partial.columns) + missing)
+    if loaded is None:
+        # The saved dataset was deleted since login
+        st.session_state.pop(HANDLE_KEY, None)
+        st.session_state.pop(PARTIAL_KEY, None)
+        return None
+    loaded = compaction.compact_frame(loaded)
+    if partial is not None:
+        loaded = pd.concat([partial, loaded], axis=1)
+    st.session_state[PARTIAL_KEY] = loaded
+    _track(PARTIAL_KEY, loaded)
+    return loaded
+
+
+def _track(name, df):
+    ctx = get_script_run_ctx()
+    if ctx is not None:
+        shared_store.track(ctx.session_id, name, df)
+
+
+def get_dataset(columns=None):
+    """
+    The working frame. Pages that only read some columns pass them as `columns`:
+    while the dataset is still a login handle they get a frame with those (and
+    any loaded earlier) instead of the whole dataset; names the dataset doesn't
+    have are ignored. Without `columns` the whole dataset is loaded.
+    """
+    df = st.session_state.get(DATA_KEY)
+    handle = st.session_state.get(HANDLE_KEY)
+    if df is not None or handle is None:
+        return df
+
+    if columns is None:
+        df, _ = auth.get_user_data(handle['username'])
+        st.session_state.pop(HANDLE_KEY, None)
+        st.session_state.pop(PARTIAL_KEY, None)
+        if df is not None:
+            df = st.session_state[DATA_KEY] = shared_store.share(compaction.compact_frame(df))
+            _track(DATA_KEY, df)
+        return df
+
+    names = [col for col, _ in handle['columns']]
+    wanted = [col for col in columns if col in names]
+    if not wanted and PARTIAL_KEY not in st.session_state:
+        return pd.DataFrame(index=pd.RangeIndex(handle['rows']))
+    return _load_columns(handle, wanted)
+
+
+def column_dtypes():
+    """{column: dtype name} of the whole dataset, without loading it if it is still a handle."""
+    df = st.session_state.get(DATA_KEY)
+    if df is not None:
+        return {col: str(dtype) for col, dtype in df.dtypes.items()}
+    handle = st.session_state.get(HANDLE_KEY)
+    return {} if handle is None else dict(handle['columns'])
+
+
+def has_dataset():
+    return DATA_KEY in st.session_state or HANDLE_KEY in st.session_state
+
+
+def set_handle(handle):
+    """Installs a saved dataset at login without loading it (new dataset id, version 0)."""
+    clear_dataset()
+    st.session_state[HANDLE_KEY] = handle
+    st.session_state[DATASET_ID_KEY] = uuid.uuid4().hex
+    st.session_state[VERSION_KEY] = 0
+    st.session_state[FILE_KEY] = handle['filename']
+    _mark_saved(handle.get('token'))
+
+
+def set_dataset(df, filename=None, saved_token=None):
+    """
+    Installs a newly uploaded or loaded dataset (new dataset id, version 0),
+    shared with other sessions. saved_token is the token of the save holding df, if any.
+    """
+    clear_dataset()
+    df = st.session_state[DATA_KEY] = shared_store.share(df)
+    _track(DATA_KEY, df)
+    st.session_state[DATASET_ID_KEY] = uuid.uuid4().hex
+    st.session_state[VERSION_KEY] = 0
+    if filename is not None:
+        st.session_state[FILE_KEY] = filename
+    _mark_saved(saved_token)
+
+
+def update_dataset(df, changed_rows=None):
+    """
+    Replaces the working frame after an edit and bumps the version.
+    changed_rows are the positions of the rows the edit changed or added, if
+    known (not after deletions), so indexes can be updated instead of rebuilt.
+    """
+    st.session_state[DATA_KEY] = df
+    _track(DATA_KEY, df)
+    st.session_state[VERSION_KEY] = get_version() + 1
+    st.session_state[CHANGED_ROWS_KEY] = changed_rows
+
+
+def clear_dataset():
+    for key in (DATA_KEY, DATASET_ID_KEY, VERSION_KEY, HANDLE_KEY, PARTIAL_KEY, CHANGED_ROWS_KEY, SAVED_KEY):
+        st.session_state.pop(key, None)
+    _track(DATA_KEY, None)
+    _track(PARTIAL_KEY, None)
+
+
+def get_version():
+    return st.session_state.get(VERSION_KEY, 0)
+
+
+def changed_rows():
+    """Positions of the rows changed by the edit that made the current version, or None if unknown."""
+    return st.session_state.get(CHANGED_ROWS_KEY)
+
+
+def previous_token():
+    """Version token of the state before the last edit (None for a fresh dataset)."""
+    if get_version() == 0 or DATASET_ID_KEY not in st.session_state:
+        return None
+    return f"{st.session_state[DATASET_ID_KEY]}:{get_version() - 1}"
+
+
+def version_token():
+    """Identifies the exact dataset state: unique per upload/load and per edit."""
+    if DATASET_ID_KEY not in st.session_state:
+        # Frame installed before versioning existed in this session
+        st.session_state[DATASET_ID_KEY] = uuid.uuid4().hex
+    return f"{st.session_state[DATASET_ID_KEY]}:{get_version()}"
+
+
+def _mark_saved(token):
+    if token is not None:
+        st.session_state[SAVED_KEY] = (version_token(), token)
+
+
+def save_token():
+    """Token to tag a save of the current state with (its version token); remembered as that state's save."""
+    token = version_token()
+    _mark_saved(token)
+    return token
+
+
+def saved_token():
+    """Token of the save holding exactly the current state, or None (edited since, or never saved)."""
+    saved = st.session_state.get(SAVED_KEY)
+    return saved[1] if saved is not None and saved[0] == version_token() else None
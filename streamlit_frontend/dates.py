@@ -0,0 +1,128 @@
+import numpy as np
+import pandas as pd
+
+# --- DATE NORMALIZATION ---
+# pd.to_datetime without a format falls back to per-element dateutil parsing on
+# mixed data. Instead, the format of each column is inferred once from a sample
+# (the candidate that parses most of it) and the column's distinct values are
+# parsed with it (fast path); only values that fail are retried with the other
+# candidate formats. Fallbacks keep the column's day/month order, so one column
+# is never read both day-first and month-first: the caller's preference
+# (dayfirst) sets that order unless no format in it parses any of the column.
+SAMPLE_SIZE = 500
+
+DAY_FIRST_FORMATS = ['%d-%m-%Y', '%d/%m/%Y', '%d.%m.%Y', '%d-%m-%y', '%d/%m/%y', '%d.%m.%y']
+MONTH_FIRST_FORMATS = ['%m-%d-%Y', '%m/%d/%Y', '%m-%d-%y', '%m/%d/%y']
+OTHER_FORMATS = ['%Y-%m-%d', '%Y-%m-%d %H:%M:%S', '%Y-%m-%dT%H:%M:%S', '%Y/%m/%d',
+                 '%d %b %Y', '%d-%b-%Y', '%d-%b-%y', '%b %d, %Y']
+
+
+def candidate_formats(dayfirst=True):
+    if dayfirst:
+        return OTHER_FORMATS[:1] + DAY_FIRST_FORMATS + MONTH_FIRST_FORMATS + OTHER_FORMATS[1:]
+    return OTHER_FORMATS[:1] + MONTH_FIRST_FORMATS + DAY_FIRST_FORMATS + OTHER_FORMATS[1:]
+
+
+def field_order(fmt):
+    """'day' or 'month' for numeric formats that put that field first, None for unambiguous ones."""
+    if fmt in DAY_FIRST_FORMATS:
+        return 'day'
+    if fmt in MONTH_FIRST_FORMATS:
+        return 'month'
+    return None
+
+
+def column_dayfirst(formats, dayfirst=True):
+    """Whether a column read with `formats` (see rank_formats) is day-first."""
+    orders = [field_order(fmt) for fmt in formats if field_order(fmt)]
+    return orders[0] == 'day' if orders else dayfirst
+
+
+def _parse(values, fmt):
+    return pd.to_datetime(values, format=fmt, errors='coerce', cache=False)
+
+
+def rank_formats(series, dayfirst=True, sample_size=SAMPLE_SIZE):
+    """
+    Candidate formats that parse part of a sample of the column, the one that
+    parses the most first: it is the column's format, and the others are only
+    tried on values it fails on. Only formats in one day/month order are kept:
+    the preferred one (dayfirst) if any of its formats parse part of the sample,
+    so ambiguous values like 05-06-25 are read the way the caller asked.
+    """
+    values = series.dropna()
+    values = values[values.astype(str).str.strip() != '']
+    if values.empty:
+        return []
+    sample = values.sample(min(sample_size, len(values)), random_state=0)
+    hits = [(int(_parse(sample, fmt).notna().sum()), fmt) for fmt in candidate_formats(dayfirst)]
+    # sorted() is stable: equal counts stay in preference order
+    ranked = [fmt for count, fmt in sorted(hits, key=lambda hit: -hit[0]) if count]
+    orders = {field_order(fmt) for fmt in ranked} - {None}
+    order = 'day' if dayfirst else 'month'
+    if order not in orders and orders:
+        order = orders.pop()
+    return [fmt for fmt in ranked if field_order(fmt) in (None, order)]
+
+
+def parse_dates(series, dayfirst=True, formats=None):
+    """
+    Parses a column of dates. Returns (parsed series, report) where report has
+    the formats used, how many values were parsed by the first format, by fallbacks,
+    and how many non-blank values could not be parsed and became NaT ("coerced").
+    Pass `formats` (e.g. from an earlier chunk's report) to skip inference.
+    """
+    if pd.api.types.is_datetime64_any_dtype(series):
+        return series, {'formats': [], 'parsed': int(series.notna().sum()), 'fallback': 0, 'coerced': 0}
+
+    # Dates repeat a lot (one value per day), so only the distinct values are parsed
+    codes, uniques = pd.factorize(series)
+    uniques = pd.Series(uniques, dtype=object)
+    weights = np.bincount(codes[codes >= 0], minlength=len(uniques))
+    blank = (uniques.astype(str).str.strip() == '').to_numpy()
+    formats = formats if formats is not None else rank_formats(uniques[~blank], dayfirst)
+
+    out = np.full(len(uniques), np.datetime64('NaT'), dtype='datetime64[ns]')
+    todo = np.flatnonzero(~blank)
+    counts = []
+    for fmt in formats:
+        if not len(todo):
+            break
+        # Each later format only sees the values the earlier ones could not parse
+        attempt = _parse(uniques.iloc[todo], fmt)
+        ok = attempt.notna().to_numpy()
+        out[todo[ok]] = attempt.to_numpy(dtype='datetime64[ns]')[ok]
+        counts.append(int(weights[todo[ok]].sum()))
+        todo = todo[~ok]
+
+    # Whatever no candidate format understood gets one last generic attempt, in the column's order
+    fallback_generic = 0
+    if len(todo):
+        rest = pd.to_datetime(uniques.iloc[todo], dayfirst=column_dayfirst(formats, dayfirst),
+                              errors='coerce', format='mixed')
+        ok = rest.notna().to_numpy()
+        out[todo[ok]] = rest.to_numpy(dtype='datetime64[ns]')[ok]
+        fallback_generic = int(weights[todo[ok]].sum())
+        todo = todo[~ok]
+
+    values = np.where(codes >= 0, out[np.maximum(codes, 0)], np.datetime64('NaT'))
+    parsed = pd.Series(values, index=series.index, name=series.name)
+    report = {
+        'formats': formats,
+        'parsed': counts[0] if counts else 0,
+        'fallback': sum(counts[1:]) + fallback_generic,
+        'coerced': int(weights[todo].sum()),
+    }
+    return parsed, report
+
+
+def merge_reports(total, report):
+    """Adds one chunk's report into a running total (keeps the first formats found)."""
+    if not total:
+        total.update(report)
+        return total
+    if not total['formats']:
+        total['formats'] = report['formats']
+    for key in ('parsed', 'fallback', 'coerced'):
+        total[key] += report[key]
+    return total
@@ -0,0 +1,204 @@
+import os
+import queue
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+import profiling
+
+# --- CONNECTION SETTINGS ---
+DB_PATH = os.environ.get('LOGITRACK_DB_PATH', 'users.db')
+POOL_SIZE = 8                # idle connections kept for reuse
+BUSY_TIMEOUT_MS = 30000      # how long a writer waits for the lock before failing
+USE_WAL = True
+
+PRAGMAS = [
+    'PRAGMA synchronous = NORMAL',   # safe with WAL, avoids an fsync per commit
+    'PRAGMA cache_size = -65536',    # 64 MB page cache per connection
+    'PRAGMA temp_store = MEMORY',
+    'PRAGMA foreign_keys = ON',
+]
+
+
+# --- PROFILED CONNECTIONS ---
+# Used instead of plain connections when profiling is on: every statement,
+# fetch and BLOB read/write is timed and sized for the profiler panel.
+class ProfiledCursor(sqlite3.Cursor):
+    def execute(self, sql, parameters=()):
+        start = time.perf_counter()
+        super().execute(sql, parameters)
+        profiling.record_query(sql, time.perf_counter() - start, bytes_written=profiling.row_bytes(parameters))
+        return self
+
+    def executemany(self, sql, seq_of_parameters):
+        rows = list(seq_of_parameters)
+        start = time.perf_counter()
+        super().executemany(sql, rows)
+        profiling.record_query(sql, time.perf_counter() - start, bytes_written=profiling.row_bytes(rows))
+        return self
+
+    def _fetch(self, fetch, *args):
+        start = time.perf_counter()
+        result = fetch(*args)
+        rows = [result] if isinstance(result, tuple) else result
+        profiling.record_query(None, time.perf_counter() - start, bytes_read=profiling.row_bytes(rows), statements=0)
+        return result
+
+    def fetchone(self):
+        return self._fetch(super().fetchone)
+
+    def fetchmany(self, size=None):
+        return self._fetch(super().fetchmany, size or self.arraysize)
+
+    def fetchall(self):
+        return self._fetch(super().fetchall)
+
+
+class ProfiledBlob:
+    """Wraps a sqlite3.Blob, counting the bytes and time of reads and writes."""
+
+    def __init__(self, blob):
+        self._blob = blob
+
+    def __enter__(self):
+        self._blob.__enter__()
+        return self
+
+    def __exit__(self, *exc):
+        return self._blob.__exit__(*exc)
+
+    def __len__(self):
+        return len(self._blob)
+
+    def read(self, length=-1):
+        start = time.perf_counter()
+        data = self._blob.read(length)
+        profiling.record_query(None, time.perf_counter() - start, bytes_read=len(data), statements=0)
+        return data
+
+    def write(self, data):
+        start = time.perf_counter()
+        self._blob.write(data)
+        profiling.record_query(None, time.perf_counter() - start, bytes_written=len(data), statements=0)
+
+    def seek(self, offset, origin=0):
+        self._blob.seek(offset, origin)
+
+    def tell(self):
+        return self._blob.tell()
+
+    def close(self):
+        self._blob.close()
+
+
+class ProfiledConnection(sqlite3.Connection):
+    def cursor(self, factory=ProfiledCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+    def blobopen(self, *args, **kwargs):
+        return ProfiledBlob(super().blobopen(*args, **kwargs))
+
+
+class ConnectionPool:
+    """
+    Thread-safe pool of SQLite connections to one database file.
+    Streamlit runs every session (and rerun) on its own thread, so connections
+    are handed out per call and returned afterwards instead of being tied to a thread.
+    """
+
+    def __init__(self, path, size=POOL_SIZE, wal=USE_WAL):
+        self.path = path
+        self.size = size
+        self.wal = wal
+        self._idle = queue.LifoQueue()
+
+    def _connect(self):
+        # isolation_level=None: we issue BEGIN/COMMIT ourselves, reads run in autocommit
+        conn = sqlite3.connect(self.path, timeout=BUSY_TIMEOUT_MS / 1000, isolation_level=None,
+                               check_same_thread=False,
+                               factory=ProfiledConnection if profiling.ENABLED else sqlite3.Connection)
+        conn.execute(f'PRAGMA busy_timeout = {BUSY_TIMEOUT_MS}')
+        conn.execute(f"PRAGMA journal_mode = {'WAL' if self.wal else 'DELETE'}")
+        if self.wal:
+            for pragma in PRAGMAS:
+                conn.execute(pragma)
+        return conn
+
+    @contextmanager
+    def connection(self):
+        try:
+            conn = self._idle.get_nowait()
+        except queue.Empty:
+            conn = self._connect()
+        try:
+            yield conn
+        finally:
+            if conn.in_transaction:
+                conn.execute('ROLLBACK')
+            if self._idle.qsize() < self.size:
+                self._idle.put(conn)
+            else:
+                conn.close()
+
+    def close(self):
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                return
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    """Returns the process-wide pool for DB_PATH, creating it on first use."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ConnectionPool(DB_PATH)
+        return _pool
+
+
+def configure(path=None, pool_size=None, wal=None):
+    """Points the app at another database file and/or changes pool settings."""
+    global _pool, DB_PATH, POOL_SIZE, USE_WAL
+    with _pool_lock:
+        DB_PATH = path or DB_PATH
+        POOL_SIZE = POOL_SIZE if pool_size is None else pool_size
+        USE_WAL = USE_WAL if wal is None else wal
+        if _pool is not None:
+            _pool.close()
+        _pool = ConnectionPool(DB_PATH, POOL_SIZE, USE_WAL)
+
+
+@contextmanager
+def connect():
+    """Borrows a connection for autocommit reads."""
+    with get_pool().connection() as conn:
+        yield conn
+
+
+@contextmanager
+def transaction(immediate=True):
+    """
+    Borrows a connection and wraps the block in one transaction.
+    immediate=True takes the write lock up front (waiting up to BUSY_TIMEOUT_MS);
+    immediate=False gives a consistent read snapshot.
+    """
+    with get_pool().connection() as conn:
+        conn.execute('BEGIN IMMEDIATE' if immediate else 'BEGIN')
+        try:
+            yield conn
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+        conn.execute('COMMIT')
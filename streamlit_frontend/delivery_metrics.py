@@ -0,0 +1,119 @@
+import numpy as np
+import pandas as pd
+
+import dates
+
+# --- DELIVERY METRICS ENGINE ---
+# Single source of truth for the derived delivery columns used by the Home page,
+# the Display Data editor, the Late Delivery page and the CLI backend.
+EXPECTED_COL = "EXPECTED DELIVERY DATE"
+ACTUAL_COL = "ACTUAL DELIVERY DATE"
+DATE_COLUMNS = [EXPECTED_COL, ACTUAL_COL]
+
+SECONDS_PER_DAY = 60 * 60 * 24
+HIGH_PRIORITY_DAYS = 5      # more than this many days late -> High
+PENDING_PRIORITY = "Medium"  # default priority for rows not delivered yet
+
+# Label lookup tables: rows are binned to integer codes, then labels are taken by code
+PRIORITY_LABELS = np.array(["Low", "Medium", "High"], dtype=object)
+STATUS_LABELS = np.array(["On Time", "Late", "Pending"], dtype=object)
+
+# update_delivery_metrics writes cell by cell up to this many rows
+CELL_WRITE_MAX_ROWS = 200
+DERIVED_COLUMNS = ["Duration", "Days Late", "Delivery Status", "PRIORITY"]
+
+
+def to_datetime_columns(df, columns=DATE_COLUMNS, report=None):
+    """
+    Parses the date columns in place (day first, bad values -> NaT), skipping ones already parsed.
+    If a report dict is given, per-column parse counts are added to it (dates.parse_dates);
+    formats found for a column in an earlier call are reused, so chunks skip inference.
+    """
+    for col in columns:
+        if col in df.columns and not pd.api.types.is_datetime64_any_dtype(df[col]):
+            known = report.get(col) if report is not None else None
+            df[col], col_report = dates.parse_dates(df[col], dayfirst=True,
+                                                    formats=known['formats'] if known and known['formats'] else None)
+            if report is not None:
+                dates.merge_reports(report.setdefault(col, {}), col_report)
+    return df
+
+
+def coerced_count(report):
+    """Total number of values that could not be parsed as dates in a to_datetime_columns report."""
+    return sum(r['coerced'] for r in (report or {}).values())
+
+
+def days_late(duration):
+    """Duration in (fractional) days; missing durations count as 0."""
+    return (duration.dt.total_seconds() / SECONDS_PER_DAY).fillna(0)
+
+
+def priority_for(days, pending):
+    """High if more than 5 days late, Medium if late at all or still pending, otherwise Low."""
+    days = np.asarray(days)
+    pending_code = list(PRIORITY_LABELS).index(PENDING_PRIORITY)
+    codes = np.select([np.asarray(pending), days > HIGH_PRIORITY_DAYS, days > 0], [pending_code, 2, 1], default=0)
+    return PRIORITY_LABELS[codes]
+
+
+def status_for(days, pending):
+    """Pending if there is no actual delivery date, otherwise Late / On Time."""
+    codes = np.select([np.asarray(pending), np.asarray(days) > 0], [2, 1], default=0)
+    return STATUS_LABELS[codes]
+
+
+def add_delivery_metrics(df, priority=True, report=None):
+    """
+    Adds Duration, Days Late, Delivery Status and (optionally) PRIORITY to df in place
+    and returns it. Does nothing if either date column is missing.
+    `report` collects date parse counts, see to_datetime_columns.
+    """
+    if EXPECTED_COL not in df.columns or ACTUAL_COL not in df.columns:
+        return df
+
+    to_datetime_columns(df, report=report)
+    df["Duration"] = df[ACTUAL_COL] - df[EXPECTED_COL]
+    df["Days Late"] = days_late(df["Duration"])
+
+    pending = df[ACTUAL_COL].isna().to_numpy()
+    # Stored as categories over the full label set, so later single-row updates always fit
+    if priority:
+        df["PRIORITY"] = pd.Categorical(priority_for(df["Days Late"], pending), categories=PRIORITY_LABELS)
+    df["Delivery Status"] = pd.Categorical(status_for(df["Days Late"], pending), categories=STATUS_LABELS)
+    return df
+
+
+def has_delivery_metrics(df):
+    """True if the date columns are parsed and Duration, Days Late and Delivery Status are present."""
+    return (all(col in df.columns and pd.api.types.is_datetime64_any_dtype(df[col]) for col in DATE_COLUMNS)
+            and all(col in df.columns for col in ["Duration", "Days Late", "Delivery Status"]))
+
+
+def update_delivery_metrics(df, rows, priority=True):
+    """
+    Re-derives the metric columns for the given row labels only (e.g. rows just
+    edited), leaving the rest of df untouched. Works in place and returns df.
+    """
+    if EXPECTED_COL not in df.columns or ACTUAL_COL not in df.columns:
+        return df
+    derived = [col for col in DERIVED_COLUMNS if priority or col != "PRIORITY"]
+    if not all(col in df.columns for col in derived):
+        return add_delivery_metrics(df, priority)
+    if len(rows) == 0:
+        return df
+
+    to_datetime_columns(df)
+    pos = df.index.get_indexer(rows)
+    # Only the derived columns are written back; the dates themselves are unchanged
+    sub = add_delivery_metrics(pd.DataFrame({col: df[col].iloc[pos] for col in DATE_COLUMNS}), priority)[derived]
+    if len(pos) > CELL_WRITE_MAX_ROWS:
+        df.loc[rows, sub.columns] = sub
+        return df
+
+    # A handful of rows: write cell by cell, which costs O(rows) instead of a column copy
+    col_pos = [df.columns.get_loc(col) for col in sub.columns]
+    for p, values in zip(pos, sub.itertuples(index=False)):
+        for j, value in zip(col_pos, values):
+            df.iat[p, j] = value
+    return df
@@ -0,0 +1,114 @@
+import tempfile
+import openpyxl
+import pyarrow.parquet as pq
+import streamlit as st
+
+import storage
+
+# --- STREAMING EXPORT ---
+# Tables are written CHUNK_ROWS rows at a time, so exporting millions of rows
+# never builds the whole file's text or cell objects in memory at once (nor a
+# copy of a filtered view: its rows are taken chunk by chunk). Used by the
+# pages' download buttons and by the backend CLI (work_load_tracker_backend).
+CHUNK_ROWS = 50_000
+FORMATS = {
+    'csv': 'text/csv',
+    'parquet': 'application/vnd.apache.parquet',
+    'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+}
+XLSX_MAX_ROWS = 1_048_575          # sheet row limit, minus the header
+SHEET_NAME_CHARS = 31
+
+
+def iter_chunks(df, positions=None, columns=None, chunk_rows=CHUNK_ROWS):
+    """
+    Yields df (or only its rows at `positions` / the given columns) in slices
+    of at most chunk_rows rows; an empty table is yielded once, so headers
+    still get written.
+    """
+    rows = len(df) if positions is None else len(positions)
+    cols = slice(None) if columns is None else [df.columns.get_loc(col) for col in columns]
+    if rows == 0:
+        yield df.iloc[:0, cols]
+        return
+    for start in range(0, rows, chunk_rows):
+        if positions is None:
+            yield df.iloc[start:start + chunk_rows, cols]
+        else:
+            yield df.iloc[positions[start:start + chunk_rows], cols]
+
+
+def write_csv(chunks, sink):
+    """Writes DataFrame chunks as UTF-8 CSV to sink (path or binary file)."""
+    if isinstance(sink, str):
+        with open(sink, 'wb') as f:
+            return write_csv(chunks, f)
+    for i, chunk in enumerate(chunks):
+        sink.write(chunk.to_csv(header=i == 0, index=False).encode('utf-8'))
+
+
+def write_parquet(chunks, sink):
+    """Writes DataFrame chunks as zstd-compressed Parquet to sink (path or binary file), a row group per chunk."""
+    writer = None
+    try:
+        for table in storage.iter_tables(chunks):
+            if writer is None:
+                writer = pq.ParquetWriter(sink, table.schema, compression='zstd')
+            writer.write_table(table)
+    finally:
+        if writer is not None:
+            writer.close()
+
+
+def write_xlsx(sheets, sink):
+    """Writes {sheet name: DataFrame chunks} as one workbook to sink (path or binary file)."""
+    # openpyxl's write-only mode streams rows to the sheet file instead of keeping every cell
+    wb = openpyxl.Workbook(write_only=True)
+    for name, chunks in sheets.items():
+        ws = wb.create_sheet(str(name)[:SHEET_NAME_CHARS])
+        rows = 0
+        for i, chunk in enumerate(chunks):
+            rows += len(chunk)
+            if rows > XLSX_MAX_ROWS:
+                raise ValueError(f"xlsx sheets hold at most {XLSX_MAX_ROWS:,} rows; use csv or parquet")
+            if i == 0:
+                ws.append([str(col) for col in chunk.columns])
+            for row in chunk.astype(object).where(chunk.notna(), None).itertuples(index=False):
+                ws.append(row)
+    wb.save(sink)
+
+
+def write(df, fmt, sink, positions=None, columns=None, sheet_name='data'):
+    """Writes df (or only its rows at `positions` / the given columns) to sink in one of FORMATS."""
+    if fmt == 'parquet':
+        # Mixed-type columns are made text up front, so every chunk converts to the same Arrow types
+        write_parquet(iter_chunks(storage.arrow_safe(df), positions, columns), sink)
+    elif fmt == 'csv':
+        write_csv(iter_chunks(df, positions, columns), sink)
+    elif fmt == 'xlsx':
+        write_xlsx({sheet_name: iter_chunks(df, positions, columns)}, sink)
+    else:
+        raise ValueError(f"Unknown export format '{fmt}' (use one of: {', '.join(FORMATS)})")
+
+
+def to_file(df, fmt, positions=None, columns=None, sheet_name='data'):
+    """Writes the export to a temporary file on disk and returns it rewound, for st.download_button."""
+    f = tempfile.TemporaryFile()
+    write(df, fmt, f, positions, columns, sheet_name)
+    f.seek(0)
+    return f
+
+
+def download_menu(df, file_stem, key, positions=None, columns=None):
+    """
+    Format picker and download button for df (or its rows at `positions` / the given columns).
+    The file is only written when the button is clicked, not on every rerun.
+    """
+    rows = len(df) if positions is None else len(positions)
+    col_format, col_button = st.columns([1, 3])
+    fmt = col_format.selectbox("Export format", list(FORMATS), key=f"{key}_format", label_visibility="collapsed")
+    too_big = fmt == 'xlsx' and rows > XLSX_MAX_ROWS
+    col_button.download_button(
+        f"⬇️ Download {rows:,} rows as {fmt.upper()}", data=lambda: to_file(df, fmt, positions, columns, file_stem),
+        file_name=f"{file_stem}.{fmt}", mime=FORMATS[fmt], key=f"{key}_download", on_click="ignore",
+        disabled=too_big, help="Too many rows for one xlsx sheet" if too_big else None)
@@ -1,5 +1,32 @@
-import pandas as pd
+"""
+Synthetic delivery data for demos and load tests.
+
+With no arguments, writes the 60 sample rows below to Professional_Delivery_Data.xlsx.
+With --rows N, generates N rows of the same schema whose agents, products,
+priorities, statuses, delays, notes and ratings follow the sample's
+distributions, plus a few malformed dates. The output is written chunk by
+chunk, so memory stays flat up to tens of millions of rows. --schema
+superstore produces rows shaped like train.csv instead. The same --seed,
+--rows and --chunk-rows always give the same file.
+
+Usage:
+  python generate_csv.py
+  python generate_csv.py --rows 10000000 --output deliveries.csv [--format csv|parquet|xlsx] [--seed 42]
+  python generate_csv.py --schema superstore --rows 1000000 --output train_big.parquet
+"""
+import argparse
 import io
+import os
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+import openpyxl
+
+try:
+    import xlsxwriter
+except ImportError:   # optional: faster xlsx output
+    xlsxwriter = None
 
 # The complete dataset string
 csv_data = """ID NO.,NAME,QUANTITY,STATUS,ADDRESS,CUSTOMER NAME,COMPANY,TOT. AMT,EXPECTED DELIVERY DATE,ACTUAL DELIVERY DATE,PRIORITY,DELIVERY AGENT,NOTES,RATING BY CUSTOMER
@@ -64,16 +91,296 @@ csv_data = """ID NO.,NAME,QUANTITY,STATUS,ADDRESS,CUSTOMER NAME,COMPANY,TOT. AMT
 1059,Tongs - Locking,15,Delivered,"3939 Grip Dr, BBQ Restaurant",SmokeHouse,1500,10-06-2025,12-06-2025,Medium,Daniel King,Delay due to weather,3.8
 1060,Thermometer - Instant Read,5,Delivered,"4040 Temp Ln, Candy Shop",SweetTooth,1000,12-06-2025,12-06-2025,High,Nancy Scott,Critical for production,5"""
 
-# Read the CSV data
-try:
-    df = pd.read_csv(io.StringIO(csv_data))
-    
-    # Save to Excel file
-    output_filename = "Professional_Delivery_Data.xlsx"
-    df.to_excel(output_filename, index=False)
-    
-    print(f"Successfully created '{output_filename}' with {len(df)} rows.")
-    print("You can now open this file in Excel.")
-    
-except Exception as e:
-    print(f"Error creating Excel file: {e}")
+# The header above lists a COMPANY column the rows don't have
+SAMPLE_COLUMNS = ["ID NO.", "NAME", "QUANTITY", "STATUS", "ADDRESS", "CUSTOMER NAME", "TOT. AMT",
+                  "EXPECTED DELIVERY DATE", "ACTUAL DELIVERY DATE", "PRIORITY", "DELIVERY AGENT", "NOTES",
+                  "RATING BY CUSTOMER"]
+SAMPLE_OUTPUT = "Professional_Delivery_Data.xlsx"
+
+CHUNK_ROWS = 500_000
+XLSX_MAX_ROWS = 1_048_575          # sheet row limit, minus the header
+DATE_FORMAT = "%d-%m-%Y"           # as in the sample
+START_DATE = pd.Timestamp("2025-01-01")
+DATE_SPAN_DAYS = 365
+PENDING_WINDOW_DAYS = 45           # open orders are due near the end of the period
+LONG_DELAY_RATE = 0.02             # share of delivered rows held up 5-30 days
+BAD_DATE_RATE = 0.001              # share of rows with an unreadable date
+BAD_DATES = np.array(["31-02-2025", "2025/13/45", "TBD", "N/A", "00-00-0000", "15.03.25"], dtype=object)
+
+
+def sample_frame():
+    """The 60 sample rows."""
+    return pd.read_csv(io.StringIO(csv_data), skiprows=1, names=SAMPLE_COLUMNS)
+
+
+def _frequencies(series):
+    counts = series.value_counts()
+    return counts.index.to_numpy(dtype=object), (counts / counts.sum()).to_numpy()
+
+
+def _date_strings(days):
+    """Day offsets from START_DATE as text; each distinct day is formatted once."""
+    unique, inverse = np.unique(days, return_inverse=True)
+    text = (START_DATE + pd.to_timedelta(unique, unit="D")).strftime(DATE_FORMAT).to_numpy(dtype=object)
+    return text[inverse]
+
+
+# --- DELIVERY ROWS ---
+class DeliveryModel:
+    """Distributions learnt from the sample rows."""
+
+    def __init__(self, sample):
+        expected = pd.to_datetime(sample["EXPECTED DELIVERY DATE"], format=DATE_FORMAT)
+        actual = pd.to_datetime(sample["ACTUAL DELIVERY DATE"], format=DATE_FORMAT)
+        delay = (actual - expected).dt.days
+        delivered = sample["STATUS"] == "Delivered"
+
+        self.status, self.status_p = _frequencies(sample["STATUS"])
+        self.priority, self.priority_p = _frequencies(sample["PRIORITY"])
+        self.agents, self.agents_p = _frequencies(sample["DELIVERY AGENT"])
+        self.products = sample["NAME"].to_numpy(dtype=object)
+        self.unit_price = (sample["TOT. AMT"] / sample["QUANTITY"]).to_numpy()
+        self.base_quantity = sample["QUANTITY"].to_numpy()
+        self.customers = sample[["ADDRESS", "CUSTOMER NAME"]].to_numpy(dtype=object)
+        self.delays, self.delays_p = _frequencies(delay[delivered].astype(int))
+        self.notes = {
+            "open": sample.loc[~delivered, "NOTES"].to_numpy(dtype=object),
+            "late": sample.loc[delivered & (delay > 0), "NOTES"].to_numpy(dtype=object),
+            "on_time": sample.loc[delivered & (delay <= 0), "NOTES"].to_numpy(dtype=object),
+        }
+        self.ratings = {
+            "late": sample.loc[delivered & (delay > 0), "RATING BY CUSTOMER"].dropna().to_numpy(),
+            "on_time": sample.loc[delivered & (delay <= 0), "RATING BY CUSTOMER"].dropna().to_numpy(),
+        }
+
+    def chunk(self, rng, first_id, rows):
+        product = rng.integers(0, len(self.products), rows)
+        quantity = np.maximum(1, np.rint(self.base_quantity[product] * rng.lognormal(0, 0.5, rows))).astype(int)
+        customer = self.customers[rng.integers(0, len(self.customers), rows)]
+        status = rng.choice(self.status, rows, p=self.status_p)
+        delivered = status == "Delivered"
+
+        due = rng.integers(0, DATE_SPAN_DAYS, rows)
+        due[~delivered] = DATE_SPAN_DAYS - rng.integers(0, PENDING_WINDOW_DAYS, (~delivered).sum())
+        delay = rng.choice(self.delays, rows, p=self.delays_p).astype(int)
+        long_delay = rng.random(rows) < LONG_DELAY_RATE
+        delay[long_delay] = rng.integers(5, 31, long_delay.sum())
+        late = delivered & (delay > 0)
+
+        expected = _date_strings(due)
+        actual = np.where(delivered, _date_strings(due + delay), None)
+        bad = rng.random(rows) < BAD_DATE_RATE
+        expected[bad] = rng.choice(BAD_DATES, bad.sum())
+
+        notes = np.empty(rows, dtype=object)
+        rating = np.full(rows, np.nan)
+        for kind, mask in (("open", ~delivered), ("late", late), ("on_time", delivered & ~late)):
+            notes[mask] = rng.choice(self.notes[kind], mask.sum())
+            if kind in self.ratings:
+                rating[mask] = rng.choice(self.ratings[kind], mask.sum())
+
+        return pd.DataFrame({
+            "ID NO.": np.arange(first_id, first_id + rows),
+            "NAME": self.products[product],
+            "QUANTITY": quantity,
+            "STATUS": status,
+            "ADDRESS": customer[:, 0],
+            "CUSTOMER NAME": customer[:, 1],
+            "TOT. AMT": np.rint(quantity * self.unit_price[product]).astype(int),
+            "EXPECTED DELIVERY DATE": expected,
+            "ACTUAL DELIVERY DATE": actual,
+            "PRIORITY": rng.choice(self.priority, rows, p=self.priority_p),
+            "DELIVERY AGENT": rng.choice(self.agents, rows, p=self.agents_p),
+            "NOTES": notes,
+            "RATING BY CUSTOMER": rating,
+        })
+
+
+# --- SUPERSTORE ROWS (train.csv) ---
+SHIP_MODES = {"Standard Class": (0.60, 4, 7), "Second Class": (0.19, 2, 5),
+              "First Class": (0.16, 1, 3), "Same Day": (0.05, 0, 0)}   # share, min and max days to ship
+SEGMENTS = (["Consumer", "Corporate", "Home Office"], [0.52, 0.30, 0.18])
+LOCATIONS = [   # city, state, postal code, region
+    ("New York City", "New York", 10035, "East"), ("Philadelphia", "Pennsylvania", 19140, "East"),
+    ("Los Angeles", "California", 90036, "West"), ("San Francisco", "California", 94122, "West"),
+    ("Seattle", "Washington", 98103, "West"), ("Houston", "Texas", 77095, "Central"),
+    ("Chicago", "Illinois", 60610, "Central"), ("Henderson", "Kentucky", 42420, "South"),
+    ("Columbus", "Ohio", 43229, "East"), ("Jacksonville", "Florida", 32216, "South"),
+]
+CATEGORIES = {   # category: sub-categories
+    "Furniture": ["Bookcases", "Chairs", "Furnishings", "Tables"],
+    "Office Supplies": ["Appliances", "Art", "Binders", "Envelopes", "Fasteners", "Labels", "Paper", "Storage"],
+    "Technology": ["Accessories", "Copiers", "Machines", "Phones"],
+}
+CATEGORY_P = [0.21, 0.60, 0.19]
+FIRST_NAMES = ["Claire", "Darrin", "Sean", "Brosina", "Andrew", "Irene", "Harold", "Pete", "Alejandro", "Zuschuss"]
+LAST_NAMES = ["Gute", "Van Huff", "O'Donnell", "Hoffman", "Allen", "Maddox", "Pawlan", "Kriz", "Grove", "Carroll"]
+ORDER_LINES_MAX = 5
+SUPERSTORE_YEARS = 4
+
+
+def _superstore_dates(days):
+    """Day offsets as train.csv dates (day-first, slashes), each distinct day formatted once."""
+    unique, inverse = np.unique(days, return_inverse=True)
+    start = START_DATE - pd.DateOffset(years=SUPERSTORE_YEARS)
+    text = (start + pd.to_timedelta(unique, unit="D")).strftime("%d/%m/%Y").to_numpy(dtype=object)
+    return text[inverse]
+
+
+def _join(*parts):
+    """Element-wise string concatenation of arrays (or scalars)."""
+    out = np.asarray(parts[0]).astype(str)
+    for part in parts[1:]:
+        out = np.char.add(out, np.asarray(part).astype(str))
+    return out.astype(object)
+
+
+def superstore_chunk(rng, first_id, rows):
+    """train.csv-shaped order lines; the lines of an order share its id, dates, customer and ship mode."""
+    order = np.repeat(np.arange(rows), rng.integers(1, ORDER_LINES_MAX + 1, rows))[:rows]
+    orders = order[-1] + 1
+
+    modes = list(SHIP_MODES)
+    mode = rng.choice(len(modes), orders, p=[SHIP_MODES[m][0] for m in modes])
+    low, high = (np.array([SHIP_MODES[m][i] for m in modes]) for i in (1, 2))
+    order_day = rng.integers(0, SUPERSTORE_YEARS * DATE_SPAN_DAYS, orders)
+    ship_day = order_day + rng.integers(low[mode], high[mode] + 1)
+    year = START_DATE.year - SUPERSTORE_YEARS + order_day // DATE_SPAN_DAYS
+
+    first, last = rng.integers(0, len(FIRST_NAMES), orders), rng.integers(0, len(LAST_NAMES), orders)
+    first_names, last_names = np.array(FIRST_NAMES), np.array(LAST_NAMES)
+    location = rng.integers(0, len(LOCATIONS), orders)
+    cities, states, postal_codes, regions = (np.array(values) for values in zip(*LOCATIONS))
+
+    category_names = np.array(list(CATEGORIES))
+    sub_names = np.array([sub for subs in CATEGORIES.values() for sub in subs])
+    sub_counts = np.array([len(subs) for subs in CATEGORIES.values()])
+    category = rng.choice(len(category_names), rows, p=CATEGORY_P)
+    sub = (np.cumsum(sub_counts) - sub_counts)[category] + (rng.random(rows) * sub_counts[category]).astype(int)
+    product = rng.integers(10000000, 10005000, rows)
+
+    return pd.DataFrame({
+        "Row ID": np.arange(first_id, first_id + rows),
+        "Order ID": _join("CA-", year, "-", rng.integers(100000, 1000000, orders))[order],
+        "Order Date": _superstore_dates(order_day)[order],
+        "Ship Date": _superstore_dates(ship_day)[order],
+        "Ship Mode": np.array(modes, dtype=object)[mode][order],
+        "Customer ID": _join(first_names.astype("U1")[first], last_names.astype("U1")[last], "-",
+                             rng.integers(10000, 30000, orders))[order],
+        "Customer Name": _join(first_names[first], " ", last_names[last])[order],
+        "Segment": rng.choice(np.array(SEGMENTS[0], dtype=object), orders, p=SEGMENTS[1])[order],
+        "Country": "United States",
+        "City": cities[location][order],
+        "State": states[location][order],
+        "Postal Code": postal_codes[location][order],
+        "Region": regions[location][order],
+        "Product ID": _join(np.char.upper(category_names.astype("U3"))[category], "-",
+                            np.char.upper(sub_names.astype("U2"))[sub], "-", product),
+        "Category": category_names[category].astype(object),
+        "Sub-Category": sub_names[sub].astype(object),
+        "Product Name": _join(sub_names[sub], " - Model ", product % 1000),
+        "Sales": np.round(rng.lognormal(4.0, 1.3, rows), 2),
+    })
+
+
+# --- CHUNKED WRITERS ---
+def _write_csv(chunks, path):
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        for i, chunk in enumerate(chunks):
+            chunk.to_csv(f, header=i == 0, index=False)
+
+
+def _write_parquet(chunks, path):
+    writer = None
+    try:
+        for chunk in chunks:
+            table = pa.Table.from_pandas(chunk, preserve_index=False)
+            if writer is None:
+                writer = pq.ParquetWriter(path, table.schema, compression="zstd")
+            writer.write_table(table.cast(writer.schema))
+    finally:
+        if writer is not None:
+            writer.close()
+
+
+def _xlsx_rows(chunks):
+    """The header, then every row as Python values with None for missing ones."""
+    for i, chunk in enumerate(chunks):
+        if i == 0:
+            yield list(chunk.columns)
+        yield from chunk.astype(object).where(chunk.notna(), None).itertuples(index=False)
+
+
+def _write_xlsx_openpyxl(chunks, path):
+    # openpyxl's write-only mode streams rows to the sheet file instead of building it in memory
+    wb = openpyxl.Workbook(write_only=True)
+    ws = wb.create_sheet()
+    for row in _xlsx_rows(chunks):
+        ws.append(row)
+    wb.save(path)
+
+
+def _write_xlsx_xlsxwriter(chunks, path):
+    # constant_memory mode flushes each row to disk as soon as the next one starts
+    with xlsxwriter.Workbook(path, {"constant_memory": True}) as wb:
+        ws = wb.add_worksheet()
+        for r, row in enumerate(_xlsx_rows(chunks)):
+            ws.write_row(r, 0, row)
+
+
+def _write_xlsx(chunks, path):
+    """Uses xlsxwriter when it is installed (several times faster), openpyxl otherwise."""
+    writer = _write_xlsx_xlsxwriter if xlsxwriter is not None else _write_xlsx_openpyxl
+    writer(chunks, path)
+
+
+WRITERS = {"csv": _write_csv, "parquet": _write_parquet, "xlsx": _write_xlsx}
+
+
+def generate(rows, schema="delivery", seed=42, chunk_rows=CHUNK_ROWS):
+    """Yields `rows` generated rows as DataFrames of at most chunk_rows rows."""
+    model = DeliveryModel(sample_frame()) if schema == "delivery" else None
+    first_id = 1001 if schema == "delivery" else 1
+    for index, start in enumerate(range(0, rows, chunk_rows)):
+        # One generator per chunk, seeded from (seed, chunk index)
+        rng = np.random.default_rng([seed, index])
+        n = min(chunk_rows, rows - start)
+        yield model.chunk(rng, first_id + start, n) if model is not None else superstore_chunk(rng, first_id + start, n)
+
+
+def write(chunks, path, fmt=None):
+    """Writes DataFrame chunks to path; the format defaults to the file extension."""
+    fmt = fmt or os.path.splitext(path)[1].lstrip(".").lower()
+    if fmt not in WRITERS:
+        raise ValueError(f"Unknown output format '{fmt}' (use one of: {', '.join(WRITERS)})")
+    WRITERS[fmt](chunks, path)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, help="rows to generate (default: write the 60 sample rows)")
+    parser.add_argument("--schema", choices=["delivery", "superstore"], default="delivery")
+    parser.add_argument("--output", "-o", help="output file (default: the schema's usual file name)")
+    parser.add_argument("--format", choices=list(WRITERS), help="output format (default: from the extension)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--chunk-rows", type=int, default=CHUNK_ROWS)
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    try:
+        if args.rows is None:
+            output = args.output or SAMPLE_OUTPUT
+            chunks, rows = [sample_frame()], len(sample_frame())
+        else:
+            output = args.output or ("deliveries.csv" if args.schema == "delivery" else "train_generated.csv")
+            chunks, rows = generate(args.rows, args.schema, args.seed, args.chunk_rows), args.rows
+        fmt = args.format or os.path.splitext(output)[1].lstrip(".").lower()
+        if fmt == "xlsx" and rows > XLSX_MAX_ROWS:
+            raise ValueError(f"xlsx sheets hold at most {XLSX_MAX_ROWS:,} rows; use csv or parquet")
+
+        write(chunks, output, fmt)
+        print(f"Successfully created '{output}' with {rows:,} rows.")
+    except Exception as e:
+        print(f"Error creating file: {e}")
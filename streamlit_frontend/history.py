@@ -0,0 +1,288 @@
+import hashlib
+import json
+import os
+from datetime import datetime
+import numpy as np
+import pandas as pd
+
+import db
+import row_store
+import storage
+
+# --- VERSIONED DATASET HISTORY ---
+# Every save of a user's dataset is kept as a numbered version. A version is a
+# list of chunks of rows, and chunks are stored once, addressed by their
+# content, in dataset_chunks. Chunk boundaries are content-defined: a chunk ends
+# after a row whose hash hits a fixed pattern (about one row in
+# AVG_CHUNK_ROWS), so editing, inserting or deleting a few rows changes only the
+# chunks around them and consecutive versions share all the others. Each chunk
+# is a compressed Arrow IPC file (storage.encode_frame); category columns stay
+# dictionary-encoded, but rows are hashed by value, so recompacting a dataset
+# doesn't change its chunks' keys. Chunking and encoding happen in prepare(),
+# before the save takes the write lock; record() only writes rows. Versions
+# beyond MAX_VERSIONS per user are dropped, then the chunks only they
+# referenced are garbage collected.
+AVG_CHUNK_ROWS = 2048             # power of two: a boundary is a row hash with these low bits all zero
+MIN_CHUNK_ROWS = 256
+MAX_CHUNK_ROWS = 8 * AVG_CHUNK_ROWS
+MAX_VERSIONS = int(os.environ.get('LOGITRACK_MAX_VERSIONS', 50))
+
+
+def create_tables(c):
+    c.execute('CREATE TABLE IF NOT EXISTS dataset_versions(username TEXT, version INTEGER, created TEXT, filename TEXT, '
+              'row_count INTEGER, columns TEXT, note TEXT, PRIMARY KEY(username, version))')
+    c.execute('CREATE TABLE IF NOT EXISTS dataset_version_chunks(username TEXT, version INTEGER, seq INTEGER, chunk TEXT, '
+              'PRIMARY KEY(username, version, seq))')
+    c.execute('CREATE INDEX IF NOT EXISTS idx_dataset_version_chunks_chunk ON dataset_version_chunks(chunk)')
+    c.execute('CREATE TABLE IF NOT EXISTS dataset_chunks(chunk TEXT PRIMARY KEY, row_count INTEGER, size INTEGER, data BLOB)')
+
+
+# --- CHUNKING ---
+
+def _dtype_name(dtype):
+    """Category columns are described by their values' dtype, so the same rows get the same key however they were compacted."""
+    return str(dtype.categories.dtype) if isinstance(dtype, pd.CategoricalDtype) else str(dtype)
+
+
+def row_hashes(df):
+    """64-bit hash of each row's values (category columns hash like their plain values)."""
+    return pd.util.hash_pandas_object(df, index=False).to_numpy()
+
+
+def chunk_bounds(hashes):
+    """End positions of the content-defined chunks of rows with these hashes (the last one is len(hashes))."""
+    candidates = np.flatnonzero(hashes % np.uint64(AVG_CHUNK_ROWS) == 0) + 1
+    bounds, start = [], 0
+    for cut in np.append(candidates, len(hashes)):
+        while cut - start > MAX_CHUNK_ROWS:
+            start += MAX_CHUNK_ROWS
+            bounds.append(start)
+        if cut - start >= MIN_CHUNK_ROWS or cut == len(hashes):
+            bounds.append(int(cut))
+            start = cut
+    return [end for i, end in enumerate(bounds) if end > (bounds[i - 1] if i else 0)]
+
+
+def iter_chunks(frames):
+    """
+    Splits a stream of DataFrame pieces into content-defined chunks. The cuts
+    are the same however the rows are split into pieces.
+    """
+    pending = None
+    for df in frames:
+        if pending is not None and len(pending):
+            df = pd.concat([pending, df], ignore_index=True)
+        bounds = chunk_bounds(row_hashes(df))
+        start = 0
+        for end in bounds[:-1]:
+            yield df.iloc[start:end]
+            start = end
+        pending = df.iloc[start:]
+    if pending is not None and len(pending):
+        yield pending
+
+
+def _columns(df):
+    return [(str(col), _dtype_name(dtype)) for col, dtype in df.dtypes.items()]
+
+
+def chunk_key(chunk):
+    """Content address of a chunk: its columns, dtypes and row hashes."""
+    digest = hashlib.sha256(json.dumps(_columns(chunk)).encode('utf-8'))
+    digest.update(row_hashes(chunk).tobytes())
+    return digest.hexdigest()
+
+
+# --- VERSIONS ---
+
+def _chunk_list(c, username, version):
+    return [row[0] for row in c.execute('SELECT chunk FROM dataset_version_chunks WHERE username = ? AND version = ? '
+                                        'ORDER BY seq', (username, version))]
+
+
+def _latest(c, username):
+    return c.execute('SELECT MAX(version) FROM dataset_versions WHERE username = ?', (username,)).fetchone()[0]
+
+
+def _frames(source):
+    return source() if callable(source) else source
+
+
+def prepare(frames):
+    """
+    Chunks the dataset in `frames` (a list of DataFrame pieces, or a function
+    returning an iterable of them, called again if needed) and encodes the
+    chunks not stored yet. Runs outside any write transaction; pass the result
+    to record().
+    """
+    keys, blobs, rows, columns = [], {}, 0, None
+    with db.connect() as c:
+        for chunk in iter_chunks(_frames(frames)):
+            key = chunk_key(chunk)
+            if key not in blobs and c.execute('SELECT 1 FROM dataset_chunks WHERE chunk = ?', (key,)).fetchone() is None:
+                blobs[key] = (len(chunk), storage.encode_frame(chunk))
+            keys.append(key)
+            rows += len(chunk)
+            columns = columns or _columns(chunk)
+    return {'source': frames, 'keys': keys, 'blobs': blobs, 'rows': rows, 'columns': columns}
+
+
+def _store_chunks(c, prepared):
+    c.executemany('INSERT OR IGNORE INTO dataset_chunks(chunk, row_count, size, data) VALUES (?,?,?,?)',
+                  [(key, n, len(blob), blob) for key, (n, blob) in prepared['blobs'].items()])
+    # A chunk found stored by prepare() may have been garbage collected since (its versions pruned)
+    missing = {key for key in set(prepared['keys'])
+               if c.execute('SELECT 1 FROM dataset_chunks WHERE chunk = ?', (key,)).fetchone() is None}
+    if missing:
+        for chunk in iter_chunks(_frames(prepared['source'])):
+            key = chunk_key(chunk)
+            if key in missing:
+                blob = storage.encode_frame(chunk)
+                c.execute('INSERT INTO dataset_chunks(chunk, row_count, size, data) VALUES (?,?,?,?)',
+                          (key, len(chunk), len(blob), blob))
+                missing.discard(key)
+
+
+def record(c, username, prepared, filename, note=''):
+    """
+    Adds the dataset prepared by prepare() as the user's next version, writing
+    the chunks not stored yet. Nothing is added if it is identical to the
+    latest version. `c` is an open write transaction. Returns the new version
+    number, or None.
+    """
+    keys = prepared['keys']
+    latest = _latest(c, username)
+    if latest is not None and _chunk_list(c, username, latest) == keys:
+        return None
+    _store_chunks(c, prepared)
+    version = (latest or 0) + 1
+    c.execute('INSERT INTO dataset_versions(username, version, created, filename, row_count, columns, note) '
+              'VALUES (?,?,?,?,?,?,?)', (username, version, datetime.now().isoformat(sep=' ', timespec='seconds'),
+                                         filename, prepared['rows'], json.dumps(prepared['columns'] or []), note))
+    c.executemany('INSERT INTO dataset_version_chunks(username, version, seq, chunk) VALUES (?,?,?,?)',
+                  [(username, version, seq, key) for seq, key in enumerate(keys)])
+    if version > MAX_VERSIONS:
+        prune(c, username, MAX_VERSIONS)
+    return version
+
+
+def prune(c, username, keep):
+    """
+    Drops all but the user's `keep` latest versions, then the chunks only they
+    referenced. Returns how many chunks were deleted.
+    """
+    oldest_kept = _latest(c, username) - keep + 1
+    dropped = [row[0] for row in c.execute('SELECT DISTINCT chunk FROM dataset_version_chunks '
+                                           'WHERE username = ? AND version < ?', (username, oldest_kept))]
+    c.execute('DELETE FROM dataset_version_chunks WHERE username = ? AND version < ?', (username, oldest_kept))
+    if not c.execute('DELETE FROM dataset_versions WHERE username = ? AND version < ?', (username, oldest_kept)).rowcount:
+        return 0
+    return collect_garbage(c, dropped)
+
+
+def collect_garbage(c, chunks=None):
+    """
+    Deletes the chunks (of `chunks`, default all) that no version references;
+    returns how many. `c` is an open write transaction.
+    """
+    if chunks is None:
+        return c.execute('DELETE FROM dataset_chunks WHERE NOT EXISTS '
+                         '(SELECT 1 FROM dataset_version_chunks v WHERE v.chunk = dataset_chunks.chunk)').rowcount
+    return c.executemany('DELETE FROM dataset_chunks WHERE chunk = ? AND NOT EXISTS '
+                         '(SELECT 1 FROM dataset_version_chunks v WHERE v.chunk = ?)',
+                         [(key, key) for key in chunks]).rowcount
+
+
+def list_versions(username):
+    """
+    The user's versions, newest first: version, created, note, filename, rows,
+    size (bytes if stored on its own) and new bytes (chunks no earlier version had).
+    """
+    with db.connect() as c:
+        rows = c.execute("""
+            SELECT v.version, v.created, v.note, v.filename, v.row_count,
+                   COALESCE(SUM(ch.size), 0),
+                   COALESCE(SUM(CASE WHEN NOT EXISTS (
+                       SELECT 1 FROM dataset_version_chunks e
+                       WHERE e.username = v.username AND e.version < v.version AND e.chunk = vc.chunk
+                   ) THEN ch.size ELSE 0 END), 0)
+            FROM dataset_versions v
+            LEFT JOIN dataset_version_chunks vc ON vc.username = v.username AND vc.version = v.version
+            LEFT JOIN dataset_chunks ch ON ch.chunk = vc.chunk
+            WHERE v.username = ?
+            GROUP BY v.version ORDER BY v.version DESC
+        """, (username,)).fetchall()
+    return pd.DataFrame(rows, columns=['version', 'created', 'note', 'filename', 'rows', 'size', 'new bytes'])
+
+
+def _read_chunks(c, keys, columns):
+    frames = [storage.decode_frame(c.execute('SELECT data FROM dataset_chunks WHERE chunk = ?', (key,)).fetchone()[0])
+              for key in keys]
+    if not frames:
+        return pd.DataFrame({col: pd.Series(dtype=storage_dtype) for col, storage_dtype in columns})
+    return pd.concat(frames, ignore_index=True)
+
+
+def load_version(username, version):
+    """(DataFrame, filename) of a stored version, or (None, None) if there is no such version."""
+    with db.transaction(immediate=False) as c:
+        row = c.execute('SELECT filename, columns FROM dataset_versions WHERE username = ? AND version = ?',
+                        (username, version)).fetchone()
+        if row is None:
+            return None, None
+        df = _read_chunks(c, _chunk_list(c, username, version), json.loads(row[1]))
+    return df, row[0]
+
+
+def diff(username, old, new):
+    """
+    Rows that differ between two versions: {'added', 'removed', 'changed'
+    (new values), 'before' (the changed rows' old values)}. Only the chunks the
+    versions don't share are read. Rows are matched by ID when IDs are unique,
+    otherwise by content (then edits show up as removed + added).
+    """
+    with db.transaction(immediate=False) as c:
+        old_keys, new_keys = _chunk_list(c, username, old), _chunk_list(c, username, new)
+        old_only = _read_chunks(c, [k for k in old_keys if k not in set(new_keys)], [])
+        new_only = _read_chunks(c, [k for k in new_keys if k not in set(old_keys)], [])
+
+    empty = new_only.iloc[:0] if len(new_only.columns) else old_only.iloc[:0]
+    old_ids, new_ids = row_store.row_keys(old_only), row_store.row_keys(new_only)
+    if old_ids is None or new_ids is None or not len(old_only) or not len(new_only):
+        # Match by content: a row that moved to another chunk unchanged is in both
+        old_hash, new_hash = row_hashes(old_only), row_hashes(new_only)
+        return {'added': new_only[~np.isin(new_hash, old_hash)].reset_index(drop=True),
+                'removed': old_only[~np.isin(old_hash, new_hash)].reset_index(drop=True),
+                'changed': empty, 'before': empty}
+
+    before = old_only.set_axis(old_ids)
+    after = new_only.set_axis(new_ids)
+    common = before.index.intersection(after.index)
+    if before.columns.equals(after.columns):
+        differs = row_hashes(before.loc[common]) != row_hashes(after.loc[common])
+    else:
+        differs = np.ones(len(common), dtype=bool)
+    changed = common[differs]
+    return {'added': after[~after.index.isin(before.index)].reset_index(drop=True),
+            'removed': before[~before.index.isin(after.index)].reset_index(drop=True),
+            'changed': after.loc[changed].reset_index(drop=True),
+            'before': before.loc[changed].reset_index(drop=True)}
+
+
+def storage_report(username=None):
+    """
+    Logical size (every version as if stored whole) against physical size (the
+    distinct chunks actually stored), for one user or the whole database.
+    """
+    where, params = ('WHERE v.username = ?', (username,)) if username is not None else ('', ())
+    with db.connect() as c:
+        versions, logical = c.execute(f"""
+            SELECT COUNT(DISTINCT v.username || ':' || v.version), COALESCE(SUM(ch.size), 0)
+            FROM dataset_version_chunks v JOIN dataset_chunks ch ON ch.chunk = v.chunk {where}
+        """, params).fetchone()
+        chunks, physical = c.execute(f"""
+            SELECT COUNT(*), COALESCE(SUM(size), 0) FROM dataset_chunks
+            WHERE chunk IN (SELECT v.chunk FROM dataset_version_chunks v {where})
+        """, params).fetchone()
+    return {'versions': versions, 'chunks': chunks, 'logical_bytes': logical, 'physical_bytes': physical,
+            'dedup_ratio': logical / physical if physical else 1.0}
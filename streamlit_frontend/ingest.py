@@ -0,0 +1,164 @@
+import importlib.util
+import os
+import tempfile
+import pandas as pd
+import openpyxl
+
+import auth
+import delivery_metrics
+import storage
+import upload_cache
+
+# --- STREAMING INGEST ---
+# Large uploads are read in chunks of CHUNK_ROWS rows; each chunk is mapped,
+# normalized and appended to an Arrow file that is then stored for the user,
+# so peak memory follows the chunk size rather than the file size.
+CHUNK_ROWS = int(os.environ.get('LOGITRACK_CHUNK_ROWS', 100_000))
+STREAM_THRESHOLD_BYTES = 50 * 1024 * 1024   # uploads above this default to streaming
+
+# --- EXCEL ---
+# Only the first sheet is read. python-calamine (Rust) parses a sheet an order of
+# magnitude faster than openpyxl; without it pandas' openpyxl engine is used.
+# Each workbook is converted once into an Arrow file in upload_cache, keyed by
+# its bytes, and later reads (preview reruns, other mappings, other users) come
+# from that file.
+EXCEL_ENGINE = 'calamine' if importlib.util.find_spec('python_calamine') else 'openpyxl'
+EXCEL_CONVERSION = {'excel sheet': 0}   # stands in for the mapping in the conversion's cache key
+
+
+def is_csv(name):
+    return name.lower().endswith('.csv')
+
+
+def converted_excel(file):
+    """Path of the cached Arrow conversion of a workbook, or None."""
+    cached = upload_cache.get(upload_cache.cache_key(file, EXCEL_CONVERSION))
+    return None if cached is None else cached[0]
+
+
+def read_excel(file):
+    """Reads the first sheet of a workbook, from its cached conversion when there is one."""
+    key = upload_cache.cache_key(file, EXCEL_CONVERSION)
+    cached = upload_cache.get(key)
+    if cached is not None:
+        try:
+            return storage.read_file_frame(cached[0])
+        except FileNotFoundError:
+            pass   # evicted by another session since get(): convert it again
+    # Round-trip through Arrow so the first read gives the same dtypes as the cached ones
+    df = storage.frame_to_table(pd.read_excel(file, sheet_name=0, engine=EXCEL_ENGINE)).to_pandas()
+    file.seek(0)
+    upload_cache.put_frame(key, df, {})
+    return df
+
+
+def read_preview(file, name, nrows=5):
+    """Reads only the first rows (enough for the preview and the mapping form)."""
+    if is_csv(name):
+        df = pd.read_csv(file, nrows=nrows)
+    elif EXCEL_ENGINE == 'calamine' or converted_excel(file) is not None:
+        # With calamine a full conversion costs little more than a preview, and every rerun reuses it
+        df = read_excel(file).head(nrows)
+    else:
+        df = pd.read_excel(file, sheet_name=0, nrows=nrows)
+    file.seek(0)
+    return df
+
+
+def read_file(file, name):
+    """Reads the whole upload at once."""
+    file.seek(0)
+    return pd.read_csv(file) if is_csv(name) else read_excel(file)
+
+
+def _iter_excel_chunks(file, chunk_rows):
+    path = converted_excel(file)
+    if path is not None:
+        frames = storage.iter_file_frames(path)
+        try:
+            # The file is mapped on the first read; after that eviction can't take it away
+            first = next(frames, None)
+        except FileNotFoundError:
+            pass   # evicted by another session since the lookup: read the workbook itself
+        else:
+            if first is not None:
+                yield first
+            yield from frames
+            return
+    # openpyxl's read-only mode streams rows from the sheet XML instead of building the workbook
+    wb = openpyxl.load_workbook(file, read_only=True, data_only=True)
+    try:
+        rows = wb.worksheets[0].iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            return
+        batch = []
+        for row in rows:
+            batch.append(row)
+            if len(batch) == chunk_rows:
+                yield pd.DataFrame(batch, columns=header)
+                batch = []
+        if batch:
+            yield pd.DataFrame(batch, columns=header)
+    finally:
+        wb.close()
+
+
+def iter_chunks(file, name, chunk_rows=CHUNK_ROWS):
+    """
+    Yields the upload as DataFrames of at most chunk_rows rows (a converted
+    workbook comes in the cached file's Arrow record batches instead).
+    """
+    file.seek(0)
+    if is_csv(name):
+        with pd.read_csv(file, chunksize=chunk_rows) as reader:
+            yield from reader
+    else:
+        yield from _iter_excel_chunks(file, chunk_rows)
+
+
+def rename_columns(df_raw, mapping):
+    """Applies the mapping form ({standard name: source column}) to the raw columns."""
+    rename_dict = {v: k for k, v in mapping.items() if v != "N/A"}
+    return df_raw.rename(columns=rename_dict)
+
+
+def normalize_frame(df_raw, mapping, date_report=None):
+    """Column mapping plus the derived delivery metrics, as done by the Home page."""
+    return delivery_metrics.add_delivery_metrics(rename_columns(df_raw, mapping), report=date_report)
+
+
+def stream_to_store(file, name, mapping, username, chunk_rows=CHUNK_ROWS, on_progress=None, date_report=None,
+                    cache_key=None):
+    """
+    Reads, normalizes and saves an upload chunk by chunk.
+    on_progress(fraction, rows_done) is called after every chunk; fraction is
+    None for Excel files, whose read position doesn't track progress.
+    Date formats detected on the first chunk are reused for the rest, and parse
+    counts for all chunks are added to date_report if given. With a cache_key
+    the normalized file is also kept in upload_cache.
+    Returns the number of rows stored.
+    """
+    size = max(getattr(file, 'size', 0) or 0, 1)
+    state = {'rows': 0}
+    date_report = {} if date_report is None else date_report
+
+    def normalized_chunks():
+        for chunk in iter_chunks(file, name, chunk_rows):
+            yield normalize_frame(chunk, mapping, date_report)
+            state['rows'] += len(chunk)
+            if on_progress is not None:
+                fraction = min(file.tell() / size, 1.0) if is_csv(name) else None
+                on_progress(fraction, state['rows'])
+
+    fd, path = tempfile.mkstemp(suffix='.arrow')
+    try:
+        with os.fdopen(fd, 'wb') as sink:
+            rows = storage.write_frames(normalized_chunks(), sink)
+        if rows:
+            auth.save_user_data_file(username, path, name)
+            if cache_key is not None:
+                upload_cache.put_file(cache_key, path, date_report)
+        return rows
+    finally:
+        os.remove(path)
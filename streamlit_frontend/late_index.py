@@ -0,0 +1,149 @@
+import copy
+import numpy as np
+import pandas as pd
+
+import aggregates
+import dataset_state
+from delivery_metrics import STATUS_LABELS
+
+# --- LATE-DELIVERY INDEX ---
+# Positions of the late rows ordered by Days Late (worst first), overall and per
+# agent, plus running totals for the KPI strip. It is built once per dataset and
+# cached with the aggregates. After an edit the previous version's index is
+# copied and only the rows the edit changed are moved (dataset_state records
+# them), instead of re-deriving and re-sorting every late row. Rows with the
+# same delay are kept in position order, so a moved row's place is found by
+# binary search. Top-K queries slice the ordered positions, so they cost O(K).
+AGENT_COL = 'RESPONSIBLE_PERSON'
+NAME = ('late_index',)
+LATE = list(STATUS_LABELS).index('Late')
+PENDING = list(STATUS_LABELS).index('Pending')
+
+
+def _find(order, keys, positions, position_keys):
+    """Where each (position, key) sits, or would go, in an ordered (order, keys) pair: O(log n) apiece."""
+    lo = np.searchsorted(keys, position_keys, side='left')
+    hi = np.searchsorted(keys, position_keys, side='right')
+    # Equal keys are ordered by position
+    return np.array([a + np.searchsorted(order[a:b], p) for a, b, p in zip(lo, hi, positions)], dtype='int64')
+
+
+def _move(order, keys, remove, remove_keys, add, add_keys):
+    """
+    Takes the positions in `remove` (at their old keys) out of an ordered
+    (order, keys) pair and inserts `add` at their keys, in one splice. Only the
+    changed entries are searched; the arrays are copied once, since the old
+    version stays cached.
+    """
+    if not len(remove) and not len(add):
+        return order, keys
+    gone = np.sort(_find(order, keys, remove, remove_keys))
+    sort = np.lexsort((add, add_keys))
+    add, add_keys = add[sort], add_keys[sort]
+    at = _find(order, keys, add, add_keys)
+
+    size = len(order) - len(gone) + len(add)
+    # Inserted entries land after the kept entries before them and the entries inserted earlier
+    placed = at - np.searchsorted(gone, at) + np.arange(len(add))
+    kept = np.ones(size, dtype=bool)
+    kept[placed] = False
+    keep = np.ones(len(order), dtype=bool)
+    keep[gone] = False
+    new_order, new_keys = np.empty(size, dtype=order.dtype), np.empty(size, dtype=keys.dtype)
+    new_order[placed], new_keys[placed] = add, add_keys
+    new_order[kept], new_keys[kept] = order[keep], keys[keep]
+    return new_order, new_keys
+
+
+class LateIndex:
+    """Late rows of one dataset version, worst first; treat as read-only (use updated() for a changed copy)."""
+
+    def __init__(self, df):
+        self.rows = 0
+        self.status = np.empty(0, dtype='int8')
+        self.days = np.empty(0, dtype='float64')
+        self.agents = np.empty(0, dtype=object)
+        self.delivered = 0
+        self.late_sum = 0.0
+        self._read(df, np.arange(len(df)))
+
+        late = np.flatnonzero(self.status == LATE)
+        keys = -self.days[late]
+        sort = np.argsort(keys, kind='stable')
+        self.order, self.keys = late[sort], keys[sort]
+        agents = pd.Series(self.agents[self.order])
+        self.by_agent = {agent: (self.order[i], self.keys[i]) for agent, i in agents.groupby(agents).indices.items()}
+
+    def _read(self, df, positions):
+        """Loads the rows at `positions` (new rows may extend the dataset) and adds them to the totals."""
+        if len(df) > self.rows:
+            grow = len(df) - self.rows
+            self.status = np.concatenate([self.status, np.full(grow, PENDING, dtype='int8')])
+            self.days = np.concatenate([self.days, np.zeros(grow)])
+            self.agents = np.concatenate([self.agents, np.full(grow, None, dtype=object)])
+            self.rows = len(df)
+        rows = df.iloc[positions]
+        status = pd.Categorical(rows['Delivery Status'], categories=STATUS_LABELS).codes
+        self.status[positions] = status
+        self.days[positions] = rows['Days Late'].to_numpy(dtype='float64', na_value=0.0)
+        if AGENT_COL in df.columns:
+            self.agents[positions] = rows[AGENT_COL].to_numpy(dtype=object)
+        self.delivered += int((status != PENDING).sum())
+        self.late_sum += float(self.days[positions[status == LATE]].sum())
+
+    def updated(self, df, changed):
+        """A copy re-reading the rows at `changed` (dataset positions; added rows come after the old ones)."""
+        if len(df) < self.rows:
+            return LateIndex(df)   # rows were deleted, positions moved
+        new = copy.copy(self)
+        new.status, new.days, new.agents = self.status.copy(), self.days.copy(), self.agents.copy()
+        changed = np.unique(np.asarray(changed, dtype='int64'))
+        old = changed[changed < self.rows]
+        was_late = old[self.status[old] == LATE]
+        new.delivered -= int((self.status[old] != PENDING).sum())
+        new.late_sum -= float(self.days[was_late].sum())
+        new._read(df, changed)
+
+        now_late = changed[new.status[changed] == LATE]
+        new.order, new.keys = _move(self.order, self.keys, was_late, -self.days[was_late],
+                                    now_late, -new.days[now_late])
+        new.by_agent = dict(self.by_agent)
+        for agent in set(self.agents[was_late]) | set(new.agents[now_late]):
+            if pd.isna(agent):
+                continue
+            remove = was_late[self.agents[was_late] == agent]
+            add = now_late[new.agents[now_late] == agent]
+            empty = (np.empty(0, dtype='int64'), np.empty(0))
+            order, keys = _move(*self.by_agent.get(agent, empty), remove, -self.days[remove], add, -new.days[add])
+            if len(order):
+                new.by_agent[agent] = (order, keys)
+            else:
+                new.by_agent.pop(agent, None)
+        return new
+
+    def top(self, k=None, agent=None):
+        """Positions of the k worst late rows (all of them if k is None), optionally for one agent."""
+        order = self.order if agent is None else self.by_agent.get(agent, (self.order[:0],))[0]
+        return order if k is None else order[:k]
+
+    def late_agents(self):
+        """Agents with late rows, the one with the worst delay first."""
+        return sorted(self.by_agent, key=lambda agent: self.by_agent[agent][1][0])
+
+    def kpis(self):
+        """Counts and delays for the KPI strip, from the running totals (avg / max are None without late rows)."""
+        late = len(self.order)
+        return {'rows': self.rows, 'delivered': self.delivered, 'late': late,
+                'avg': self.late_sum / late if late else None, 'max': -self.keys[0] if late else None}
+
+
+def get(df):
+    """The index of the session's current dataset version, carried over from the previous version when possible."""
+    def compute():
+        previous = aggregates.peek(dataset_state.previous_token(), NAME)
+        changed = dataset_state.changed_rows()
+        if previous is not None and changed is not None:
+            return previous.updated(df, changed)
+        return LateIndex(df)
+
+    return aggregates.get_or_compute(dataset_state.version_token(), NAME, compute)
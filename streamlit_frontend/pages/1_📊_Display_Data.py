@@ -1,27 +1,36 @@
 import streamlit as st
+import numpy as np
 import pandas as pd
-import auth as auth_db
-from datetime import timedelta
+import row_store
+import dataset_state
+import aggregates
+import compaction
+import export
+import paging
+import history
+import profiling
+import write_behind
 
-# --- CONSTANTS ---
-DATA_KEY = 'main_data_df'
+DIFF_PREVIEW_ROWS = 500   # rows of each kind shown when comparing two versions
 
 # --- SET PAGE CONFIGURATION ---
 st.set_page_config(layout="wide")
+profiling.start_run("Display Data")
 
 # --- COLOR-CODED TITLE ---
 st.markdown("<h1 style='color: #EE6C4D;'>📊 Data Inspection and View</h1>", unsafe_allow_html=True)
 st.markdown("---")
 
 # Retrieve the DataFrame from the session state
-df = st.session_state.get(DATA_KEY)
+profiling.mark("load dataset")
+df = dataset_state.get_dataset()
 
 if df is not None:
     # Cleanup unnamed columns
     unnamed_cols = [col for col in df.columns if col.startswith('Unnamed:')]
     if unnamed_cols:
         df = df.drop(columns=unnamed_cols)
-        st.session_state[DATA_KEY] = df
+        dataset_state.update_dataset(df, changed_rows=np.empty(0, dtype='int64'))
         
     st.header("Data Overview")
 
@@ -36,52 +45,137 @@ if df is not None:
         st.metric(label="Total Columns", value=len(df.columns))
 
     st.markdown("---")
-    
+
+    # --- VIEW CONTROLS (sorting, filtering and search run server-side) ---
+    profiling.mark("view")
+    token = dataset_state.version_token()
+    col_search, col_sort, col_order = st.columns([2, 2, 1])
+    search = col_search.text_input("🔎 Search", placeholder="Text or ID contained in any column")
+    sort_col = col_sort.selectbox("Sort by", ["(original order)"] + df.columns.tolist())
+    ascending = col_order.radio("Order", ["Ascending", "Descending"], horizontal=True) == "Ascending"
+
+    col_filter, col_values = st.columns([1, 3])
+    filter_col = col_filter.selectbox("Filter column", ["(none)"] + paging.filterable_columns(df, token))
+    filter_values = []
+    if filter_col != "(none)":
+        options = aggregates.value_counts(df, token, filter_col).index.tolist()
+        filter_values = col_values.multiselect("Show only", options)
+
+    positions = paging.view_positions(
+        df, token,
+        sort_col=None if sort_col == "(original order)" else sort_col, ascending=ascending,
+        filter_col=None if filter_col == "(none)" else filter_col, filter_values=filter_values,
+        search=search)
+
+    col_size, col_page, col_info = st.columns([1, 1, 2])
+    page_size = col_size.selectbox("Rows per page", paging.PAGE_SIZES,
+                                   index=paging.PAGE_SIZES.index(paging.DEFAULT_PAGE_SIZE))
+    n_pages = paging.page_count(len(positions), page_size)
+    page = col_page.number_input(f"Page (of {n_pages:,})", min_value=1, max_value=n_pages, value=1, step=1)
+    visible = paging.page_positions(positions, int(page), page_size)
+    first = (int(page) - 1) * page_size
+    col_info.caption(f"Rows {first + 1 if len(visible) else 0:,}–{first + len(visible):,} of {len(positions):,}"
+                     + (f" (filtered from {len(df):,})" if len(positions) != len(df) else ""))
+    # The whole sorted/filtered view, not only this page
+    export.download_menu(df, "deliveries_view", "view_export", positions=positions)
+
+    # Only the visible page is sent to the browser
+    profiling.mark("page table")
+    page_df = paging.get_page(df, visible)
+
     if enable_editing:
         st.warning("Editing Mode: Changes will be saved to your account automatically.")
         
-        # Use st.data_editor for in-app editing
+        # Use st.data_editor for in-app editing of the visible page
+        # The key follows the dataset version, so each applied change starts a fresh change set
+        editor_key = f"display_page_editor_{dataset_state.get_version()}"
+        # Category columns are handed over as plain values so new entries can be typed in
+        editor_df = compaction.expand_categories(page_df)
         edited_df = st.data_editor(
-            df, 
+            editor_df, 
             use_container_width=True, 
             num_rows="dynamic",
-            key="display_page_editor" 
+            key=editor_key 
         )
+        changes = st.session_state.get(editor_key, {})
         
         # PERSISTENCE LOGIC
-        if not edited_df.equals(df):
-            # 1. Recalculate Logic (Optional: Re-run priority logic if dates changed)
-            try:
-                edited_df["EXPECTED DELIVERY DATE"] = pd.to_datetime(edited_df["EXPECTED DELIVERY DATE"])
-                edited_df["ACTUAL DELIVERY DATE"] = pd.to_datetime(edited_df["ACTUAL DELIVERY DATE"])
-                edited_df["Duration"] = edited_df["ACTUAL DELIVERY DATE"] - edited_df["EXPECTED DELIVERY DATE"]
-                edited_df["Days Late"] = (edited_df["Duration"].dt.total_seconds() / (60 * 60 * 24)).fillna(0)
-                
-                def calc_priority(days):
-                    if days > 5: return "High"
-                    if days > 0: return "Medium"
-                    return "Low"
-                
-                edited_df["PRIORITY"] = edited_df["Days Late"].apply(calc_priority)
-            except:
-                pass # Fallback if user is mid-typing dates
-
-            # 2. Save to Session State
-            st.session_state[DATA_KEY] = edited_df
+        if row_store.has_changes(changes):
+            profiling.mark("apply edits")
+            # 1. Apply the page's changes to the full dataset; metrics are re-derived only for the edited or added rows
+            new_df = paging.apply_page_edits(df, visible, edited_df, changes)
+
+            # 2. Save to Session State (bumps the dataset version)
+            dataset_state.update_dataset(new_df, paging.changed_positions(visible, edited_df, changes, len(df)))
             
-            # 3. CRITICAL: Save to Database
+            profiling.mark("save edits")
+            # 3. CRITICAL: Save to Database (only the changed rows when they can be keyed by ID).
+            # The write happens in the background; quick successive edits are written together
             if 'username' in st.session_state:
-                filename = st.session_state.get('current_file_name', 'Edited_Data.csv')
-                auth_db.save_user_data(st.session_state['username'], edited_df, filename)
+                delta = row_store.editor_delta(editor_df, edited_df, changes)
+                if delta is not None:
+                    # Save the rows as re-derived in new_df (Duration, Days Late, ...), not as typed
+                    delta = (paging.saved_rows(new_df, visible, edited_df, changes),) + delta[1:]
+                # IDs must still be unique across the whole dataset, not only on this page
+                if delta is not None and row_store.row_keys(new_df) is None:
+                    delta = None
+                filename = st.session_state.get(dataset_state.FILE_KEY, 'Edited_Data.csv')
+                write_behind.submit(st.session_state['username'], new_df, filename, delta, row_count=len(new_df),
+                                    token=dataset_state.save_token())
             
+            profiling.render_panel()   # keep this rerun in the history before restarting
             st.rerun() 
             
     else:
-        st.dataframe(df, use_container_width=True)
+        st.dataframe(page_df, use_container_width=True)
 
     st.markdown("---")
+    profiling.mark("statistics")
     with st.expander("Show Descriptive Statistics"):
-        st.dataframe(df.describe().T, use_container_width=True)
+        st.dataframe(aggregates.describe(df, token).T, use_container_width=True)
+
+    # --- VERSION HISTORY (every save is kept; unchanged chunks are shared between versions) ---
+    profiling.mark("version history")
+    if 'username' in st.session_state:
+        username = st.session_state['username']
+        with st.expander("🕘 Version History"):
+            versions = history.list_versions(username)
+            if versions.empty:
+                st.caption("No saved versions yet.")
+            else:
+                report = history.storage_report(username)
+                st.caption(f"{report['versions']} versions take {report['physical_bytes'] / 1e6:,.2f} MB "
+                           f"instead of {report['logical_bytes'] / 1e6:,.2f} MB "
+                           f"({report['dedup_ratio']:.1f}x through shared chunks)")
+                st.dataframe(versions, use_container_width=True, hide_index=True)
+
+                latest = int(versions['version'].iloc[0])
+                col_version, col_compare, col_restore = st.columns([1, 1, 1])
+                version = int(col_version.selectbox("Version", versions['version'].tolist()))
+                compare = col_compare.checkbox(f"Compare with latest (v{latest})")
+                if col_restore.button(f"↩️ Restore version {version}", disabled=version == latest):
+                    restored, filename = history.load_version(username, version)
+                    dataset_state.set_dataset(compaction.compact_frame(restored), filename)
+                    write_behind.submit(username, restored, filename, note=f"restored from v{version}",
+                                        token=dataset_state.save_token())
+                    profiling.render_panel()   # keep this rerun in the history before restarting
+                    st.rerun()
+
+                if compare and version != latest:
+                    changes = history.diff(username, version, latest)
+                    col_added, col_removed, col_changed = st.columns(3)
+                    col_added.metric("Rows added", f"{len(changes['added']):,}")
+                    col_removed.metric("Rows removed", f"{len(changes['removed']):,}")
+                    col_changed.metric("Rows changed", f"{len(changes['changed']):,}")
+                    for label, key in [("Added", 'added'), ("Removed", 'removed'),
+                                       ("Changed (now)", 'changed'), ("Changed (before)", 'before')]:
+                        if len(changes[key]):
+                            st.caption(f"{label} — first {min(len(changes[key]), DIFF_PREVIEW_ROWS):,} rows")
+                            st.dataframe(changes[key].head(DIFF_PREVIEW_ROWS), use_container_width=True, hide_index=True)
 
 else:
     st.error("Data not loaded. Please go back to the Home page and upload a file.")
+
+if st.session_state.get('username'):
+    write_behind.render_status(st.session_state['username'])
+profiling.render_panel()
@@ -1,9 +1,14 @@
 import streamlit as st
 import pandas as pd
 import plotly.express as px
+import aggregates
+import dataset_state
+import export
+import profiling
 
 # --- PAGE SETUP ---
 st.set_page_config(layout="wide", page_title="Logistics Analytics")
+profiling.start_run("Data Analysis")
 
 # --- ZOHO-INSPIRED STYLING ---
 st.markdown("""
@@ -30,11 +35,17 @@ st.markdown("<h1 class='main-header'>🧪 Full Logistics Analytics</h1>", unsafe
 st.markdown("Detailed breakdown of performance across all data dimensions.")
 st.markdown("---")
 
-# Retrieve the processed DataFrame from session state
-df = st.session_state.get('main_data_df')
+# Retrieve the processed DataFrame from session state (only the columns this page reads)
+profiling.mark("load dataset")
+PAGE_COLUMNS = ['Sales', 'Days Late', 'Delivery Status', 'RESPONSIBLE_PERSON', 'PRIORITY']
+df = dataset_state.get_dataset(PAGE_COLUMNS)
 
 if df is not None:
+    # Rollups below are cached per dataset version and shared with the other pages
+    token = dataset_state.version_token()
+
     # --- 1. GLOBAL PERFORMANCE STRIP ---
+    profiling.mark("metrics")
     st.subheader("🌐 Global Performance Metrics")
     m1, m2, m3, m4 = st.columns(4)
     
@@ -43,18 +54,18 @@ if df is not None:
     
     with m2:
         if 'Sales' in df.columns:
-            st.metric("Total Sales Amount", f"₹{df['Sales'].sum():,.2f}")
+            st.metric("Total Sales Amount", f"₹{aggregates.column_sum(df, token, 'Sales'):,.2f}")
         elif 'Days Late' in df.columns:
-            st.metric("Avg. System Delay", f"{df['Days Late'].mean():.1f} Days")
+            st.metric("Avg. System Delay", f"{aggregates.column_mean(df, token, 'Days Late'):.1f} Days")
             
     with m3:
         if 'Delivery Status' in df.columns:
-            late_count = len(df[df['Delivery Status'] == 'Late'])
+            late_count = aggregates.value_counts(df, token, 'Delivery Status').get('Late', 0)
             st.metric("Total Late Deliveries", late_count, delta=f"{late_count/len(df)*100:.1f}%", delta_color="inverse")
             
     with m4:
         if 'Delivery Status' in df.columns:
-            on_time_rate = (len(df[df['Delivery Status'] == 'On Time'])/len(df)*100)
+            on_time_rate = (aggregates.value_counts(df, token, 'Delivery Status').get('On Time', 0)/len(df)*100)
             st.metric("On-Time Performance", f"{on_time_rate:.1f}%")
 
     st.markdown("---")
@@ -64,37 +75,34 @@ if df is not None:
     
     # Auto-detect categorical columns for analysis
     # We exclude ID and Date columns for cleaner selection
-    categorical_cols = df.select_dtypes(include=['object']).columns.tolist()
+    categorical_cols = [col for col, dtype in dataset_state.column_dtypes().items() if dtype in ('object', 'category')]
     exclude = ['Order ID', 'Customer ID', 'Product ID', 'Order Date', 'Ship Date', 'Delivery Status', 'PRIORITY']
     explore_cols = [c for c in categorical_cols if c not in exclude]
     
     if explore_cols:
         col_select, col_empty = st.columns([1, 2])
         target_col = col_select.selectbox("Analyze Breakdown By:", explore_cols, index=0)
+        profiling.mark("breakdown")
         
-        # Prepare Analysis Data
-        agg_dict = {target_col: 'count'}
-        if 'Days Late' in df.columns: agg_dict['Days Late'] = 'mean'
-        if 'Sales' in df.columns: agg_dict['Sales'] = 'sum'
-        
-        stats = df.groupby(target_col).agg(agg_dict).rename(columns={
-            target_col: 'Volume (Order Count)', 
-            'Days Late': 'Avg Delay (Days)',
-            'Sales': 'Total Amount (₹)'
-        }).reset_index()
+        # Prepare Analysis Data (computed once per dataset version in the SQL analytics table; slider moves reuse it).
+        # target_col is only loaded if the grouping has to fall back to pandas
+        stats_sorted = aggregates.breakdown(df, token, target_col, username=st.session_state.get('username'),
+                                           saved_token=dataset_state.saved_token(),
+                                           load=lambda: dataset_state.get_dataset(PAGE_COLUMNS + [target_col]))
 
         # --- FIXING THE "MESSY" GRAPH ---
         # We sort by Volume and take Top 15 to keep the graph readable
-        stats_sorted = stats.sort_values(by='Volume (Order Count)', ascending=False)
         top_n = st.slider("Show Top N Categories in Chart:", 5, 30, 15)
         stats_plot = stats_sorted.head(top_n)
 
+        profiling.mark("breakdown chart")
         col_table, col_chart = st.columns([1, 1])
         
         with col_table:
             st.write(f"**Detailed Table: {target_col}**")
-            st.dataframe(stats.sort_values(by='Volume (Order Count)', ascending=False), 
+            st.dataframe(stats_sorted, 
                          use_container_width=True, hide_index=True)
+            export.download_menu(stats_sorted, f"breakdown_{target_col}", "breakdown_export")
         
         with col_chart:
             st.write(f"**Top {top_n} by Volume: {target_col}**")
@@ -116,6 +124,7 @@ if df is not None:
     st.markdown("---")
 
     # --- 3. WORKLOAD & RISK (Specific to Logistics) ---
+    profiling.mark("workload charts")
     st.markdown("<h3>🚨 Workload & Risk Matrix</h3>", unsafe_allow_html=True)
     
     c1, c2 = st.columns(2)
@@ -123,7 +132,7 @@ if df is not None:
     with c1:
         st.subheader("Agent/Segment Workload")
         if 'RESPONSIBLE_PERSON' in df.columns:
-            agent_data = df['RESPONSIBLE_PERSON'].value_counts().reset_index()
+            agent_data = aggregates.value_counts(df, token, 'RESPONSIBLE_PERSON').reset_index()
             agent_data.columns = ['Entity', 'Count']
             fig_agent = px.pie(agent_data, values='Count', names='Entity', hole=0.4,
                              color_discrete_sequence=px.colors.qualitative.Pastel)
@@ -134,7 +143,7 @@ if df is not None:
     with c2:
         st.subheader("Priority Distribution")
         if 'PRIORITY' in df.columns:
-            prio_data = df['PRIORITY'].value_counts().reset_index()
+            prio_data = aggregates.value_counts(df, token, 'PRIORITY').reset_index()
             prio_data.columns = ['Level', 'Count']
             fig_prio = px.bar(prio_data, x='Level', y='Count', color='Level',
                             color_discrete_map={'🔴 High': '#e74c3c', '🟠 Medium': '#EE6C4D', '🟢 Low': '#3498db'})
@@ -142,5 +151,10 @@ if df is not None:
         else:
             st.warning("'PRIORITY' column missing.")
 
+    cache = aggregates.cache_stats()
+    st.caption(f"Aggregate cache: {cache['hits']} hits / {cache['misses']} misses across {cache['versions']} dataset versions")
+
 else:
     st.error("Data not loaded. Please return to the Home page and upload your file.")
+
+profiling.render_panel()
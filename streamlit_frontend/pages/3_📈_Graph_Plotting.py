@@ -1,21 +1,35 @@
 import streamlit as st
 import pandas as pd
 import plotly.express as px
+import aggregates
+import dataset_state
+import export
+import profiling
+import rebalance
+import row_store
+import write_behind
+
+PLAN_PREVIEW_ROWS = 1_000
 
 # --- SET PAGE CONFIGURATION (MINIMAL CALL TO AVOID TYPE ERROR) ---
 st.set_page_config()
+profiling.start_run("Graph Plotting")
 
 # --- COLOR-CODED TITLE (ORANGE: #EE6C4D) ---
 st.markdown("<h1 style='color: #EE6C4D;'>📈 Data Visualization Dashboard</h1>", unsafe_allow_html=True)
 st.markdown("Visual representation of current status, workload, and priority distribution.")
 st.markdown("---")
 
-# Retrieve the processed DataFrame from session state
-df = st.session_state.get('main_data_df')
+# Retrieve the processed DataFrame from session state (only the columns charted here)
+profiling.mark("load dataset")
+df = dataset_state.get_dataset(['STATUS', 'PRIORITY', 'RESPONSIBLE_PERSON', 'Delivery Status'])
 
 if df is not None:
+    # Counts are cached per dataset version and shared with the other pages
+    token = dataset_state.version_token()
     
     # --- SECTION 1: STATUS AND PRIORITY ---
+    profiling.mark("status and priority charts")
     st.markdown("<h3 style='color: #EE6C4D;'>1. Delivery Status and Priority Breakdown</h3>", unsafe_allow_html=True)
     col1, col2 = st.columns(2)
 
@@ -23,7 +37,7 @@ if df is not None:
     with col1:
         st.subheader("Progress Status Distribution")
         if 'STATUS' in df.columns:
-            status_counts = df['STATUS'].value_counts().reset_index()
+            status_counts = aggregates.value_counts(df, token, 'STATUS').reset_index()
             status_counts.columns = ['Status', 'Count']
             
             fig_status = px.pie(
@@ -42,7 +56,7 @@ if df is not None:
     with col2:
         st.subheader("Workload by Priority Level")
         if 'PRIORITY' in df.columns:
-            priority_counts = df['PRIORITY'].value_counts().reset_index()
+            priority_counts = aggregates.value_counts(df, token, 'PRIORITY').reset_index()
             priority_counts.columns = ['Priority Level', 'Count']
             
             # Using custom orange for Medium to match branding
@@ -63,27 +77,86 @@ if df is not None:
     st.markdown("---")
     
     # --- SECTION 2: WORKLOAD BY AGENT ---
+    profiling.mark("agent chart")
     st.markdown("<h3 style='color: #EE6C4D;'>2. Workload by Delivery Agent</h3>", unsafe_allow_html=True)
     
     # Using the standardized column name 'RESPONSIBLE_PERSON'
     if 'RESPONSIBLE_PERSON' in df.columns:
-        person_workload = df['RESPONSIBLE_PERSON'].value_counts().reset_index()
-        person_workload.columns = ['Agent', 'Count']
+        # Optional: a balanced reassignment of the open deliveries (rebalance.py), shown against the current one
+        can_propose = 'STATUS' in df.columns or 'Delivery Status' in df.columns
+        propose = can_propose and st.toggle("⚖️ Propose a balanced assignment of open deliveries")
         
-        fig_agent = px.bar(
-            person_workload, 
-            x='Agent', 
-            y='Count', 
-            title='Total Items Assigned per Delivery Agent', 
-            color='Agent',
-            # Using a neutral, soft palette for agents
-            color_discrete_sequence=px.colors.qualitative.Antique, 
-            text='Count'
-        )
+        if propose:
+            all_agents = sorted(aggregates.value_counts(df, token, 'RESPONSIBLE_PERSON').index, key=str)
+            away = st.multiselect("Unavailable agents (their open deliveries are handed out)", all_agents,
+                                  key="rebalance_unavailable")
+            available = [agent for agent in all_agents if agent not in away]
+            moves, loads = aggregates.get_or_compute(token, ('rebalance', tuple(away)),
+                                                     lambda: rebalance.propose(df, available))
+            person_workload = (loads[['Items before', 'Items after']]
+                               .rename(columns={'Items before': 'Current', 'Items after': 'Proposed'})
+                               .reset_index().melt(id_vars='Agent', var_name='Assignment', value_name='Count'))
+            
+            fig_agent = px.bar(
+                person_workload, 
+                x='Agent', 
+                y='Count', 
+                title='Open Items per Delivery Agent: Current vs Proposed', 
+                color='Assignment',
+                barmode='group',
+                color_discrete_map={'Current': '#98C1D9', 'Proposed': '#EE6C4D'}, 
+                text='Count'
+            )
+        else:
+            person_workload = aggregates.value_counts(df, token, 'RESPONSIBLE_PERSON').reset_index()
+            person_workload.columns = ['Agent', 'Count']
+            
+            fig_agent = px.bar(
+                person_workload, 
+                x='Agent', 
+                y='Count', 
+                title='Total Items Assigned per Delivery Agent', 
+                color='Agent',
+                # Using a neutral, soft palette for agents
+                color_discrete_sequence=px.colors.qualitative.Antique, 
+                text='Count'
+            )
         fig_agent.update_traces(textposition='outside')
         st.plotly_chart(fig_agent, use_container_width=True)
+        
+        if propose:
+            open_items = int(loads['Items before'].sum())
+            st.info(f"{len(moves):,} of {open_items:,} open deliveries would change agent.")
+            if len(moves):
+                details = dataset_state.get_dataset(['ID NO.', 'NAME'])
+                detail_cols = [col for col in ['ID NO.', 'NAME', 'PRIORITY'] if col in details.columns]
+                plan = details.iloc[moves.index][detail_cols].assign(From=moves['From'].values, To=moves['To'].values)
+                st.dataframe(plan.head(PLAN_PREVIEW_ROWS), use_container_width=True, hide_index=True)
+                if len(plan) > PLAN_PREVIEW_ROWS:
+                    st.caption(f"First {PLAN_PREVIEW_ROWS:,} reassignments shown; download the plan for all of them.")
+                export.download_menu(plan, "reassignments", "plan_export")
+                
+                if st.button("✅ Apply reassignments"):
+                    full_df = dataset_state.get_dataset()
+                    new_df = rebalance.apply(full_df, moves)
+                    dataset_state.update_dataset(new_df, changed_rows=moves.index.to_numpy())
+                    # Save only the reassigned rows when they can be keyed by ID, like the editor does (in the background)
+                    if 'username' in st.session_state:
+                        delta = None
+                        if row_store.row_keys(new_df) is not None:
+                            rows = new_df.iloc[moves.index]
+                            delta = (rows, [row_store.OP_UPDATE] * len(rows), [])
+                        filename = st.session_state.get(dataset_state.FILE_KEY, 'Edited_Data.csv')
+                        write_behind.submit(st.session_state['username'], new_df, filename, delta,
+                                            row_count=len(new_df), note='rebalance', token=dataset_state.save_token())
+                    profiling.render_panel()   # keep this rerun in the history before restarting
+                    st.rerun()
     else:
         st.error("Cannot plot Workload by Person: Column 'RESPONSIBLE_PERSON' not found in the processed data.")
             
 else:
     st.error("Data not loaded. Please go back to the Home page and upload a CSV file.")
+
+if st.session_state.get('username'):
+    write_behind.render_status(st.session_state['username'])
+profiling.render_panel()
@@ -1,10 +1,16 @@
 import streamlit as st
 import pandas as pd
 import plotly.express as px
-from datetime import timedelta
+import delivery_metrics
+import aggregates
+import dataset_state
+import export
+import late_index
+import profiling
 
 # --- SET PAGE CONFIGURATION ---
 st.set_page_config(layout="wide", page_title="Risk Tracker")
+profiling.start_run("Late Deliveries")
 
 # --- PROFESSIONAL TITLE (COLOR APPLIED) ---
 st.markdown("<h1 style='color: #EE6C4D;'>🚨 Late Deliveries Detail Report</h1>", unsafe_allow_html=True)
@@ -13,7 +19,9 @@ st.markdown("---")
 
 # Retrieve the processed DataFrame from session state
 # This ensures that any edits or additions made in the 'Display Data' page are captured here.
-df = st.session_state.get('main_data_df')
+profiling.mark("load dataset")
+df = dataset_state.get_dataset(["ID NO.", "NAME", "EXPECTED DELIVERY DATE", "ACTUAL DELIVERY DATE", "Duration",
+                                 "Days Late", "Delivery Status", "RESPONSIBLE_PERSON", "PRIORITY"])
 
 if df is not None:
     
@@ -23,28 +31,23 @@ if df is not None:
     # Check if the required columns are in the DataFrame
     if all(col in df.columns for col in required_cols):
         
-        # 1. Force conversion to datetime objects (Essential for accurate subtraction after edits)
-        df["EXPECTED DELIVERY DATE"] = pd.to_datetime(df["EXPECTED DELIVERY DATE"], dayfirst=True, errors='coerce')
-        df["ACTUAL DELIVERY DATE"] = pd.to_datetime(df["ACTUAL DELIVERY DATE"], dayfirst=True, errors='coerce')
+        # Duration, Days Late and Delivery Status are kept up to date by the upload and the editor
+        # (only the edited or added rows are re-derived); they are only computed here when missing
+        profiling.mark("date parsing")
+        if not delivery_metrics.has_delivery_metrics(df):
+            date_report = {}
+            delivery_metrics.add_delivery_metrics(df, priority=False, report=date_report)
+            coerced = delivery_metrics.coerced_count(date_report)
+            if coerced:
+                st.caption(f"⚠️ {coerced} date value(s) could not be read and were left blank.")
         
-        # 2. Recalculate Duration and Days Late inside this page 
-        # This ensures that even if you added a new row, the 'Late' status is calculated immediately.
-        df["Duration"] = df["ACTUAL DELIVERY DATE"] - df["EXPECTED DELIVERY DATE"]
-        
-        def calculate_status(dur):
-            if pd.isnull(dur): return "Pending"
-            return "Late" if dur > timedelta(days=0) else "On Time"
-
-        df["Delivery Status"] = df["Duration"].apply(calculate_status)
-        df["Days Late"] = (df["Duration"].dt.total_seconds() / (60 * 60 * 24)).fillna(0)
-        
-        # KPI Calculations
-        total_records = len(df) # This will correctly show 61 if a new row was added
-        df_delivered = df.dropna(subset=["ACTUAL DELIVERY DATE"]).copy()
-        delayed_df = df_delivered[df_delivered["Duration"] > timedelta(days=0)].copy()
-        
-        total_delivered = len(df_delivered)
-        total_delayed = len(delayed_df)
+        profiling.mark("kpis")
+        # KPI Calculations, from the running totals of the late-delivery index (updated, not rebuilt, after edits)
+        index = late_index.get(df)
+        kpis = index.kpis()
+        total_records = kpis['rows'] # This will correctly show 61 if a new row was added
+        total_delivered = kpis['delivered']
+        total_delayed = kpis['late']
         
         # --- 1. KEY PERFORMANCE INDICATORS (KPIs) ---
         st.markdown("<h3 style='color: #EE6C4D;'>1. Delay Summary Metrics</h3>", unsafe_allow_html=True)
@@ -61,9 +64,9 @@ if df is not None:
             st.metric(label="Delayed Count", value=total_delayed, 
                       delta=f"{total_delayed / total_delivered * 100:.1f}% of Delivered" if total_delivered > 0 else None)
 
-        if not delayed_df.empty:
-            avg_delay = delayed_df['Days Late'].mean().round(2)
-            max_delay = delayed_df['Days Late'].max().round(2)
+        if total_delayed > 0:
+            avg_delay = round(kpis['avg'], 2)
+            max_delay = round(kpis['max'], 2)
 
             with col3:
                 st.error("Average Delay Time")
@@ -76,12 +79,20 @@ if df is not None:
         st.markdown("---")
 
         # --- 2. DELAYED ITEMS TABLE ---
+        profiling.mark("late table")
         st.markdown("<h3 style='color: #EE6C4D;'>2. List of All Delayed Shipments</h3>", unsafe_allow_html=True)
         
-        if delayed_df.empty:
+        if total_delayed == 0:
             st.success("🎉 No delayed deliveries found in the current selection!")
         else:
-            st.info(f"Showing {len(delayed_df)} items with recorded delays.")
+            # Worst delays first, read off the index: only the rows shown are taken from the dataset
+            col_top, col_agent = st.columns([1, 2])
+            top_k = col_top.number_input("Show worst", min_value=1, max_value=total_delayed,
+                                         value=min(50, total_delayed), step=10)
+            agent = col_agent.selectbox("Delivery agent", ["All agents"] + index.late_agents())
+            agent = None if agent == "All agents" else agent
+            top_positions = index.top(int(top_k), agent)
+            st.info(f"Showing the {len(top_positions)} worst of {len(index.top(agent=agent))} items with recorded delays.")
             
             ideal_columns = [
                 "ID NO.", "NAME", "EXPECTED DELIVERY DATE", 
@@ -89,10 +100,10 @@ if df is not None:
                 "RESPONSIBLE_PERSON", "PRIORITY"
             ]
             
-            available_cols = [col for col in ideal_columns if col in delayed_df.columns]
+            available_cols = [col for col in ideal_columns if col in df.columns]
             
             st.dataframe(
-                delayed_df[available_cols].sort_values(by="Days Late", ascending=False), 
+                df.iloc[top_positions][available_cols], 
                 use_container_width=True,
                 hide_index=True,
                 column_config={
@@ -101,14 +112,18 @@ if df is not None:
                     "ACTUAL DELIVERY DATE": st.column_config.DateColumn("Actual")
                 }
             )
+            # The download has all of the agent's (or every) delayed shipment, worst first
+            export.download_menu(df, "late_deliveries", "late_export", positions=index.top(agent=agent),
+                                 columns=available_cols)
 
         st.markdown("---")
 
         # --- 3. PERFORMANCE CHART ---
+        profiling.mark("performance chart")
         st.markdown("<h3 style='color: #EE6C4D;'>3. Overall Delivery Performance</h3>", unsafe_allow_html=True)
 
         # Performance split including Pending items
-        performance_counts = df["Delivery Status"].value_counts().reset_index()
+        performance_counts = aggregates.value_counts(df, dataset_state.version_token(), "Delivery Status").reset_index()
         performance_counts.columns = ['Status', 'Count']
 
         fig = px.bar(
@@ -128,3 +143,5 @@ if df is not None:
         
 else:
     st.error("Data not loaded. Please go back to the Home page and upload a CSV file.")
+
+profiling.render_panel()
@@ -0,0 +1,181 @@
+import numpy as np
+import pandas as pd
+
+import aggregates
+import compaction
+import delivery_metrics
+import row_store
+import shared_store
+
+# --- SERVER-SIDE PAGED VIEW ---
+# Sorting, filtering and search run here on the full dataset and produce the row
+# positions of the view, cached per dataset version (aggregates). Only one page
+# of rows is sliced out and sent to the browser, so switching pages costs the
+# same whatever the dataset size.
+PAGE_SIZES = [100, 500, 1000, 5000]
+DEFAULT_PAGE_SIZE = 500
+FILTER_MAX_VALUES = 200   # columns with more distinct values than this can't be filtered by value
+
+
+def filterable_columns(df, token):
+    """Columns whose distinct values are few enough to pick from in a filter."""
+    cols = []
+    for col in df.columns:
+        dtype = df[col].dtype
+        if dtype == object or isinstance(dtype, pd.CategoricalDtype) or pd.api.types.is_bool_dtype(dtype):
+            if len(aggregates.value_counts(df, token, col)) <= FILTER_MAX_VALUES:
+                cols.append(col)
+    return cols
+
+
+def _search_mask(df, text):
+    """Rows where any text column (or the row id) contains `text`, case-insensitive."""
+    mask = np.zeros(len(df), dtype=bool)
+    for col in df.columns:
+        series = df[col]
+        if isinstance(series.dtype, pd.CategoricalDtype):
+            # Match the categories once, then look the result up by code
+            hits = series.cat.categories.astype(str).str.contains(text, case=False, regex=False)
+            codes = series.cat.codes.to_numpy()
+            mask |= np.append(np.asarray(hits, dtype=bool), False)[codes]
+        elif series.dtype == object or col == row_store.KEY_COLUMN:
+            mask |= series.astype(str).str.contains(text, case=False, regex=False).to_numpy()
+    return mask
+
+
+def _sorted_positions(df, positions, sort_col, ascending):
+    values = df[sort_col].iloc[positions].reset_index(drop=True)
+    try:
+        order = values.sort_values(ascending=ascending, kind='stable', na_position='last').index
+    except TypeError:
+        # Mixed types typed into the editor: fall back to comparing as text
+        order = values.astype(str).sort_values(ascending=ascending, kind='stable').index
+    return positions[np.asarray(order)]
+
+
+def view_positions(df, token, sort_col=None, ascending=True, filter_col=None, filter_values=(), search=''):
+    """Row positions (into df) of the filtered, searched and sorted view, cached per dataset version."""
+    filter_values = tuple(filter_values)
+    search = search.strip()
+
+    def compute():
+        mask = np.ones(len(df), dtype=bool)
+        if filter_col is not None and filter_values:
+            mask &= df[filter_col].isin(filter_values).to_numpy()
+        if search:
+            mask &= _search_mask(df, search)
+        positions = np.flatnonzero(mask)
+        if sort_col is not None:
+            positions = _sorted_positions(df, positions, sort_col, ascending)
+        return positions
+
+    key = ('view', sort_col, ascending, filter_col, filter_values, search)
+    return aggregates.get_or_compute(token, key, compute)
+
+
+def page_count(n_rows, page_size):
+    return max((n_rows + page_size - 1) // page_size, 1)
+
+
+def page_positions(positions, page, page_size):
+    """Positions of the rows on a 1-based page of the view."""
+    start = (page - 1) * page_size
+    return positions[start:start + page_size]
+
+
+def get_page(df, positions):
+    """The rows at the given positions, keeping the dataset's row labels."""
+    return df.iloc[positions]
+
+
+def _fit_categories(df, col, values):
+    """Adds the values not yet among the categories of df[col] (a category column), in place."""
+    new = pd.Index(values.dropna().unique()).difference(df[col].cat.categories)
+    if len(new):
+        df[col] = df[col].cat.add_categories(new)
+
+
+def _write_rows(df, positions, rows):
+    """Writes `rows` (frame with df's columns) over the rows of df at `positions`, in place."""
+    for col in df.columns.intersection(rows.columns):
+        values = rows[col]
+        if isinstance(df[col].dtype, pd.CategoricalDtype):
+            _fit_categories(df, col, values)
+        elif values.dtype.kind != df[col].dtype.kind:
+            # e.g. text typed into a number column: widen the column to a type that holds both
+            df[col] = df[col].astype(pd.concat([df[col].iloc[:0], values.iloc[:0]]).dtype)
+        df.iloc[positions, df.columns.get_loc(col)] = values.to_numpy()
+
+
+def _append_rows(df, rows):
+    """df with `rows` appended; category columns stay categories."""
+    rows = rows.reindex(columns=df.columns)
+    for col in df.columns:
+        if isinstance(df[col].dtype, pd.CategoricalDtype):
+            _fit_categories(df, col, rows[col])
+            rows[col] = pd.Categorical(rows[col], dtype=df[col].dtype)
+    return pd.concat([df, rows], ignore_index=True)
+
+
+def changed_positions(positions, edited_page, changes, n_rows):
+    """
+    Dataset positions of the rows a page's change set edits or adds (added rows
+    go after the n_rows existing ones), or None if it deletes rows.
+    """
+    edited_pos, _, added_pos, deleted_pos = row_store.change_positions(changes, len(edited_page))
+    if deleted_pos:
+        return None
+    return np.concatenate([np.asarray(positions)[edited_pos], np.arange(n_rows, n_rows + len(added_pos))]).astype('int64')
+
+
+def saved_rows(out, positions, edited_page, changes):
+    """
+    The rows of `out` (as returned by apply_page_edits) that a page's change set
+    edited or added, in the order row_store.editor_delta lists them, so a saved
+    delta carries the re-derived delivery metrics and not the editor's values.
+    """
+    edited_pos, _, added_pos, deleted_pos = row_store.change_positions(changes, len(edited_page))
+    positions = np.asarray(positions)
+    targets = positions[edited_pos].astype('int64')
+    # Deleted rows were dropped from out: later rows moved up
+    targets -= np.searchsorted(np.sort(positions[deleted_pos]), targets)
+    n_added = len(added_pos)
+    return out.iloc[np.concatenate([targets, np.arange(len(out) - n_added, len(out))]).astype('int64')]
+
+
+def apply_page_edits(df, positions, edited_page, changes):
+    """
+    Applies a st.data_editor change set made on one page to the full dataset.
+    `positions` are the dataset positions of the page rows, `edited_page` the
+    frame the editor returned. Returns a new frame with the delivery metrics of
+    the edited and added rows re-derived.
+    """
+    edited_pos, updated_pos, added_pos, deleted_pos = row_store.change_positions(changes, len(edited_page))
+
+    # Copy-on-write: only the columns the edit writes are copied, the rest stay
+    # shared with df (and with the shared store, whose columns are read-only)
+    out = df.copy(deep=False)
+    targets = np.asarray(positions)[edited_pos].astype('int64')
+    edited_cols = [col for col in df.columns
+                   if any(col in edit for edit in changes.get('edited_rows', {}).values())]
+    shared_store.own_columns(out, edited_cols + delivery_metrics.DERIVED_COLUMNS if len(targets) else [])
+    if len(targets):
+        _write_rows(out, targets, edited_page.iloc[updated_pos][edited_cols])
+
+    if added_pos:
+        out = _append_rows(out, edited_page.iloc[added_pos])
+        targets = np.append(targets, np.arange(len(out) - len(added_pos), len(out)))
+    else:
+        out.index = pd.RangeIndex(len(out))
+
+    try:
+        delivery_metrics.update_delivery_metrics(out, out.index[targets])
+    except (TypeError, ValueError):
+        pass  # Fallback if user is mid-typing dates
+
+    if deleted_pos:
+        out = out.drop(index=out.index[np.asarray(positions)[deleted_pos]]).reset_index(drop=True)
+    # Only columns the edit gave a new dtype (widened by typed values, ints made float by an added
+    # row with blanks, ...) can need compacting again; the others are as compact as in df
+    retyped = [col for col in out.columns if col not in df.columns or out[col].dtype != df[col].dtype]
+    return compaction.compact_frame(out, retyped)
@@ -0,0 +1,152 @@
+import json
+import os
+import threading
+import time
+from collections import deque
+
+import pandas as pd
+import streamlit as st
+
+import shared_store
+
+# --- DEVELOPER PROFILER ---
+# Opt-in (LOGITRACK_PROFILE=1). Each page calls start_run at the top,
+# mark('stage') before each named part of the rerun, and render_panel at the
+# end, which shows the rerun's breakdown in the sidebar: time per stage, SQLite
+# statements / bytes / time (counted by db.py), cache hits and misses
+# (aggregates, upload_cache) and the memory of the session's dataset (private
+# vs viewed from shared_store) and of the server's sessions. The last
+# HISTORY_SIZE reruns are kept per session and can be downloaded as JSON.
+# When disabled every hook returns right away.
+ENABLED = os.environ.get('LOGITRACK_PROFILE', '').lower() in ('1', 'true', 'yes')
+HISTORY_KEY = 'profile_history'
+HISTORY_SIZE = 100
+SLOWEST_QUERIES = 5
+
+# The rerun being profiled on this thread (Streamlit runs each session's script on its own thread)
+_local = threading.local()
+
+
+def _run():
+    return getattr(_local, 'run', None)
+
+
+def start_run(page):
+    """Starts profiling a rerun of `page`."""
+    if not ENABLED:
+        return
+    now = time.perf_counter()
+    _local.run = {'page': page, 'started': time.time(), 'start': now, 'stages': {},
+                  'stage': 'setup', 'stage_start': now,
+                  'db': {'statements': 0, 'seconds': 0.0, 'bytes_read': 0, 'bytes_written': 0}, 'slowest': [],
+                  'counters': {}}
+
+
+def mark(name):
+    """Ends the current stage and starts `name`; time until the next mark is charged to it."""
+    run = _run()
+    if run is None:
+        return
+    now = time.perf_counter()
+    run['stages'][run['stage']] = run['stages'].get(run['stage'], 0.0) + now - run['stage_start']
+    run['stage'], run['stage_start'] = name, now
+
+
+def count(name, n=1):
+    """Adds n to a named counter of the current rerun (e.g. cache hits)."""
+    run = _run()
+    if run is not None:
+        run['counters'][name] = run['counters'].get(name, 0) + n
+
+
+def _size(value):
+    if isinstance(value, (bytes, bytearray, memoryview, str)):
+        return len(value)
+    return 8 if value is not None else 0
+
+
+def row_bytes(rows):
+    """Approximate payload size of SQLite parameters or result rows."""
+    if rows is None:
+        return 0
+    if isinstance(rows, (tuple, list)) and rows and isinstance(rows[0], (tuple, list)):
+        return sum(_size(v) for row in rows for v in row)
+    if isinstance(rows, dict):
+        rows = rows.values()
+    return sum(_size(v) for v in rows)
+
+
+def record_query(sql, seconds, bytes_read=0, bytes_written=0, statements=1):
+    """Called by db.py for each statement (and each fetch, with statements=0)."""
+    run = _run()
+    if run is None:
+        return
+    db = run['db']
+    db['statements'] += statements
+    db['seconds'] += seconds
+    db['bytes_read'] += bytes_read
+    db['bytes_written'] += bytes_written
+    if statements:
+        slowest = run['slowest']
+        slowest.append((seconds, ' '.join(str(sql).split())[:120]))
+        slowest.sort(reverse=True)
+        del slowest[SLOWEST_QUERIES:]
+
+
+def _finish(run):
+    mark('render profiler')
+    db = dict(run['db'])
+    db['ms'] = db.pop('seconds') * 1000
+    frames = [st.session_state.get(key) for key in ('main_data_df', 'dataset_partial')]
+    memory = [shared_store.frame_memory(df) for df in frames if df is not None]
+    return {
+        'page': run['page'],
+        'started': time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(run['started'])),
+        'total_ms': (time.perf_counter() - run['start']) * 1000,
+        'stages_ms': {name: seconds * 1000 for name, seconds in run['stages'].items()},
+        'db': db,
+        'slowest_queries': [{'ms': seconds * 1000, 'sql': sql} for seconds, sql in run['slowest']],
+        'counters': run['counters'],
+        'dataset_shared_mb': sum(shared for shared, _ in memory) / 1e6,
+        'dataset_private_mb': sum(private for _, private in memory) / 1e6,
+    }
+
+
+def render_panel():
+    """Closes the current rerun and shows the profiler in the sidebar."""
+    run = _run()
+    if run is None:
+        return
+    record = _finish(run)
+    _local.run = None
+    history = st.session_state.setdefault(HISTORY_KEY, deque(maxlen=HISTORY_SIZE))
+    history.append(record)
+
+    with st.sidebar.expander("🛠️ Profiler", expanded=False):
+        st.caption(f"{record['page']} rerun: {record['total_ms']:,.0f} ms")
+        stages = pd.DataFrame({'ms': record['stages_ms']}).sort_values('ms', ascending=False)
+        stages['share'] = (stages['ms'] / record['total_ms']).map('{:.0%}'.format)
+        st.dataframe(stages.round(1), use_container_width=True)
+
+        db = record['db']
+        st.caption(f"SQLite: {db['statements']} statements, {db['ms']:,.1f} ms, "
+                   f"{db['bytes_read'] / 1e6:,.2f} MB read, {db['bytes_written'] / 1e6:,.2f} MB written")
+        if record['slowest_queries']:
+            st.dataframe(pd.DataFrame(record['slowest_queries']).round(1), use_container_width=True, hide_index=True)
+        counters = ', '.join(f"{name}: {value}" for name, value in sorted(record['counters'].items()))
+        st.caption(f"Caches: {counters or 'no lookups'}")
+        st.caption(f"Session dataset: {record['dataset_private_mb']:,.1f} MB private, "
+                   f"{record['dataset_shared_mb']:,.1f} MB viewed from the shared store")
+        sessions, totals = shared_store.memory_report()
+        resident = 'n/a' if totals['resident_mb'] is None else f"{totals['resident_mb']:,.0f} MB"
+        st.caption(f"Server: {totals['sessions']} sessions, {totals['datasets']} shared datasets "
+                   f"({totals['store_mb']:,.1f} MB), {totals['private_mb']:,.1f} MB private, {resident} resident")
+        if len(sessions):
+            st.dataframe(sessions.round(1), use_container_width=True, hide_index=True)
+
+        st.caption(f"Last {len(history)} reruns (ms)")
+        st.dataframe(pd.DataFrame([{'page': r['page'], 'started': r['started'], 'total': r['total_ms'],
+                                    'db': r['db']['ms']} for r in reversed(history)]).round(1),
+                     use_container_width=True, hide_index=True)
+        st.download_button("Export history (JSON)", json.dumps(list(history), indent=2),
+                           file_name="profile_history.json", mime="application/json")
@@ -0,0 +1,96 @@
+import heapq
+import numpy as np
+import pandas as pd
+
+import shared_store
+
+# --- WORKLOAD REBALANCING ---
+# Proposes new agents for the open deliveries (STATUS Pending / In Progress) so
+# the open workload is spread evenly. A delivery weighs more the higher its
+# priority. Two greedy passes, highest priority first:
+#   1. every agent keeps its own open deliveries while below the fair share
+#      (total weight / agents), so urgent work stays with who already has it;
+#   2. the rest (over the share, unassigned, or held by an unavailable agent)
+#      goes to whoever has the least load at that moment, taken off a min-heap.
+# O(n log n + m log agents) for n open deliveries of which m are handed out.
+AGENT_COL = 'RESPONSIBLE_PERSON'
+OPEN_STATUSES = ['Pending', 'In Progress']
+PRIORITY_WEIGHTS = {'HIGH': 3, 'MEDIUM': 2}   # matched anywhere in the label (e.g. '🔴 High'); anything else weighs 1
+UNASSIGNED = '(unassigned)'
+
+
+def open_mask(df):
+    """Open deliveries: STATUS Pending / In Progress, or without an actual delivery date if there is no STATUS."""
+    if 'STATUS' in df.columns:
+        return df['STATUS'].isin(OPEN_STATUSES).to_numpy()
+    return (df['Delivery Status'] == 'Pending').to_numpy()
+
+
+def priority_weights(priority):
+    """Weight of each delivery from its PRIORITY label (3 High, 2 Medium, 1 otherwise)."""
+    labels = priority.astype(str).str.upper()
+    return np.select([labels.str.contains(name, regex=False).to_numpy() for name in PRIORITY_WEIGHTS],
+                     list(PRIORITY_WEIGHTS.values()), default=1)
+
+
+def _loads(agents, weights, suffix):
+    """Open items and weight per agent."""
+    owner = pd.Series(agents, dtype=object).fillna(UNASSIGNED)
+    return pd.DataFrame({'Items': 1, 'Weight': weights}).groupby(owner).sum().add_suffix(suffix)
+
+
+def propose(df, agents=None, agent_col=AGENT_COL):
+    """
+    Proposes reassignments of df's open deliveries among `agents` (default:
+    every agent in agent_col). Returns (moves, loads):
+      moves - one row per reassigned delivery, indexed by its position in df, with 'From' and 'To'
+      loads - open items and weight per agent, 'Items before' / 'Items after' / 'Weight before' / 'Weight after'
+    """
+    if agents is None:
+        agents = df[agent_col].dropna().unique()
+    agents = pd.Index(sorted(agents, key=str), dtype=object)
+    positions = np.flatnonzero(open_mask(df))
+    current = df[agent_col].to_numpy(dtype=object)[positions]
+    weights = priority_weights(df['PRIORITY'].iloc[positions]) if 'PRIORITY' in df.columns \
+        else np.ones(len(positions), dtype='int64')
+
+    # Highest priority first; equal priorities keep the dataset order
+    order = np.argsort(-weights, kind='stable')
+    positions, current, weights = positions[order], current[order], weights[order]
+    codes = agents.get_indexer(current)
+
+    # 1. Agents keep their deliveries while below the fair share
+    share = weights.sum() / max(len(agents), 1)
+    running = pd.Series(weights).groupby(codes).cumsum().to_numpy()
+    keep = (codes >= 0) & (running - weights < share)
+    load = np.bincount(codes[keep], weights=weights[keep], minlength=len(agents))
+
+    # 2. Everything else to the least loaded agent
+    new_codes = codes.copy()
+    heap = [(load[i], i) for i in range(len(agents))]
+    heapq.heapify(heap)
+    if heap:
+        for j in np.flatnonzero(~keep):
+            agent_load, i = heap[0]
+            new_codes[j] = i
+            heapq.heapreplace(heap, (agent_load + weights[j], i))
+
+    moved = new_codes != codes
+    names = agents.to_numpy()
+    moves = pd.DataFrame({'From': current[moved], 'To': names[new_codes[moved]]}, index=positions[moved]).sort_index()
+    after = names[new_codes] if len(names) else current   # with agents to hand out to, every delivery has one
+    loads = pd.concat([_loads(current, weights, ' before'), _loads(after, weights, ' after')], axis=1)
+    loads = loads.reindex(loads.index.union(agents)).fillna(0).astype('int64')
+    return moves, loads.sort_values('Items before', ascending=False).rename_axis('Agent')
+
+
+def apply(df, moves, agent_col=AGENT_COL):
+    """A copy of df with the proposed agents written into agent_col (the other columns are shared with df)."""
+    out = shared_store.own_columns(df.copy(deep=False), [agent_col])
+    col = out.columns.get_loc(agent_col)
+    if isinstance(out[agent_col].dtype, pd.CategoricalDtype):
+        new = pd.Index(moves['To'].unique()).difference(out[agent_col].cat.categories)
+        if len(new):
+            out[agent_col] = out[agent_col].cat.add_categories(new)
+    out.iloc[moves.index.to_numpy(), col] = moves['To'].to_numpy()
+    return out
@@ -0,0 +1,143 @@
+import json
+import pandas as pd
+
+# --- ROW-KEYED DELTAS ---
+# Edits made in the data editor are persisted as row-level deltas keyed by
+# (username, row key) on top of the last full snapshot, so a one-cell fix only
+# writes the rows it touched.
+KEY_COLUMN = 'ID NO.'
+
+OP_UPDATE = 'update'   # edited row that already existed
+OP_INSERT = 'insert'   # row added in the editor (appended on load)
+OP_DELETE = 'delete'
+
+
+def row_keys(df):
+    """Returns the stable row keys of a dataset as strings, or None if the key column can't be used."""
+    if KEY_COLUMN not in df.columns:
+        return None
+    ids = df[KEY_COLUMN]
+    if ids.isna().any():
+        return None
+    if pd.api.types.is_float_dtype(ids) and (ids % 1 == 0).all():
+        ids = ids.astype('int64')
+    keys = pd.Index(ids.astype(str))
+    return keys if keys.is_unique else None
+
+
+def has_changes(changes):
+    """True if a st.data_editor change set contains any edit, addition or deletion."""
+    return any(changes.get(k) for k in ('edited_rows', 'added_rows', 'deleted_rows'))
+
+
+def change_positions(changes, n_after):
+    """
+    Maps an editor change set to row positions: (edited rows in `before`,
+    the same rows in `after`, added rows in `after`, deleted rows in `before`).
+    """
+    deleted_pos = sorted(int(p) for p in changes.get('deleted_rows', []))
+    deleted = set(deleted_pos)
+    edited_pos = sorted(int(p) for p in changes.get('edited_rows', {}) if int(p) not in deleted)
+
+    # Position of a surviving row in `after` = original position minus deletions before it
+    shift = pd.Index(deleted_pos, dtype='int64').searchsorted(edited_pos)
+    updated_pos = [p - s for p, s in zip(edited_pos, shift)]
+    n_added = len(changes.get('added_rows', []))
+    added_pos = list(range(n_after - n_added, n_after))
+    return edited_pos, updated_pos, added_pos, deleted_pos
+
+
+def touched_positions(changes, n_after):
+    """Positions in the editor's output frame of the rows that were edited or added."""
+    _, updated_pos, added_pos, _ = change_positions(changes, n_after)
+    return updated_pos + added_pos
+
+
+def editor_delta(before, after, changes):
+    """
+    Turns a st.data_editor change set into (rows to upsert, their ops, keys to delete).
+    `before` is the frame passed to the editor, `after` the frame it returned.
+    Returns None when rows can't be keyed, in which case the caller should fall
+    back to a full save.
+    """
+    before_keys, after_keys = row_keys(before), row_keys(after)
+    if before_keys is None or after_keys is None:
+        return None
+
+    edited_pos, updated_pos, added_pos, deleted_pos = change_positions(changes, len(after))
+    deleted_keys = set(before_keys[deleted_pos])
+    for old, new in zip(before_keys[edited_pos], after_keys[updated_pos]):
+        if old != new:
+            deleted_keys.add(old)
+
+    upserts = after.iloc[updated_pos + added_pos]
+    ops = [OP_UPDATE] * len(updated_pos) + [OP_INSERT] * len(added_pos)
+    deleted_keys -= set(after_keys[updated_pos + added_pos])
+    return upserts, ops, sorted(deleted_keys)
+
+
+def encode_rows(rows):
+    """Serializes each row to a JSON payload (dates/durations as ISO strings)."""
+    records = json.loads(rows.to_json(orient='records', date_format='iso'))
+    return [json.dumps(r) for r in records]
+
+
+def _conform(rows, like):
+    """Casts decoded JSON rows back to the dtypes of the snapshot they are applied to."""
+    rows = rows.reindex(columns=like.columns)
+    for col in like.columns:
+        dtype = like[col].dtype
+        if pd.api.types.is_datetime64_any_dtype(dtype):
+            rows[col] = pd.to_datetime(rows[col], errors='coerce')
+        elif pd.api.types.is_timedelta64_dtype(dtype):
+            rows[col] = pd.to_timedelta(rows[col], errors='coerce')
+        elif pd.api.types.is_numeric_dtype(dtype) and not pd.api.types.is_bool_dtype(dtype):
+            values = pd.to_numeric(rows[col], errors='coerce')
+            rows[col] = values.astype(dtype) if not values.isna().any() else values
+    return rows
+
+
+def _widen_categories(base, rows):
+    """Adds the values of `rows` a category column of base doesn't have yet to its categories (in place)."""
+    for col in base.columns:
+        if isinstance(base[col].dtype, pd.CategoricalDtype):
+            values = pd.Index(rows[col].dropna().unique())
+            new = values[~values.isin(base[col].cat.categories)]
+            if len(new):
+                base[col] = base[col].cat.add_categories(new)
+
+
+def apply_deltas(df, deltas):
+    """
+    Rebuilds the current dataset from a snapshot and its row deltas.
+    `deltas` is a list of (row_key, op, payload) ordered by sequence number.
+    """
+    keys = row_keys(df)
+    if keys is None or not deltas:
+        return df
+
+    base = df.set_axis(keys)
+    updates = [(k, json.loads(p)) for k, op, p in deltas if op == OP_UPDATE]
+    inserts = [(k, json.loads(p)) for k, op, p in deltas if op == OP_INSERT]
+    dropped = {k for k, op, _ in deltas if op != OP_UPDATE}
+    base = base[~base.index.isin(dropped)].copy()
+
+    if updates:
+        changed = _conform(pd.DataFrame([r for _, r in updates], index=[k for k, _ in updates]), df)
+        _widen_categories(base, changed)
+        in_place = changed.index.isin(base.index)
+        for col in base.columns:
+            base.loc[changed.index[in_place], col] = changed.loc[in_place, col].values
+        # An update whose key isn't in the snapshot (e.g. an edited ID) is appended
+        inserts = [(k, r) for (k, r), keep in zip(updates, in_place) if not keep] + inserts
+
+    if inserts:
+        added = _conform(pd.DataFrame([r for _, r in inserts], index=[k for k, _ in inserts]), df)
+        _widen_categories(base, added)
+        # Same categories on both sides, so concat keeps the category columns
+        for col in base.columns:
+            if isinstance(base[col].dtype, pd.CategoricalDtype):
+                added[col] = pd.Categorical(added[col], dtype=base[col].dtype)
+        base = pd.concat([base, added])
+
+    return base.reset_index(drop=True)
@@ -0,0 +1,248 @@
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import weakref
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.ipc as ipc
+
+import storage
+
+# --- SHARED DATASET STORE ---
+# Datasets installed in a session (upload, login, restore) are written once to
+# an uncompressed Arrow IPC file in STORE_DIR, named by a hash of their content,
+# and memory-mapped. Every session with the same content gets a shallow view of
+# the one mapped frame instead of a private copy: most columns point straight
+# into the mapping (pages are shared with the OS page cache and only read in
+# when touched), the rest (columns with nulls Arrow can't hand over as NumPy
+# arrays) are converted once per process. The shared arrays are made read-only;
+# a session that edits copies only the columns it writes (copy-on-write, see
+# own_columns). Views are tracked per session for memory_report(). Mapped
+# frames are dropped once no frame uses their columns (the views, and copies
+# made through own_columns, are counted), and files beyond MAX_BYTES are
+# removed least recently used first. LOGITRACK_SHARED_STORE=0 turns it off.
+ENABLED = os.environ.get('LOGITRACK_SHARED_STORE', '1').lower() not in ('0', 'false', 'no')
+STORE_DIR = os.environ.get('LOGITRACK_SHARED_DIR', 'shared_store')
+MAX_BYTES = int(os.environ.get('LOGITRACK_SHARED_MAX_MB', 4096)) * 1024 * 1024
+
+_lock = threading.Lock()
+_frames = {}     # content key -> mapped frame shared by every session viewing it
+_addresses = {}  # content key -> data addresses of the mapped frame's columns
+_refs = {}       # content key -> number of live frames using its columns
+_sessions = {}   # session id -> {name: weakref to the frame the session holds}
+
+
+def content_key(df):
+    """Hash of df's columns, dtypes and values (equal datasets share a key however they were loaded)."""
+    digest = hashlib.sha256(json.dumps([(str(col), str(dtype)) for col, dtype in df.dtypes.items()]).encode('utf-8'))
+    digest.update(pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes())
+    return digest.hexdigest()
+
+
+def _path(key):
+    return os.path.join(STORE_DIR, key + '.arrow')
+
+
+def _write(df, path):
+    """Uncompressed Arrow IPC file (compressed buffers can't be mapped), written atomically."""
+    os.makedirs(STORE_DIR, exist_ok=True)
+    table = storage.frame_to_table(df)
+    fd, tmp = tempfile.mkstemp(dir=STORE_DIR, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f, ipc.new_file(f, table.schema) as writer:
+            writer.write_table(table)
+        os.replace(tmp, path)
+    except BaseException:
+        os.remove(tmp)
+        raise
+
+
+def _data(series):
+    """The NumPy array holding a column's values (category codes for categories), or None."""
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        return series.cat.codes.to_numpy()
+    if isinstance(series.dtype, np.dtype):
+        return series.to_numpy()
+    return None   # extension arrays (nullable integers, ...) would be converted, not handed over
+
+
+def _address(data):
+    return data.__array_interface__['data'][0]
+
+
+def _frame_addresses(df):
+    return {_address(data) for data in (_data(series) for _, series in df.items())
+            if data is not None and data.size}
+
+
+def _map(path):
+    table = ipc.open_file(pa.memory_map(path)).read_all()
+    # One block per column: zero-copy where Arrow allows it, and a column can be replaced on its own
+    df = table.to_pandas(split_blocks=True)
+    for _, series in df.items():
+        data = _data(series)
+        # The column's array is a view: freeze everything it views too (the block pandas writes to)
+        while isinstance(data, np.ndarray):
+            data.flags.writeable = False
+            data = data.base
+    return df
+
+
+def _release(key):
+    with _lock:
+        _refs[key] -= 1
+        if not _refs[key]:
+            del _refs[key], _frames[key], _addresses[key]
+
+
+def _hold(df):
+    """Keeps the mapped frames df shares columns with registered for as long as df lives."""
+    used = _frame_addresses(df)
+    with _lock:
+        keys = [key for key, addresses in _addresses.items() if addresses & used]
+        for key in keys:
+            _refs[key] += 1
+    for key in keys:
+        weakref.finalize(df, _release, key)
+    return df
+
+
+def share(df):
+    """
+    A read-only view of df's content in the shared store (written and mapped the
+    first time that content is seen in this process); use it instead of df.
+    """
+    if not ENABLED:
+        return df
+    key = content_key(df)
+    path = _path(key)
+    with _lock:
+        mapped = key in _frames
+    if not mapped:
+        if not os.path.exists(path):
+            _write(df, path)
+            evict()
+        frame = _map(path)
+        addresses = _frame_addresses(frame)
+        with _lock:
+            if key not in _frames:
+                _frames[key], _addresses[key] = frame, addresses
+    with _lock:
+        view = _frames[key].copy(deep=False)
+        _refs[key] = _refs.get(key, 0) + 1
+    weakref.finalize(view, _release, key)
+    try:
+        os.utime(path)
+    except OSError:
+        pass
+    return view
+
+
+def own_columns(df, columns):
+    """
+    Replaces the given columns of df (a shallow copy about to be edited) with
+    private copies. The columns df still shares keep their mapped frame in the
+    store while df lives, even once the view it was copied from is gone.
+    """
+    for col in columns:
+        if col in df.columns:
+            df[col] = df[col].copy()
+    return _hold(df)
+
+
+def track(session_id, name, df):
+    """Records the frame a session holds under `name`, for memory_report (None forgets it)."""
+    with _lock:
+        frames = _sessions.setdefault(session_id, {})
+        if df is None:
+            frames.pop(name, None)
+        else:
+            frames[name] = weakref.ref(df)
+
+
+def _shared_addresses():
+    return set().union(*_addresses.values())
+
+
+def frame_memory(df, shared=None):
+    """(shared bytes, private bytes) of df: columns whose data lives in the store vs data held by df alone."""
+    shared = _shared_addresses() if shared is None else shared
+    shared_bytes = private_bytes = 0
+    for _, series in df.items():
+        size = int(series.memory_usage(index=False, deep=series.dtype == object))
+        data = _data(series)
+        if data is not None and data.size and _address(data) in shared:
+            shared_bytes += size
+        else:
+            private_bytes += size
+    return shared_bytes, private_bytes
+
+
+def _resident_bytes():
+    """Resident memory of the whole process, from /proc (None where that isn't available)."""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def memory_report():
+    """
+    (per-session DataFrame of shared / private MB, totals dict): shared data is
+    counted once in the totals however many sessions view it.
+    """
+    with _lock:
+        shared = _shared_addresses()
+        sessions = {sid: {name: ref() for name, ref in frames.items()} for sid, frames in _sessions.items()}
+        store_bytes = sum(int(frame.memory_usage(index=False).sum()) for frame in _frames.values())
+        datasets = len(_frames)
+    rows = []
+    for sid, frames in sessions.items():
+        viewed = private = 0
+        for df in frames.values():
+            if df is not None:
+                s, p = frame_memory(df, shared)
+                viewed, private = viewed + s, private + p
+        if viewed or private:
+            rows.append({'session': sid[:8], 'shared MB': viewed / 1e6, 'private MB': private / 1e6})
+        else:
+            with _lock:
+                _sessions.pop(sid, None)   # session ended or holds no dataset
+    report = pd.DataFrame(rows, columns=['session', 'shared MB', 'private MB'])
+    resident = _resident_bytes()
+    totals = {'sessions': len(report), 'datasets': datasets, 'store_mb': store_bytes / 1e6,
+              'private_mb': float(report['private MB'].sum()), 'viewed_mb': float(report['shared MB'].sum()),
+              'resident_mb': None if resident is None else resident / 1e6}
+    return report, totals
+
+
+def evict(max_bytes=None):
+    """Removes least recently used files until the store fits in max_bytes (default MAX_BYTES); mapped ones stay."""
+    max_bytes = MAX_BYTES if max_bytes is None else max_bytes
+    with _lock:
+        mapped = set(_frames)
+    entries, total = [], 0
+    for name in os.listdir(STORE_DIR):
+        if not name.endswith('.arrow'):
+            continue
+        try:
+            stat = os.stat(os.path.join(STORE_DIR, name))
+        except OSError:
+            continue   # removed by another process meanwhile
+        entries.append((stat.st_mtime, stat.st_size, name[:-len('.arrow')]))
+        total += stat.st_size
+    for _, size, key in sorted(entries):
+        if total <= max_bytes:
+            break
+        if key in mapped:
+            continue
+        try:
+            os.remove(_path(key))
+        except OSError:
+            pass
+        total -= size
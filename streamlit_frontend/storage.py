@@ -0,0 +1,186 @@
+import io
+import os
+import pandas as pd
+import pyarrow as pa
+import pyarrow.ipc as ipc
+
+import dates
+
+# --- STORAGE FORMATS ---
+# "arrow": compressed Arrow IPC file (schema + typed columns) stored as a BLOB
+# "csv":   legacy CSV text, kept so old rows can still be read
+ARROW_FORMAT = 'arrow'
+CSV_FORMAT = 'csv'
+STORAGE_FORMAT = os.environ.get('LOGITRACK_STORAGE_FORMAT', ARROW_FORMAT)
+
+COMPRESSION = 'zstd'
+BATCH_ROWS = 64 * 1024
+
+DATE_COLUMNS = ["EXPECTED DELIVERY DATE", "ACTUAL DELIVERY DATE"]
+
+
+def arrow_safe(df):
+    """Casts object columns holding mixed Python types (e.g. ints and text typed into the editor) to strings."""
+    fixed = {}
+    for col in df.columns[df.dtypes == object]:
+        try:
+            pa.array(df[col], from_pandas=True)
+        except (pa.ArrowInvalid, pa.ArrowTypeError):
+            fixed[col] = df[col].where(df[col].isna(), df[col].astype(str))
+    return df.assign(**fixed) if fixed else df
+
+
+def frame_to_table(df):
+    """Converts a DataFrame to an Arrow table, dropping the index."""
+    return pa.Table.from_pandas(arrow_safe(df), preserve_index=False)
+
+
+def encode_frame(df):
+    """Serializes a DataFrame into a compressed Arrow IPC file (bytes)."""
+    table = frame_to_table(df)
+    sink = pa.BufferOutputStream()
+    options = ipc.IpcWriteOptions(compression=COMPRESSION)
+    with ipc.new_file(sink, table.schema, options=options) as writer:
+        writer.write_table(table, max_chunksize=BATCH_ROWS)
+    return sink.getvalue().to_pybytes()
+
+
+def decode_frame(blob):
+    """Reads a DataFrame back from an Arrow IPC BLOB, restoring the saved dtypes."""
+    reader = ipc.open_file(pa.py_buffer(blob))
+    return reader.read_all().to_pandas()
+
+
+class BlobFile(io.RawIOBase):
+    """Read-only, seekable file over a sqlite3.Blob, so Arrow reads only the parts of a BLOB it needs."""
+
+    def __init__(self, blob):
+        self.blob = blob
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        self.blob.seek(offset, whence)
+        return self.blob.tell()
+
+    def tell(self):
+        return self.blob.tell()
+
+    def readinto(self, buffer):
+        data = self.blob.read(len(buffer))
+        buffer[:len(data)] = data
+        return len(data)
+
+
+def blob_source(blob):
+    """An Arrow input file over an open sqlite3.Blob."""
+    return pa.PythonFile(BlobFile(blob), mode='r')
+
+
+def file_info(source):
+    """
+    (row count, [(column, pandas dtype name)]) of an Arrow IPC file (path or
+    Arrow input file), read from its footer and batch headers only.
+    """
+    if isinstance(source, str):
+        with pa.memory_map(source) as mapped:
+            return file_info(mapped)
+    reader = ipc.open_file(source)
+    dtypes = reader.schema.empty_table().to_pandas().dtypes
+    return reader.count_rows(), [(str(col), str(dtype)) for col, dtype in dtypes.items()]
+
+
+def decode_columns(source, columns):
+    """Reads only the given columns of an Arrow IPC file; the other columns are never decompressed."""
+    schema = ipc.open_file(source).schema
+    fields = [schema.get_field_index(col) for col in columns if col in schema.names]
+    reader = ipc.open_file(source, options=ipc.IpcReadOptions(included_fields=fields))
+    return reader.read_all().to_pandas()
+
+
+def read_file_frame(path):
+    """Reads a whole Arrow IPC file written by write_frames into one DataFrame."""
+    with pa.memory_map(path) as source:
+        return ipc.open_file(source).read_all().to_pandas()
+
+
+def iter_file_frames(path):
+    """Yields an Arrow IPC file written by write_frames as DataFrames, one record batch at a time."""
+    with pa.memory_map(path) as source:
+        reader = ipc.open_file(source)
+        for i in range(reader.num_record_batches):
+            yield reader.get_batch(i).to_pandas()
+
+
+def _stable_schema(schema):
+    """First-chunk schema with all-null columns widened to strings, so later chunks can fill them."""
+    fields = [pa.field(f.name, pa.string()) if pa.types.is_null(f.type) else f for f in schema]
+    return pa.schema(fields, metadata=schema.metadata)
+
+
+def _conform_table(table, schema):
+    """Casts a later chunk to the schema fixed by the first chunk."""
+    if table.schema.equals(schema, check_metadata=False):
+        return table
+    columns = []
+    for field in schema:
+        if field.name not in table.column_names:
+            columns.append(pa.nulls(len(table), field.type))
+            continue
+        column = table.column(field.name)
+        try:
+            columns.append(column.cast(field.type))
+        except (pa.ArrowInvalid, pa.ArrowNotImplementedError) as e:
+            raise ValueError(f"Column '{field.name}' changes type between chunks "
+                             f"({field.type} vs {column.type}): {e}") from e
+    return pa.Table.from_arrays(columns, schema=schema)
+
+
+def iter_tables(frames):
+    """Converts DataFrame chunks to Arrow tables that all have the first chunk's schema."""
+    schema = None
+    for df in frames:
+        table = frame_to_table(df)
+        if schema is None:
+            schema = _stable_schema(table.schema)
+        yield _conform_table(table, schema)
+
+
+def write_frames(frames, sink):
+    """
+    Streams an iterable of DataFrame chunks into one compressed Arrow IPC file
+    (path or binary file object) without holding more than one chunk in memory.
+    Returns the number of rows written.
+    """
+    writer, rows = None, 0
+    options = ipc.IpcWriteOptions(compression=COMPRESSION)
+    try:
+        for table in iter_tables(frames):
+            if writer is None:
+                writer = ipc.new_file(sink, table.schema, options=options)
+            writer.write_table(table, max_chunksize=BATCH_ROWS)
+            rows += len(table)
+    finally:
+        if writer is not None:
+            writer.close()
+    return rows
+
+
+def encode_csv(df):
+    """Legacy format: the DataFrame as CSV text."""
+    return df.to_csv(index=False)
+
+
+def decode_csv(csv_str):
+    """Parses legacy CSV text and restores the date and duration columns."""
+    df = pd.read_csv(io.StringIO(csv_str))
+    for col in DATE_COLUMNS:
+        if col in df.columns:
+            df[col] = dates.parse_dates(df[col], dayfirst=False)[0]
+    if "Duration" in df.columns:
+        df["Duration"] = pd.to_timedelta(df["Duration"], errors='coerce')
+    return df
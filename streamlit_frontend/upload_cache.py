@@ -0,0 +1,117 @@
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+
+import profiling
+import storage
+
+# --- NORMALIZED UPLOAD CACHE ---
+# Normalized uploads are kept on local disk as Arrow IPC files (the same format
+# the streaming ingest writes), keyed by a hash of the uploaded bytes, the
+# column mapping and the form they are kept in. A repeat upload of the same export (by any user, also after a
+# restart) is loaded from here instead of being parsed and normalized again.
+# Least recently used entries are removed once the folder exceeds MAX_BYTES.
+CACHE_DIR = os.environ.get('LOGITRACK_CACHE_DIR', 'upload_cache')
+MAX_BYTES = int(os.environ.get('LOGITRACK_CACHE_MAX_MB', 1024)) * 1024 * 1024
+FORMAT_VERSION = 1        # bump when the normalization changes, so old entries stop matching
+HASH_BLOCK_BYTES = 1024 * 1024
+
+
+def cache_key(file, mapping, variant=''):
+    """
+    Hash of the file's bytes (read in blocks) plus the column mapping, and the
+    variant for uploads cached in more than one form (e.g. 'compacted').
+    """
+    digest = hashlib.sha256(f'{FORMAT_VERSION}\n'.encode('utf-8'))
+    file.seek(0)
+    for block in iter(lambda: file.read(HASH_BLOCK_BYTES), b''):
+        digest.update(block)
+    file.seek(0)
+    digest.update(json.dumps(mapping, sort_keys=True).encode('utf-8'))
+    if variant:
+        digest.update(f'\n{variant}'.encode('utf-8'))
+    return digest.hexdigest()
+
+
+def _paths(key):
+    return os.path.join(CACHE_DIR, key + '.arrow'), os.path.join(CACHE_DIR, key + '.json')
+
+
+def get(key):
+    """
+    Returns (path of the cached Arrow file, date report) for a cached upload,
+    or None. A hit marks the entry as recently used. Another session's evict()
+    can still remove the file before it is opened: callers treat a
+    FileNotFoundError on it as a miss.
+    """
+    data_path, report_path = _paths(key)
+    try:
+        with open(report_path, encoding='utf-8') as f:
+            report = json.load(f)
+        os.utime(data_path)
+        os.utime(report_path)
+    except (OSError, ValueError):
+        profiling.count('upload cache misses')
+        return None
+    profiling.count('upload cache hits')
+    return data_path, report
+
+
+def _write_atomic(path, write):
+    """Writes via write(file) to a temporary file next to path, then renames it into place."""
+    fd, tmp = tempfile.mkstemp(dir=CACHE_DIR, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            write(f)
+        os.replace(tmp, path)
+    except BaseException:
+        os.remove(tmp)
+        raise
+
+
+def _put(key, write_data, report):
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    data_path, report_path = _paths(key)
+    # The report goes in last: an entry only counts once both files are there
+    _write_atomic(data_path, write_data)
+    _write_atomic(report_path, lambda f: f.write(json.dumps(report, default=int).encode('utf-8')))
+    evict()
+
+
+def put_frame(key, df, report):
+    """Caches a normalized DataFrame and its date report."""
+    _put(key, lambda f: storage.write_frames([df], f), report)
+
+
+def put_file(key, path, report):
+    """Caches an Arrow IPC file already written by storage.write_frames (copied, path is left alone)."""
+    def copy(f):
+        with open(path, 'rb') as src:
+            shutil.copyfileobj(src, f)
+    _put(key, copy, report)
+
+
+def evict(max_bytes=None):
+    """Removes least recently used entries until the cache fits in max_bytes (default MAX_BYTES)."""
+    max_bytes = MAX_BYTES if max_bytes is None else max_bytes
+    entries, total = [], 0
+    for name in os.listdir(CACHE_DIR):
+        if not name.endswith('.arrow'):
+            continue
+        try:
+            st = os.stat(os.path.join(CACHE_DIR, name))
+        except OSError:
+            continue   # removed by another session meanwhile
+        entries.append((st.st_mtime, st.st_size, name[:-len('.arrow')]))
+        total += st.st_size
+    for _, size, key in sorted(entries):
+        if total <= max_bytes:
+            break
+        for path in reversed(_paths(key)):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+        total -= size
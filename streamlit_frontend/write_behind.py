@@ -0,0 +1,186 @@
+import atexit
+import os
+import threading
+import time
+
+import streamlit as st
+
+import auth
+
+# --- WRITE-BEHIND SAVES ---
+# Edits are handed to one background writer thread per process instead of being
+# written before the page reruns. Saves for the same user are coalesced while
+# they wait: a full save replaces everything queued before it, row deltas
+# (auth.save_user_changes) queue up behind each other and only the latest state
+# is recorded as a version. A user's saves are written DEBOUNCE_SECONDS after
+# their last edit, or MAX_DELAY_SECONDS after the first one still waiting if
+# edits keep coming. Writes are serialized, so flush() (logout, login, new
+# upload) and the flush at process exit wait for a write in progress and then
+# write what is left. A failed write is retried as a full save of the latest
+# state. Once a user's row deltas pile up they are folded into a new snapshot
+# after the write (auth.compact_deltas), so loads never have to.
+# LOGITRACK_WRITE_BEHIND=0 writes every save right away instead.
+ENABLED = os.environ.get('LOGITRACK_WRITE_BEHIND', '1').lower() not in ('0', 'false', 'no')
+DEBOUNCE_SECONDS = float(os.environ.get('LOGITRACK_SAVE_DEBOUNCE', 1.0))
+MAX_DELAY_SECONDS = 10.0
+RETRY_SECONDS = 5.0
+STATUS_REFRESH_SECONDS = 1.0
+
+
+def _merge(job, df, filename, delta, row_count, note, token):
+    """Folds a new save into a user's queued job (None if there is none)."""
+    if job is None or delta is None:
+        job = {'full': delta is None, 'deltas': [], 'edits': 0 if job is None else job['edits'],
+               'first': time.monotonic() if job is None else job['first']}
+    if not job['full']:
+        job['deltas'].append(delta)
+    # A queued full save writes the latest frame whole, which covers the delta
+    job.update(df=df, filename=filename, row_count=row_count, note=note, token=token, edits=job['edits'] + 1)
+    job['due'] = min(time.monotonic() + DEBOUNCE_SECONDS, job['first'] + MAX_DELAY_SECONDS)
+    return job
+
+
+def _write(username, job):
+    if job['full']:
+        auth.save_user_data(username, job['df'], job['filename'], note=job['note'], token=job['token'])
+    else:
+        # Only the last delta leaves the analytics table in the state the token stands for
+        for i, delta in enumerate(job['deltas']):
+            last = i == len(job['deltas']) - 1
+            auth.save_user_changes(username, *delta, row_count=job['row_count'], token=job['token'] if last else None)
+        auth.save_version(username, job['df'], job['filename'], note=job['note'])
+        auth.compact_deltas(username)
+
+
+class SaveQueue:
+    """Pending saves per user and the thread that writes them."""
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._write_lock = threading.Lock()   # one write at a time, in submit order per user
+        self._pending = {}
+        self._status = {}
+        self._thread = None
+
+    def submit(self, username, df, filename, delta=None, row_count=None, note='edit', token=None):
+        """
+        Queues a save; delta is (rows, ops, deleted keys) for a row-level save,
+        None to save df whole. token tags the saved state (auth.save_user_data).
+        """
+        # A shallow copy: columns added to the session frame later don't change what gets written
+        df = df.copy(deep=False)
+        with self._cond:
+            self._pending[username] = _merge(self._pending.get(username), df, filename, delta, row_count, note, token)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='write-behind', daemon=True)
+                self._thread.start()
+            self._cond.notify()
+
+    def _take(self, username=None, due_only=False):
+        with self._cond:
+            now = time.monotonic()
+            users = [u for u, job in self._pending.items()
+                     if (username is None or u == username) and (not due_only or job['due'] <= now)]
+            return [(u, self._pending.pop(u)) for u in users]
+
+    def _write_jobs(self, jobs):
+        for username, job in jobs:
+            try:
+                _write(username, job)
+            except Exception as e:
+                with self._cond:
+                    # Unknown how much was written: retry as one full save of the latest frame
+                    newer = self._pending.get(username)
+                    retry = newer or job
+                    retry['full'], retry['deltas'] = True, []
+                    retry['edits'] += job['edits'] if newer else 0
+                    retry['due'] = time.monotonic() + RETRY_SECONDS
+                    self._pending[username] = retry
+                    self._status[username] = dict(self._status.get(username, {}), error=str(e))
+                    self._cond.notify()
+            else:
+                with self._cond:
+                    self._status[username] = {'saved_at': time.time(), 'edits': job['edits'], 'error': None}
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while True:
+                    now = time.monotonic()
+                    due = [job['due'] for job in self._pending.values()]
+                    if due and min(due) <= now:
+                        break
+                    self._cond.wait(min(due) - now if due else None)
+            with self._write_lock:
+                self._write_jobs(self._take(due_only=True))
+
+    def flush(self, username=None):
+        """Writes the queued saves of one user (all users if None) now, waiting for a write in progress."""
+        with self._write_lock:
+            self._write_jobs(self._take(username))
+
+    def status(self, username):
+        """{'pending' (edits waiting), 'saved_at' (epoch seconds of the last write), 'error' (last failure or None)}."""
+        with self._cond:
+            job = self._pending.get(username)
+            status = self._status.get(username, {})
+            return {'pending': job['edits'] if job else 0, 'saved_at': status.get('saved_at'),
+                    'error': status.get('error')}
+
+
+_queue = None
+_queue_lock = threading.Lock()
+
+
+def get_queue():
+    """Returns the process-wide save queue, creating it on first use."""
+    global _queue
+    with _queue_lock:
+        if _queue is None:
+            _queue = SaveQueue()
+        return _queue
+
+
+def submit(username, df, filename, delta=None, row_count=None, note='edit', token=None):
+    """Saves df for the user in the background (or right away with write-behind disabled)."""
+    if ENABLED:
+        get_queue().submit(username, df, filename, delta, row_count, note, token)
+    else:
+        _write(username, _merge(None, df, filename, delta, row_count, note, token))
+
+
+def flush(username=None):
+    """Writes the user's (or everyone's) queued saves before returning."""
+    if _queue is not None:
+        _queue.flush(username)
+
+
+def status(username):
+    if _queue is None:
+        return {'pending': 0, 'saved_at': None, 'error': None}
+    return _queue.status(username)
+
+
+def _show_status(username):
+    state = status(username)
+    if state['error']:
+        st.warning(f"💾 Saving failed, retrying: {state['error']}")
+    elif state['pending']:
+        st.caption(f"💾 Saving {state['pending']} edit{'s' if state['pending'] != 1 else ''}…")
+    elif state['saved_at'] is not None:
+        st.caption(f"✅ All changes saved ({time.strftime('%H:%M:%S', time.localtime(state['saved_at']))})")
+
+
+def render_status(username):
+    """
+    Save indicator in the sidebar: edits waiting to be written, or when the
+    last write finished. While saves are waiting it refreshes on its own
+    (a fragment rerun, not the page).
+    """
+    pending = status(username)['pending'] > 0
+    with st.sidebar:
+        st.fragment(_show_status, run_every=STATUS_REFRESH_SECONDS if pending else None)(username)
+
+
+# Clean shutdown (end of the server process): write whatever is still queued
+atexit.register(flush)
@@ -0,0 +1,28 @@
+"""
+Shared setup for the checks: the app modules and the benchmark helpers are
+importable, and everything runs against a throwaway users.db.
+"""
+import os
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+os.environ.setdefault('LOGITRACK_DB_PATH', os.path.join(tempfile.mkdtemp(), 'users.db'))
+for folder in ('streamlit_frontend', 'benchmarks'):
+    if os.path.join(ROOT, folder) not in sys.path:
+        sys.path.insert(0, os.path.join(ROOT, folder))
+
+import pytest
+
+import auth
+
+
+@pytest.fixture(scope='session', autouse=True)
+def tables():
+    auth.create_usertable()
+
+
+@pytest.fixture
+def username(request):
+    """A user of its own for each test, so saved datasets never collide."""
+    return request.node.name
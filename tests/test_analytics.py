@@ -0,0 +1,84 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from common import make_delivery_frame
+from conftest import ROOT
+import aggregates
+import analytics
+import auth
+import compaction
+import db
+import delivery_metrics
+
+TRAIN_COLUMNS = {'Order Date': delivery_metrics.EXPECTED_COL, 'Ship Date': delivery_metrics.ACTUAL_COL}
+
+
+def train_frame(copies=5):
+    """train.csv tiled, with its non-integer Sales, as the Home page would save it."""
+    df = pd.read_csv(os.path.join(ROOT, 'train.csv')).rename(columns=TRAIN_COLUMNS)
+    df = pd.concat([df] * copies, ignore_index=True)
+    return compaction.compact_frame(delivery_metrics.add_delivery_metrics(df))
+
+
+def both(df, username, token, column):
+    aggregates.clear()
+    expected = aggregates.breakdown(df, 'pandas', column)
+    aggregates.clear()
+    result = aggregates.breakdown(df, 'sql', column, username, token)
+    return expected, result
+
+
+@pytest.mark.parametrize('column', ['Ship Mode', 'Segment', 'Region', 'Sub-Category', 'Delivery Status'])
+def test_sql_breakdown_matches_pandas_exactly(username, column):
+    df = train_frame()
+    token = auth.save_user_data(username, df, 'train.csv')
+    assert analytics.breakdown_stats(username, column, token) is not None
+    expected, result = both(df, username, token, column)
+    pd.testing.assert_frame_equal(result.astype({column: object}), expected.astype({column: object}),
+                                  check_exact=True)
+
+
+def test_float32_sales_match(username):
+    df = make_delivery_frame(20_000)
+    df['Sales'] = (df['TOT. AMT'] / 7).astype('float32')
+    df = compaction.compact_frame(df)
+    token = auth.save_user_data(username, df, 'bench.csv')
+    expected, result = both(df, username, token, 'STATUS')
+    assert result['Total Amount (₹)'].dtype == np.float32
+    pd.testing.assert_frame_equal(result.astype({'STATUS': object}), expected.astype({'STATUS': object}),
+                                  check_exact=True)
+
+
+def test_breakdown_reads_only(username):
+    df = train_frame(1)
+    token = auth.save_user_data(username, df, 'train.csv')
+    with db.connect() as c:
+        before = c.execute('SELECT COUNT(*) FROM sqlite_master').fetchone()
+    analytics.breakdown_stats(username, 'Segment', token)
+    analytics.breakdown_stats(username, 'Sales', token)   # not a text column: no index, no stats
+    with db.connect() as c:
+        assert c.execute('SELECT COUNT(*) FROM sqlite_master').fetchone() == before
+    assert analytics.breakdown_stats(username, 'Sales', token) is None
+
+
+def test_target_column_loaded_only_for_pandas_fallback(username):
+    full = train_frame(1)
+    token = auth.save_user_data(username, full, 'train.csv')
+    page = full[['Sales', 'Days Late', 'Delivery Status']]
+    loads = []
+
+    def load():
+        loads.append(1)
+        return full
+
+    aggregates.clear()
+    sql = aggregates.breakdown(page, 'sql', 'Region', username, token, load=load)
+    assert not loads
+    aggregates.clear()
+    fallback = aggregates.breakdown(page, 'stale', 'Region', username, 'another save', load=load)
+    assert loads
+    pd.testing.assert_frame_equal(sql.astype({'Region': object}), fallback.astype({'Region': object}),
+                                  check_exact=True)
@@ -0,0 +1,65 @@
+import pandas as pd
+
+from common import make_delivery_frame
+import auth
+import compaction
+import db
+import history
+import row_store
+import storage
+
+
+def pending(username):
+    with db.connect() as c:
+        return c.execute('SELECT COUNT(*) FROM user_data_rows WHERE username = ?', (username,)).fetchone()[0]
+
+
+def edit_notes(username, df, rows):
+    edited = df.copy()
+    edited['NOTES'] = edited['NOTES'].astype(object)
+    edited.loc[:rows - 1, 'NOTES'] = 'Checked again'
+    changed = edited.iloc[:rows]
+    auth.save_user_changes(username, changed, [row_store.OP_UPDATE] * rows, [], row_count=len(edited))
+    return edited
+
+
+def test_load_never_compacts(username):
+    df = compaction.compact_frame(make_delivery_frame(5_000))
+    auth.save_user_data(username, df, 'data.csv')
+    edited = edit_notes(username, df, auth.ROW_DELTA_COMPACT_MIN + 1)
+
+    loaded, _ = auth.get_user_data(username)
+    assert pending(username) == auth.ROW_DELTA_COMPACT_MIN + 1
+    pd.testing.assert_series_equal(loaded['NOTES'].astype(object), edited['NOTES'], check_names=False)
+
+
+def test_compaction_keeps_data_and_history(username):
+    df = compaction.compact_frame(make_delivery_frame(5_000))
+    auth.save_user_data(username, df, 'data.csv')
+    edit_notes(username, df, auth.ROW_DELTA_COMPACT_MIN + 1)
+    before, _ = auth.get_user_data(username)
+    versions = len(history.list_versions(username))
+
+    assert auth.compact_deltas(username)
+    assert pending(username) == 0
+    after, filename = auth.get_user_data(username)
+    pd.testing.assert_frame_equal(after, before)
+    assert filename == 'data.csv'
+    assert len(history.list_versions(username)) == versions
+    assert auth.get_user_data_info(username)['rows'] == len(df)
+
+
+def test_few_deltas_stay(username):
+    df = compaction.compact_frame(make_delivery_frame(1_000))
+    auth.save_user_data(username, df, 'data.csv')
+    edit_notes(username, df, 10)
+    assert not auth.compact_deltas(username)
+    assert pending(username) == 10
+
+
+def test_columns_of_missing_and_csv_data(username):
+    assert auth.get_user_columns(username, ['STATUS']) is None
+    df = make_delivery_frame(100)
+    auth.save_user_data(username, df, 'data.csv', fmt=storage.CSV_FORMAT)
+    loaded = auth.get_user_columns(username, ['STATUS', 'QUANTITY'])
+    assert list(loaded.columns) == ['STATUS', 'QUANTITY'] and len(loaded) == len(df)
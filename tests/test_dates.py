@@ -0,0 +1,54 @@
+import os
+
+import pandas as pd
+import pytest
+
+from conftest import ROOT
+import dates
+
+DELIVERY_DATES = ['EXPECTED DELIVERY DATE', 'ACTUAL DELIVERY DATE']
+
+
+@pytest.fixture(scope='module')
+def professional():
+    return pd.read_csv(os.path.join(ROOT, 'Professional_data.csv'))
+
+
+@pytest.mark.parametrize('column', DELIVERY_DATES)
+def test_column_read_in_one_order(professional, column):
+    formats = dates.rank_formats(professional[column])
+    assert {dates.field_order(fmt) for fmt in formats} - {None} == {'day'}
+
+
+@pytest.mark.parametrize('column', DELIVERY_DATES)
+def test_matches_day_first_parse(professional, column):
+    parsed, report = dates.parse_dates(professional[column])
+    baseline = pd.to_datetime(professional[column], dayfirst=True, errors='coerce', format='mixed')
+    pd.testing.assert_series_equal(parsed, baseline, check_names=False)
+    assert report['coerced'] == int(baseline.isna().sum() - professional[column].isna().sum())
+
+
+def test_two_and_four_digit_years_same_order():
+    parsed, _ = dates.parse_dates(pd.Series(['18-01-2025', '10-01-25', '05-06-25']))
+    assert list(parsed) == [pd.Timestamp('2025-01-18'), pd.Timestamp('2025-01-10'), pd.Timestamp('2025-06-05')]
+
+
+def test_month_first_when_no_day_first_format_fits():
+    values = pd.Series(['01-13-25', '02-28-25', '05-16-25'])
+    assert dates.rank_formats(values) == ['%m-%d-%y']
+    parsed, report = dates.parse_dates(values)
+    assert parsed.iloc[2] == pd.Timestamp('2025-05-16')
+    assert report['coerced'] == 0
+
+
+def test_preference_breaks_ties():
+    values = pd.Series(['05-06-25', '07-08-25'])
+    assert dates.rank_formats(values, dayfirst=True)[0] == '%d-%m-%y'
+    assert dates.rank_formats(values, dayfirst=False)[0] == '%m-%d-%y'
+
+
+def test_chunk_formats_reused():
+    first, report = dates.parse_dates(pd.Series(['18-01-2025', '19-01-2025']))
+    second, chunk = dates.parse_dates(pd.Series(['10-01-25']), formats=report['formats'])
+    assert chunk['formats'] == report['formats']
+    assert second.iloc[0] == pd.Timestamp('2025-01-10')
@@ -0,0 +1,86 @@
+import pandas as pd
+import pytest
+
+from common import make_delivery_frame
+import auth
+import compaction
+import db
+import history
+
+ROWS = 20_000
+
+
+@pytest.fixture(scope='module')
+def frame():
+    return compaction.compact_frame(make_delivery_frame(ROWS))
+
+
+def keys(frames):
+    return [history.chunk_key(chunk) for chunk in history.iter_chunks(frames)]
+
+
+def edited(df, rows, note):
+    df = df.copy()
+    df['NOTES'] = df['NOTES'].cat.add_categories([note])
+    df.loc[rows, 'NOTES'] = note
+    return df
+
+
+def unreferenced_chunks():
+    with db.connect() as c:
+        return c.execute('SELECT COUNT(*) FROM dataset_chunks WHERE NOT EXISTS '
+                         '(SELECT 1 FROM dataset_version_chunks v WHERE v.chunk = dataset_chunks.chunk)').fetchone()[0]
+
+
+def test_cuts_independent_of_pieces(frame):
+    whole = keys([frame])
+    cuts = [0, 1, 999, 5_000, 5_001, 12_345, ROWS]
+    assert keys(frame.iloc[a:b] for a, b in zip(cuts, cuts[1:])) == whole
+    sizes = [len(chunk) for chunk in history.iter_chunks([frame])]
+    assert sum(sizes) == ROWS
+    assert all(history.MIN_CHUNK_ROWS <= size <= history.MAX_CHUNK_ROWS for size in sizes[:-1])
+
+
+def test_local_edits_change_local_chunks(frame):
+    whole = keys([frame])
+    for changed in (edited(frame, [ROWS // 2], 'Fixed'), frame.drop(index=ROWS // 3),
+                    pd.concat([frame.iloc[:100], frame.iloc[[5]], frame.iloc[100:]])):
+        new = keys([changed])
+        assert len(set(new) - set(whole)) <= 2
+
+
+def test_versions_share_chunks_and_restore(frame, username):
+    auth.save_user_data(username, frame, 'v1.csv')
+    auth.save_user_data(username, frame, 'v1.csv')   # unchanged: no new version
+    second = edited(frame, [10, 11], 'Fixed')
+    auth.save_user_data(username, second, 'v2.csv')
+
+    versions = history.list_versions(username)
+    assert list(versions['version']) == [2, 1]
+    assert versions.loc[0, 'new bytes'] < versions.loc[0, 'size'] / 2
+    assert history.storage_report(username)['dedup_ratio'] > 1.5
+    restored, filename = history.load_version(username, 1)
+    assert filename == 'v1.csv'
+    pd.testing.assert_frame_equal(restored.astype(object), frame.astype(object))
+    assert len(history.diff(username, 1, 2)['changed']) == 2
+
+
+def test_prune_collects_only_unreferenced_chunks(frame, username, monkeypatch):
+    other = username + '-other'
+    auth.save_user_data(other, frame, 'v1.csv')
+    monkeypatch.setattr(history, 'MAX_VERSIONS', 2)
+    auth.save_user_data(username, frame, 'v1.csv')
+    for i in range(1, 4):
+        auth.save_user_data(username, edited(frame, [i * 5_000], f'Edit {i}'), f'v{i + 1}.csv')
+
+    assert list(history.list_versions(username)['version']) == [4, 3]
+    assert unreferenced_chunks() == 0
+    # The chunk only the pruned second version had is gone
+    pruned = set(keys([edited(frame, [5_000], 'Edit 1')])) - set(keys([frame]))
+    with db.connect() as c:
+        assert pruned and not any(c.execute('SELECT 1 FROM dataset_chunks WHERE chunk = ?', (key,)).fetchone()
+                                  for key in pruned)
+    # Chunks of the pruned first version that the other user still references stay
+    restored, _ = history.load_version(other, 1)
+    pd.testing.assert_frame_equal(restored.astype(object), frame.astype(object))
+    assert history.load_version(username, 3)[0] is not None
@@ -0,0 +1,41 @@
+import numpy as np
+import pandas as pd
+
+from common import make_delivery_frame
+import delivery_metrics
+import late_index
+
+
+def edit(df, rows, days):
+    df = df.copy()
+    df.loc[rows, 'ACTUAL DELIVERY DATE'] = df.loc[rows, 'EXPECTED DELIVERY DATE'] + pd.to_timedelta(days, unit='D')
+    return delivery_metrics.update_delivery_metrics(df, df.index[rows], priority=False)
+
+
+def assert_same(index, fresh):
+    np.testing.assert_array_equal(index.order, fresh.order)
+    np.testing.assert_array_equal(index.keys, fresh.keys)
+    assert index.by_agent.keys() == fresh.by_agent.keys()
+    for agent, (order, keys) in fresh.by_agent.items():
+        np.testing.assert_array_equal(index.by_agent[agent][0], order)
+        np.testing.assert_array_equal(index.by_agent[agent][1], keys)
+    assert index.kpis() == fresh.kpis()
+
+
+def test_updates_match_a_rebuild():
+    rng = np.random.default_rng(0)
+    df = make_delivery_frame(5_000)
+    index = late_index.LateIndex(df)
+    for _ in range(5):
+        rows = rng.choice(len(df), 200, replace=False)
+        # Late, on time and pending rows, many with the same delay as rows already indexed
+        df = edit(df, rows, rng.choice([-1, 0, 3, 3, 8, np.nan], len(rows)))
+        index = index.updated(df, rows)
+        assert_same(index, late_index.LateIndex(df))
+
+
+def test_added_rows():
+    df = make_delivery_frame(1_000)
+    index = late_index.LateIndex(df)
+    grown = pd.concat([df, make_delivery_frame(50, seed=1)], ignore_index=True)
+    assert_same(index.updated(grown, np.arange(len(df), len(grown))), late_index.LateIndex(grown))
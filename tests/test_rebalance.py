@@ -0,0 +1,52 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from common import AGENTS, make_delivery_frame
+import compaction
+import rebalance
+
+
+def dataset(seed):
+    rng = np.random.default_rng(seed)
+    df = make_delivery_frame(int(rng.integers(50, 3_000)), seed=seed)
+    df.loc[rng.random(len(df)) < 0.05, rebalance.AGENT_COL] = None
+    return compaction.compact_frame(df)
+
+
+@pytest.mark.parametrize('seed', range(10))
+def test_invariants(seed):
+    rng = np.random.default_rng(seed)
+    df = dataset(seed)
+    agents = list(rng.choice(AGENTS, int(rng.integers(1, len(AGENTS))), replace=False)) + ['New Agent']
+    moves, loads = rebalance.propose(df, agents)
+    out = rebalance.apply(df, moves)
+
+    before = df[rebalance.AGENT_COL].astype(object)
+    after = out[rebalance.AGENT_COL].astype(object)
+    is_open = rebalance.open_mask(df)
+    # Only open deliveries move, each exactly as proposed, and every open one ends with an available agent
+    assert is_open[moves.index].all()
+    assert (before.iloc[moves.index].fillna(rebalance.UNASSIGNED).to_numpy()
+            == moves['From'].fillna(rebalance.UNASSIGNED).to_numpy()).all()
+    unchanged = np.setdiff1d(np.arange(len(df)), moves.index)
+    pd.testing.assert_series_equal(after.iloc[unchanged], before.iloc[unchanged])
+    assert after[is_open].isin(agents).all()
+
+    # Nothing is lost, and the load ends up even to within one delivery's weight
+    for col in ('Items', 'Weight'):
+        assert loads[f'{col} before'].sum() == loads[f'{col} after'].sum() == (
+            is_open.sum() if col == 'Items' else rebalance.priority_weights(df['PRIORITY'][is_open]).sum())
+    weights = loads.loc[agents, 'Weight after']
+    assert weights.max() - weights.min() <= max(rebalance.PRIORITY_WEIGHTS.values())
+    assert not loads.drop(index=agents)['Items after'].any()
+
+    # A balanced dataset is left alone
+    assert rebalance.propose(out, agents)[0].empty
+    pd.testing.assert_frame_equal(out.drop(columns=rebalance.AGENT_COL), df.drop(columns=rebalance.AGENT_COL))
+
+
+def test_no_agents_moves_nothing():
+    df = dataset(0)
+    moves, _ = rebalance.propose(df, [])
+    assert moves.empty
@@ -0,0 +1,62 @@
+import pandas as pd
+import pytest
+
+from common import make_delivery_frame
+import auth
+import compaction
+import row_store
+
+
+@pytest.fixture
+def snapshot():
+    return compaction.compact_frame(make_delivery_frame(200))
+
+
+def as_deltas(before, after, changes):
+    rows, ops, deleted = row_store.editor_delta(before, after, changes)
+    keys = row_store.row_keys(rows)
+    deltas = list(zip(keys, ops, row_store.encode_rows(rows)))
+    return deltas + [(key, row_store.OP_DELETE, None) for key in deleted]
+
+
+def edited_copy(snapshot):
+    """The snapshot after an editor session: two rows edited (one to a new agent), one deleted, one added."""
+    after = snapshot.astype({col: object for col in snapshot.select_dtypes('category').columns})
+    after.loc[3, 'RESPONSIBLE_PERSON'] = 'New Agent'
+    after.loc[5, ['QUANTITY', 'NOTES']] = [7, 'Call before delivery']
+    after = after.drop(index=10)
+    added = after.iloc[[0]].assign(**{'ID NO.': 99_999, 'STATUS': 'Returned'})
+    after = pd.concat([after, added], ignore_index=True)
+    changes = {'edited_rows': {3: {'RESPONSIBLE_PERSON': 'New Agent'}, 5: {'QUANTITY': 7, 'NOTES': 'Call before delivery'}},
+               'added_rows': [{}], 'deleted_rows': [10]}
+    return after, changes
+
+
+def test_round_trip(snapshot):
+    after, changes = edited_copy(snapshot)
+    rebuilt = row_store.apply_deltas(snapshot, as_deltas(snapshot, after, changes))
+    pd.testing.assert_frame_equal(rebuilt.astype(after.dtypes.to_dict()), after, check_dtype=False)
+
+
+def test_category_columns_stay_categorical(snapshot):
+    after, changes = edited_copy(snapshot)
+    rebuilt = row_store.apply_deltas(snapshot, as_deltas(snapshot, after, changes))
+    for col in snapshot.select_dtypes('category').columns:
+        assert isinstance(rebuilt[col].dtype, pd.CategoricalDtype), col
+    # Only the columns that got new values have new categories
+    assert rebuilt['PRIORITY'].cat.categories.equals(snapshot['PRIORITY'].cat.categories)
+    assert 'New Agent' in rebuilt['RESPONSIBLE_PERSON'].cat.categories
+    assert 'Returned' in rebuilt['STATUS'].cat.categories
+
+
+def test_no_deltas_returns_snapshot(snapshot):
+    assert row_store.apply_deltas(snapshot, []) is snapshot
+
+
+def test_saved_deltas_round_trip(snapshot, username):
+    auth.save_user_data(username, snapshot, 'data.csv')
+    after, changes = edited_copy(snapshot)
+    auth.save_user_changes(username, *row_store.editor_delta(snapshot, after, changes), row_count=len(after))
+    loaded, _ = auth.get_user_data(username)
+    pd.testing.assert_frame_equal(loaded.astype(after.dtypes.to_dict()), after, check_dtype=False)
+    assert isinstance(loaded['RESPONSIBLE_PERSON'].dtype, pd.CategoricalDtype)
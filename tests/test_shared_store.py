@@ -0,0 +1,39 @@
+import gc
+
+import pandas as pd
+import pytest
+
+from common import make_delivery_frame
+import compaction
+import rebalance
+import shared_store
+
+
+@pytest.fixture
+def frame(tmp_path, monkeypatch):
+    monkeypatch.setattr(shared_store, 'STORE_DIR', str(tmp_path))
+    yield compaction.compact_frame(make_delivery_frame(5_000))
+    gc.collect()
+    assert not shared_store._frames and not shared_store._refs
+
+
+def test_views_are_read_only(frame):
+    view = shared_store.share(frame)
+    with pytest.raises(ValueError):
+        view.iloc[0, view.columns.get_loc('QUANTITY')] = 1
+    pd.testing.assert_frame_equal(view, frame)
+
+
+def test_copies_keep_the_mapping(frame):
+    view = shared_store.share(frame)
+    moves = pd.DataFrame({'From': [view['RESPONSIBLE_PERSON'].iloc[0]], 'To': ['New Agent']}, index=[0])
+    edited = rebalance.apply(view, moves)
+    mapped = next(iter(shared_store._frames.values()))
+    del view
+    gc.collect()
+
+    shared, private = shared_store.frame_memory(edited)
+    assert shared > private
+    again = shared_store.share(frame)
+    assert next(iter(shared_store._frames.values())) is mapped
+    del again, edited, mapped
@@ -1,191 +1,431 @@
 # imports
+import argparse
+import glob
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
 import pandas as pd
 from matplotlib import pyplot as plt
 
-# import csv
-data = pd.read_csv(r'C:\Users\Gursharan JIT SINGH\Desktop\DeliveryTracker_Python_EL.csv')
+# shared delivery logic lives next to the Streamlit app
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'streamlit_frontend'))
+import delivery_metrics
+import export
+import rebalance
 
+# File opened by the interactive menu when no --input is given
+DEFAULT_INPUT = r'C:\Users\Gursharan JIT SINGH\Desktop\DeliveryTracker_Python_EL.csv'
 
-def lateDelivery():
+REPORTS = ['late', 'workload', 'priority', 'notes', 'rebalance']
+FORMATS = ['csv', 'parquet', 'xlsx', 'json', 'png']
+DATA_EXTENSIONS = ('.csv', '.xlsx')
+AGENT_COLUMNS = ['DELIVERY AGENT', 'RESPONSIBLE_PERSON']
 
-    data["EXPECTED DELIVERY DATE"] = pd.to_datetime(data["EXPECTED DELIVERY DATE"], dayfirst=True, errors='coerce')
-    data["ACTUAL DELIVERY DATE"] = pd.to_datetime(data["ACTUAL DELIVERY DATE"], dayfirst=True, errors='coerce')
-    data["Duration"] = data["ACTUAL DELIVERY DATE"] - data["EXPECTED DELIVERY DATE"]
 
-    delayed_df = data[data["Duration"] > pd.Timedelta(days=0)]
-    delivered_df = data.dropna(subset=["ACTUAL DELIVERY DATE"]).copy()
+# --- DATA LOADING ---
 
-    print(delayed_df)
-    plotDeliveryData(delivered_df)
+def load_data(path):
+    """Reads a CSV/Excel export once and adds the delivery metrics (the file's own PRIORITY is kept)."""
+    data = pd.read_csv(path) if path.lower().endswith('.csv') else pd.read_excel(path)
+    date_report = {}
+    delivery_metrics.add_delivery_metrics(data, priority=False, report=date_report)
+    coerced = delivery_metrics.coerced_count(date_report)
+    if coerced:
+        print(f"Warning: {path}: {coerced} date value(s) could not be read and were treated as missing.")
+    return data
 
 
-def plotDeliveryData(delivered_df):
-    print('-' * 40)
-    print('Delivery Performance'.center(40, ' '))
-    print('-' * 40)
+def agent_column(data):
+    return next((col for col in AGENT_COLUMNS if col in data.columns), None)
+
+
+# --- REPORTS ---
+# Each report returns a DataFrame, or None if the data lacks the columns it needs.
+
+def late_deliveries_report(data):
+    if 'Delivery Status' not in data.columns:
+        return None
+    return data[data["Delivery Status"] == "Late"]
+
+
+def delivery_performance_report(data):
+    if 'Delivery Status' not in data.columns:
+        return None
+    delivered_df = data[data["Delivery Status"] != "Pending"]
+    return delivered_df["Delivery Status"].value_counts().rename_axis('Delivery Status').reset_index(name='Deliveries')
+
+
+def workload_report(data):
+    col = agent_column(data)
+    if col is None:
+        return None
+    return data[col].value_counts().rename_axis(col).reset_index(name='Items')
+
+
+def priority_report(data):
+    if 'PRIORITY' not in data.columns:
+        return None
+    return data['PRIORITY'].value_counts().rename_axis('PRIORITY').reset_index(name='Items')
+
+
+def notes_report(data):
+    if 'NOTES' not in data.columns:
+        return None
+    notes_clean = data['NOTES'].fillna('').astype(str).str.strip()
+    columns = [col for col in ['ID NO.', 'NAME', 'STATUS', 'NOTES'] if col in data.columns]
+    return data.loc[notes_clean != '', columns]
+
+
+def rebalance_report(data):
+    """Proposed new agents for the open deliveries (see rebalance.py), one row per reassignment."""
+    col = agent_column(data)
+    if col is None or ('STATUS' not in data.columns and 'Delivery Status' not in data.columns):
+        return None
+    moves, _ = rebalance.propose(data, agent_col=col)
+    columns = [c for c in ['ID NO.', 'NAME', 'PRIORITY'] if c in data.columns]
+    return data.iloc[moves.index][columns].assign(From=moves['From'].values, To=moves['To'].values)
+
+
+# --- CHARTS ---
+
+def bar_chart(counts, title, xlabel, ylabel, color=None, rotation=45):
+    """Bar chart of a value-counts Series with the value on top of each bar; returns the figure."""
+    fig, ax = plt.subplots(figsize=(6, 4))
+    counts.plot(kind='bar', color=color, ax=ax)
+    ax.set_title(title)
+    ax.set_xlabel(xlabel)
+    ax.set_ylabel(ylabel)
+    ax.tick_params(axis='x', rotation=rotation)
+    for index, value in enumerate(counts):
+        ax.text(index, value + 0.1, str(value), ha='center', va='bottom', fontsize=10)
+    fig.tight_layout()
+    return fig
+
+
+def performance_chart(data):
+    counts = delivery_performance_report(data).set_index('Delivery Status')['Deliveries']
+    colors = ['green' if status == 'On Time' else 'red' for status in counts.index]
+    return bar_chart(counts, 'Delivery Performance: On-Time vs Late', 'Delivery Status',
+                     'Number of Deliveries', color=colors, rotation=0)
+
+
+def workload_chart(data):
+    counts = workload_report(data).set_index(agent_column(data))['Items']
+    return bar_chart(counts, 'Workload by Person', 'Responsible Person/Team', 'Number of Items', color='lightcoral')
+
+
+def priority_chart(data):
+    counts = priority_report(data).set_index('PRIORITY')['Items']
+    return bar_chart(counts, 'Workload by Priority Level', 'Priority Level', 'Number of Items', color='darkorange')
+
+
+def rebalance_chart(data):
+    """Open items per agent now and after the proposed reassignment."""
+    _, loads = rebalance.propose(data, agent_col=agent_column(data))
+    counts = loads[['Items before', 'Items after']].rename(columns={'Items before': 'Current', 'Items after': 'Proposed'})
+    fig, ax = plt.subplots(figsize=(8, 4))
+    counts.plot(kind='bar', ax=ax, color=['lightsteelblue', 'lightcoral'])
+    ax.set_title('Open Items per Person: Current vs Proposed')
+    ax.set_xlabel('Responsible Person/Team')
+    ax.set_ylabel('Open Items')
+    ax.tick_params(axis='x', rotation=45)
+    fig.tight_layout()
+    return fig
+
+
+def status_chart(data):
+    counts = data['STATUS'].value_counts()
+    return bar_chart(counts, 'Progress Status', 'Status', 'Number of Products')
+
+
+# report name -> (table, chart)
+REPORT_BUILDERS = {
+    'late': (late_deliveries_report, performance_chart),
+    'workload': (workload_report, workload_chart),
+    'priority': (priority_report, priority_chart),
+    'notes': (notes_report, None),
+    'rebalance': (rebalance_report, rebalance_chart),
+}
+
+
+# --- HEADLESS BATCH MODE ---
+
+def write_tables(tables, formats, output_dir):
+    """Writes {name: DataFrame} as <name>.csv / .parquet / .json and one workbook with a sheet per table."""
+    os.makedirs(output_dir, exist_ok=True)
+    written = []
+    for name, table in tables.items():
+        base = os.path.join(output_dir, name)
+        # csv, parquet and xlsx are streamed chunk by chunk (export.py, shared with the app's download buttons)
+        for fmt in ('csv', 'parquet'):
+            if fmt in formats:
+                export.write(table, fmt, f'{base}.{fmt}')
+                written.append(f'{base}.{fmt}')
+        if 'json' in formats:
+            table.to_json(base + '.json', orient='records', date_format='iso', indent=2)
+            written.append(base + '.json')
+
+    if 'xlsx' in formats and tables:
+        path = os.path.join(output_dir, 'reports.xlsx')
+        export.write_xlsx({name: export.iter_chunks(table) for name, table in tables.items()}, path)
+        written.append(path)
+    return written
+
 
-    # Categorize deliveries
-    delivered_df["Delivery Status"] = delivered_df["Duration"].apply(lambda x: "Late" if x > pd.Timedelta(days=0) else "On Time")
-    #data["Delivery Status"] = data["Days Late"].apply(checkLateDelivery())
+def write_reports(data, reports, formats, output_dir):
+    """Writes the selected reports for one loaded dataset; returns the paths written."""
+    os.makedirs(output_dir, exist_ok=True)
+    written = []
+    tables = {}
+    for name in reports:
+        build_table, build_chart = REPORT_BUILDERS[name]
+        table = build_table(data)
+        if table is None:
+            print(f"{os.path.basename(output_dir)}: skipping '{name}' report (required columns are missing).")
+            continue
+        tables[name] = table
 
-    # Count them
-    status_counts = delivered_df["Delivery Status"].value_counts()
+        if 'png' in formats and build_chart is not None and not table.empty:
+            path = os.path.join(output_dir, name + '.png')
+            fig = build_chart(data)
+            fig.savefig(path)
+            plt.close(fig)
+            written.append(path)
+    return write_tables(tables, formats, output_dir) + written
 
-    # Plot
-    colors = ['green' if status == 'On Time' else 'red' for status in status_counts.index]
-    status_counts.plot(kind='bar', color=colors, figsize=(6,4))
 
-    plt.title('Delivery Performance: On-Time vs Late')
-    plt.xlabel('Delivery Status')
-    plt.ylabel('Number of Deliveries')
-    plt.xticks(rotation=0)
+def output_folders(paths):
+    """
+    One report folder name per input: its file name without the extension, with
+    _2, _3, ... added when names repeat (a/data.csv and b/data.csv, data.csv
+    and data.xlsx), compared case-insensitively for case-insensitive filesystems.
+    """
+    names, seen = [], set()
+    for path in paths:
+        base = os.path.splitext(os.path.basename(path))[0]
+        name, n = base, 1
+        while name.lower() in seen:
+            n += 1
+            name = f"{base}_{n}"
+        seen.add(name.lower())
+        names.append(name)
+    return names
 
-    # Add value labels on top of bars
-    for index, value in enumerate(status_counts):
-        plt.text(index, value + 0.2, str(value), ha='center', va='bottom', fontsize=10)
 
-    plt.tight_layout()
+def run_batch(inputs, reports, formats, output_dir):
+    """Loads each input once and writes its reports to output_dir/<input name>/ (see output_folders)."""
+    plt.switch_backend('Agg')   # no display needed
+    written = []
+    for path, name in zip(inputs, output_folders(inputs)):
+        data = load_data(path)
+        written += write_reports(data, reports, formats, os.path.join(output_dir, name))
+    return written
+
+
+# --- DIRECTORY MODE (PROCESS POOL) ---
+# Every file is reduced to small partial aggregates in a worker process; only
+# those partials travel back and are merged into the global rollups.
+
+def expand_inputs(inputs):
+    """Expands directories (all CSV/Excel files in them) and glob patterns into a sorted file list."""
+    paths = []
+    for item in inputs:
+        if os.path.isdir(item):
+            paths += [os.path.join(item, f) for f in os.listdir(item) if f.lower().endswith(DATA_EXTENSIONS)]
+        elif glob.has_magic(item):
+            paths += glob.glob(item)
+        else:
+            paths.append(item)
+    return sorted(set(paths))
+
+
+def partial_aggregates(path):
+    """Loads one file and returns its counts per agent, priority and delivery status."""
+    data = load_data(path)
+    partial = {'file': path, 'rows': len(data), 'agents': None, 'priority': None, 'status': None}
+
+    late = (data['Delivery Status'] == 'Late') if 'Delivery Status' in data.columns else None
+    agent = agent_column(data)
+    if agent is not None:
+        partial['agents'] = data[agent].value_counts().to_frame('Items')
+        if late is not None:
+            partial['agents']['Late'] = late.groupby(data[agent], observed=True).sum()
+            partial['agents']['Days Late (sum)'] = data['Days Late'].where(late, 0).groupby(data[agent], observed=True).sum()
+    if 'PRIORITY' in data.columns:
+        partial['priority'] = data['PRIORITY'].value_counts()
+    if late is not None:
+        partial['status'] = data['Delivery Status'].value_counts()
+        partial['days_late_sum'] = float(data['Days Late'].where(late, 0).sum())
+    return partial
+
+
+def _sum_partials(parts):
+    parts = [p for p in parts if p is not None]
+    if not parts:
+        return None
+    return pd.concat(parts).groupby(level=0, observed=True).sum()
+
+
+def merge_partials(partials):
+    """Combines per-file partials into the global rollups ({name: DataFrame})."""
+    tables = {}
+    agents = _sum_partials([p['agents'] for p in partials])
+    if agents is not None:
+        if 'Late' in agents.columns:
+            agents['Avg Delay (Days)'] = (agents.pop('Days Late (sum)') / agents['Late'].where(agents['Late'] > 0)).round(2)
+        tables['workload'] = agents.sort_values('Items', ascending=False).rename_axis('Agent').reset_index()
+
+    priority = _sum_partials([p['priority'] for p in partials])
+    if priority is not None:
+        tables['priority'] = priority.sort_values(ascending=False).rename_axis('PRIORITY').reset_index(name='Items')
+
+    status = _sum_partials([p['status'] for p in partials])
+    if status is not None:
+        delivered = status.drop('Pending', errors='ignore').sum()
+        late = status.get('Late', 0)
+        tables['late'] = pd.DataFrame([{
+            'Files': len(partials),
+            'Total Records': sum(p['rows'] for p in partials),
+            'Delivered': delivered,
+            'Late': late,
+            'Late Rate (%)': round(late / delivered * 100, 2) if delivered else 0.0,
+            'Avg Delay (Days)': round(sum(p.get('days_late_sum', 0) for p in partials) / late, 2) if late else 0.0,
+        }])
+
+    tables['files'] = pd.DataFrame([{'File': p['file'], 'Rows': p['rows']} for p in partials])
+    return tables
+
+
+def aggregate_files(paths, workers=None):
+    """Runs partial_aggregates over the files on a process pool (in this process if workers == 1)."""
+    if workers == 1:
+        return [partial_aggregates(path) for path in paths]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(partial_aggregates, paths))
+
+
+# --- INTERACTIVE MENU ---
+
+def lateDelivery(data):
+    print(late_deliveries_report(data))
+
+    print('-' * 40)
+    print('Delivery Performance'.center(40, ' '))
+    print('-' * 40)
+    performance_chart(data)
     plt.show()
-    mainmenu()
 
-def showdata():
+
+def showdata(data):
     print('-' * 40)
     print('Display Data'.center(40, ' '))
     print('-' * 40)
     print(data)
     input('Enter to continue')
-    mainmenu()
 
 
-def analysis():
+def analysis(data):
     print('-'*40)
     print('Data Analysis'.center(40, ' '))
     print('-'*40)
-    
+
     # 1. Workload by Responsible Person
-    if 'DELIVERY AGENT' in data.columns:
+    person_workload = workload_report(data)
+    if person_workload is not None:
         print("\n Items Assigned Per Person:")
-        person_workload = data['DELIVERY AGENT'].value_counts()
-        print(person_workload)
+        print(person_workload.to_string(index=False))
 
     # 2. Work Distribution by Priority
-    if 'PRIORITY' in data.columns:
+    priority_counts = priority_report(data)
+    if priority_counts is not None:
         print("\n Workload Distribution by Priority:")
-        priority_counts = data['PRIORITY'].value_counts()
-        print(priority_counts)
+        print(priority_counts.to_string(index=False))
     else:
         print("\n Priority data not available (missing 'PRIORITY' column).")
 
     # 3. Special Instructions/Notes Analysis
-    if 'NOTES' in data.columns:
-        data['NOTES_CLEAN'] = data['NOTES'].fillna('').astype(str).str.strip()
-        items_with_notes = data[data['NOTES_CLEAN'] != '']
-        
+    items_with_notes = notes_report(data)
+    if items_with_notes is not None:
         print("\n Special Instructions/Issues:")
         print(f"   Total items with notes/special instructions: {len(items_with_notes)}")
-        
+
         if not items_with_notes.empty:
             print("   List of Items with Notes:")
-            print(items_with_notes[['ID NO.', 'NAME', 'STATUS', 'NOTES']].to_string(index=False))
-    
-        # Clean up the temporary column before continuing
-        if 'NOTES_CLEAN' in data.columns:
-            data.drop(columns=['NOTES_CLEAN'], inplace=True, errors='ignore')
+            print(items_with_notes.to_string(index=False))
 
     input('\nEnter to continue')
-    mainmenu()
 
 
-def graphplot():
-    print('-' * 40)
-    print('Data Visualization'.center(40, ' '))
-    print('-' * 40)
-    print('1. Progress Status')
-    print('2. Workload by Person')
-    print('3. Workload by Priority Level')
-    print('4. Exit')
-    gch = int(input("Enter graph choice: "))
-    if gch ==1:
-        
-        status_counts = data['STATUS'].value_counts()
-        status_counts.plot(kind='bar')
-        plt.title('Progress Status')
-        plt.xlabel('Status')
-        plt.ylabel('Number of Products')
-        plt.xticks(rotation=45)
-        for index, value in enumerate(status_counts):
-            plt.text(index, value + 0.1, str(value), ha='center', va='bottom')
-        plt.tight_layout()
-        plt.show()
-        input('Enter to continue')
-        graphplot()
-
-
-   
-
-    # --- Graph 2 (axes[1]): Workload by Responsible Person ---
-    elif gch==2:
-        
-        person_workload = data['DELIVERY AGENT'].value_counts()
-        person_workload.plot(kind='bar', color='lightcoral')
-        plt.title('Workload by Person')
-        plt.xlabel('Responsible Person/Team')
-        plt.ylabel('Number of Items')
-        plt.xticks(rotation=45)
-        for index, value in enumerate(person_workload):
-            plt.text(index, value + 0.1, str(value), ha='center', va='bottom')
-        plt.tight_layout()
-        plt.show()
-        input('Enter to continue')
-        graphplot()
-    
-    # --- Graph 3 (axes[2]): Workload by Priority ---
-    elif gch==3:
-        priority_counts = data['PRIORITY'].value_counts()
-        priority_counts.plot(kind='bar', color='darkorange')
-        plt.title('Workload by Priority Level')
-        plt.xlabel('Priority Level')
-        plt.ylabel('Number of Items')
-        plt.xticks(rotation=45)
-        for index, value in enumerate(priority_counts):
-            plt.text(index, value + 0.1, str(value), ha='center', va='bottom')
-        plt.tight_layout()
-        plt.show()
-        input('Enter to continue')
-        graphplot()
-    
-    elif gch==4:
-        mainmenu()
-        
-    
-
-def mainmenu():
-    print('-' * 40)
-    print('Delivery Progress'.center(40, ' '))
-    print('-' * 40)
-    print('1. Display Data')
-    print('2. Data Analysis')
-    print('3. Data Graph Plotting')
-    print('4. Tracking Late Delivery')
-    print('5. Exit')
-    choiceInput = int(input('Enter choice number: '))
-    if choiceInput == 1:
-        showdata()
-        print('\n')
-    elif choiceInput == 2:
-        analysis()
-        print('\n')
-    elif choiceInput == 3:
-        graphplot()
-        print('\n')
-    elif(choiceInput == 4):
-        lateDelivery()
-    elif choiceInput == 5:
-        print('Thank You!!!')
-    else:
-        print("Invalid input! Please enter correct input")
-        mainmenu()
+def graphplot(data):
+    charts = {1: status_chart, 2: workload_chart, 3: priority_chart, 4: rebalance_chart}
+    while True:
+        print('-' * 40)
+        print('Data Visualization'.center(40, ' '))
+        print('-' * 40)
+        print('1. Progress Status')
+        print('2. Workload by Person')
+        print('3. Workload by Priority Level')
+        print('4. Balanced Workload (proposed reassignment)')
+        print('5. Exit')
+        gch = int(input("Enter graph choice: "))
+        if gch == 5:
+            return
+        if gch in charts:
+            charts[gch](data)
+            plt.show()
+            input('Enter to continue')
 
 
-mainmenu()
+def mainmenu(data):
+    screens = {1: showdata, 2: analysis, 3: graphplot, 4: lateDelivery}
+    while True:
+        print('-' * 40)
+        print('Delivery Progress'.center(40, ' '))
+        print('-' * 40)
+        print('1. Display Data')
+        print('2. Data Analysis')
+        print('3. Data Graph Plotting')
+        print('4. Tracking Late Delivery')
+        print('5. Exit')
+        choiceInput = int(input('Enter choice number: '))
+        if choiceInput == 5:
+            print('Thank You!!!')
+            return
+        if choiceInput in screens:
+            screens[choiceInput](data)
+            print('\n')
+        else:
+            print("Invalid input! Please enter correct input")
 
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Delivery progress reports. Without --reports the interactive menu opens.")
+    parser.add_argument('--input', nargs='+', default=None,
+                        help='CSV/Excel file(s), directories or glob patterns to report on')
+    parser.add_argument('--reports', nargs='+', choices=REPORTS + ['all'],
+                        help='reports to write without prompting (headless mode)')
+    parser.add_argument('--formats', nargs='+', choices=FORMATS, default=['csv'], help='output formats')
+    parser.add_argument('--output-dir', default='reports', help='folder the reports are written to')
+    parser.add_argument('--merge', action='store_true',
+                        help='process all inputs in parallel and write merged rollups to <output-dir>/merged')
+    parser.add_argument('--workers', type=int, default=None, help='worker processes for --merge (default: CPU count)')
+    return parser.parse_args(argv)
+
+
+if __name__ == '__main__':
+    args = parse_args()
+    if args.merge:
+        if not args.input:
+            sys.exit('--input is required with --merge')
+        tables = merge_partials(aggregate_files(expand_inputs(args.input), args.workers))
+        for path in write_tables(tables, [f for f in args.formats if f != 'png'], os.path.join(args.output_dir, 'merged')):
+            print(path)
+    elif args.reports:
+        if not args.input:
+            sys.exit('--input is required with --reports')
+        reports = REPORTS if 'all' in args.reports else args.reports
+        for path in run_batch(expand_inputs(args.input), reports, args.formats, args.output_dir):
+            print(path)
+    else:
+        mainmenu(load_data((args.input or [DEFAULT_INPUT])[0]))